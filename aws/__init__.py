@@ -1 +1,3 @@
 from ._aws import Search, Lookup
+from ._async import AsyncSearch, AsyncLookup, close_sessions
+from .fanout import MarketplaceFanOut, AsyncMarketplaceFanOut
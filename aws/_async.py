@@ -0,0 +1,238 @@
+import asyncio
+import weakref
+
+from ._aws import AWS, Search, Lookup, USER_AGENT, MAX_ITEM_IDS, MAX_ITEM_PAGE, chunks, items_in_flight
+from .ratelimit import get_rate_limit
+from .singleflight import AsyncSingleFlight
+from .tracing import RequestEvent, CACHE_HIT, EXCEPTION, QUEUE, SIGN, NETWORK, DECODE, outcome_for_status
+
+DEFAULT_CONCURRENCY = 10
+DEFAULT_POOL_SIZE = 100
+
+# One keep-alive pool per marketplace host for each running event loop.
+_sessions = weakref.WeakKeyDictionary()
+
+requests_in_flight = AsyncSingleFlight()
+_running_batches = set()
+
+
+def get_session(host, pool_size=DEFAULT_POOL_SIZE):
+    """
+    Get the shared aiohttp session for a marketplace host on the running event loop.
+
+    Every client which talks to the same host shares the session, and with it the keep-alive connection pool.
+    :param host: Marketplace host, Ex webservices.amazon.com
+    :param pool_size: Maximum number of open connections to the host. Only used when creating the session.
+    :return: aiohttp.ClientSession
+    """
+    import aiohttp
+    loop = asyncio.get_event_loop()
+    sessions = _sessions.setdefault(loop, {})
+    session = sessions.get(host)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=pool_size, limit_per_host=pool_size)
+        session = aiohttp.ClientSession(connector=connector, headers={'User-Agent': USER_AGENT})
+        sessions[host] = session
+    return session
+
+
+async def close_sessions():
+    """
+    Close every shared session which was opened on the running event loop.
+    """
+    loop = asyncio.get_event_loop()
+    for session in _sessions.pop(loop, {}).values():
+        await session.close()
+
+
+class AsyncAWS(AWS):
+
+    def __init__(self, associate_tag=None, access_key=None, secret_key=None, marketplace=None, rate_limit=None,
+                 burst=None, cache=None, hooks=None, credential_pool=None, concurrency=DEFAULT_CONCURRENCY,
+                 pool_size=DEFAULT_POOL_SIZE):
+        """
+
+        :param associate_tag: An alphanumeric token that uniquely identifies you as an Associate.
+        :param access_key: Your AWS Access Key ID which uniquely identifies you.
+        :param secret_key: A key that is used in conjunction with the Access Key ID
+            to cryptographically sign an API request.
+        :param marketplace: The locale where you are making the request.
+        :param rate_limit: Requests per second allowed for the access key on the marketplace, shared with every
+            other client in the process using the same access key on the same marketplace.
+        :param burst: Number of requests which can be sent at once after the access key has been idle.
+        :param cache: Optional aws.cache.BaseCache. Cached responses skip both the rate limit and the request.
+        :param hooks: Optional aws.tracing.Hooks receiving a RequestEvent for every request.
+        :param credential_pool: Optional aws.credentials.CredentialPool to sign requests with instead of a single
+            access key. rate_limit and burst then apply to every key of the pool.
+        :param concurrency: Maximum number of requests this client will have in flight at once.
+        :param pool_size: Maximum number of connections kept open to the marketplace host.
+        """
+        self.concurrency = concurrency
+        self.pool_size = pool_size
+        self._semaphore = None
+        super(AsyncAWS, self).__init__(associate_tag, access_key, secret_key, marketplace=marketplace,
+                                       rate_limit=rate_limit, burst=burst, cache=cache, hooks=hooks,
+                                       credential_pool=credential_pool)
+
+    def create_session(self):
+        # The session is bound to the event loop, so it is fetched from the shared pool on every request instead.
+        return None
+
+    @property
+    def semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def make_request(self, operation, extra=None):
+        """
+
+        :param operation: Specifies the Product Advertising API operation to execute. For more information, see Operations.
+            http://docs.aws.amazon.com/AWSECommerceService/latest/DG/CHAP_OperationListAlphabetical.html
+        :param extra: Any extra parameters which are required for a specific operation.
+        :return: AWS API Response content. Default XML String.
+        """
+        key = self.cache_key(operation, extra)
+        if self.cache is not None:
+            content = self.cache.get(key)
+            if content is not None:
+                if self.hooks is not None:
+                    self.hooks.request(RequestEvent(operation, self.marketplace).finish(CACHE_HIT, content=content))
+                return content
+        # Identical requests made at the same time share one call to the api.
+        return await requests_in_flight.do(key, self.send_request, operation, extra, key)
+
+    async def send_request(self, operation, extra, key):
+        event = RequestEvent(operation, self.marketplace) if self.hooks is not None else None
+        try:
+            async with self.semaphore:
+                credentials = self.acquire_credentials()
+                rate_limit = get_rate_limit(credentials.access_key, self.marketplace)
+                if rate_limit is not None:
+                    await rate_limit.acquire_async()
+                if event is not None:
+                    event.mark(QUEUE)
+                # Sign inside the semaphore so the timestamp is taken right before the request goes out.
+                url = self.make_url(operation, extra, credentials)
+                if event is not None:
+                    event.mark(SIGN)
+                session = get_session(self.marketplace, self.pool_size)
+                async with session.get(url) as response:
+                    if event is not None:
+                        event.mark(NETWORK)
+                    content = await response.text()
+                    status = response.status
+        except Exception as e:
+            if event is not None:
+                self.hooks.request(event.finish(EXCEPTION, error=e))
+            raise
+        if event is not None:
+            event.mark(DECODE)
+            self.hooks.request(event.finish(outcome_for_status(status), status, content))
+        if self.credential_pool is not None:
+            self.credential_pool.report_response(credentials, status, content)
+        if self.cache is not None and status == 200:
+            self.cache.set(key, content, operation)
+        return content
+
+
+class AsyncSearch(AsyncAWS, Search):
+    """
+    Coroutine version of Search. Every search method returns an awaitable of the XML document.
+    """
+
+    async def iter_asin_search(self, search_index, brand, workers=None, max_pages=MAX_ITEM_PAGE, **kwargs):
+        """
+        Iterate over the items of every page of an asin_search.
+
+        The first page gives the number of pages, the rest of them are then fetched concurrently.
+        :param search_index: Automotive, Electronics, etc.
+        :param brand: Brand name or part of a brand name.
+        :param workers: Number of pages fetched at once. Defaults to the client concurrency.
+        :param max_pages: Stop after this many pages, at most 10.
+        :param kwargs: Any extra url params to be sent to the api.
+        :return: Async generator of parsed Item objects, in page order.
+        """
+        first = await self.asin_search_page(search_index, brand, 1, kwargs)
+        for item in first.items.items:
+            yield item
+        last_page = self.last_page(first, max_pages)
+        if last_page < 2:
+            return
+        workers = asyncio.Semaphore(workers or self.concurrency)
+
+        async def fetch(page):
+            async with workers:
+                return await self.asin_search_page(search_index, brand, page, kwargs)
+
+        tasks = [asyncio.ensure_future(fetch(page)) for page in range(2, last_page + 1)]
+        try:
+            for task in tasks:
+                for item in (await task).items.items:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def asin_search_page(self, search_index, brand, item_page, kwargs):
+        from aws.parsers import ItemSearchResponse
+        content = await self.asin_search(search_index, brand, item_page=item_page, **kwargs)
+        return ItemSearchResponse.from_string(content)
+
+
+class AsyncLookup(AsyncAWS, Lookup):
+    """
+    Coroutine version of Lookup. Every lookup method returns an awaitable of the XML document.
+    """
+
+    async def bulk_item_lookup(self, item_ids, response_groups=(), workers=None, **kwargs):
+        """
+        Lookup any number of items, 10 ItemIds per request, with the batches running concurrently.
+
+        Items are yielded as each batch finishes, so they will not necessarily be in the order of `item_ids`.
+        :param item_ids: Iterable of ASINs. It is consumed lazily so it can be a generator.
+        :param response_groups: Response groups requested for every batch.
+        :param workers: Number of batches in flight at once. Defaults to the client concurrency.
+        :param kwargs: Any extra url params to be sent to the api.
+        :return: Async generator of parsed Item objects.
+        """
+        workers = workers or self.concurrency
+        group = self.item_lookup_group(response_groups, kwargs)
+        pending = set()
+        for batch in chunks(item_ids, MAX_ITEM_IDS):
+            # ASINs already being looked up by another bulk lookup are shared instead of requested again.
+            owned, futures = items_in_flight.claim(group, batch)
+            if owned:
+                task = asyncio.ensure_future(self.lookup_batch(group, owned, response_groups, kwargs))
+                # Batches may be shared with other lookups, so they are kept alive even if this generator is not.
+                _running_batches.add(task)
+                task.add_done_callback(_running_batches.discard)
+            pending.update(asyncio.wrap_future(f) for f in set(futures))
+            if len(pending) >= workers * MAX_ITEM_IDS:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    if future.result() is not None:
+                        yield future.result()
+        for future in asyncio.as_completed(pending):
+            item = await future
+            if item is not None:
+                yield item
+
+    async def lookup_batch(self, group, item_ids, response_groups, kwargs):
+        """
+        Lookup a batch claimed from items_in_flight and hand every parsed Item to whoever is waiting for it.
+
+        Failures are delivered to the waiters through their futures.
+        :return: dict of ASIN to Item.
+        """
+        from aws.parsers import ItemLookupResponse
+        try:
+            content = await self.item_lookup(item_ids, response_groups, **kwargs)
+            items = {item.asin: item for item in ItemLookupResponse.from_string(content).items.items}
+        except BaseException as e:
+            items_in_flight.fail(group, item_ids, e)
+            if not isinstance(e, Exception):
+                raise
+            return None
+        items_in_flight.resolve(group, item_ids, items)
+        return items
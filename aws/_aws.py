@@ -1,10 +1,12 @@
-import base64
-import sys
-import datetime
-import hashlib
-from urllib import parse
-import hmac
-import os
+import itertools
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+
+from .cache import cache_key
+from .credentials import Credentials
+from .ratelimit import configure_rate_limit, get_rate_limit
+from .signing import get_signer
+from .singleflight import SingleFlight, InFlightItems
+from .tracing import RequestEvent, CACHE_HIT, EXCEPTION, QUEUE, SIGN, NETWORK, DECODE, outcome_for_status
 
 
 MARKETPLACES = {
@@ -22,75 +24,36 @@ MARKETPLACES = {
     'uk': 'webservices.amazon.co.uk'
 }
 
+USER_AGENT = 'python-amazon-aws'
 
-def convert_to_gmtime(dt):
-    """
-    Convert the supplied date to GMT.
-    :param dt:
-    :return: parameter converted to GMT.
-    """
-    # Get the local time offset from gmt. Added 1 second to account for the time the computer takes to
-    # generate utcnow and now.
-    hr_diff = (((datetime.datetime.utcnow() - datetime.datetime.now()).seconds + 1) / 60) / 60
-    return dt + datetime.timedelta(hours=hr_diff)
-
-
-def formatted_amazon_datetime_str(dt=None):
-    """
-    Format a datetime object to amazon timestamp format spec. (YYYY-MM-DDThh:mm:ssZ) where T and Z are literals.
-    :param dt: optional datetime to suppy. If none supplied, then use current datetime.
-    :return: Formatted timestamp to use in request url.
-    """
-    dt = dt or datetime.datetime.now()
-    gmtime = convert_to_gmtime(dt)
-    return gmtime.strftime('%Y-%m-%dT%H:%M:%S.000Z')
-
+# ItemLookup accepts at most 10 ItemIds per request.
+MAX_ITEM_IDS = 10
 
-def urlencode(query):
-    """Encode a sequence of two-element tuples or dictionary into a URL query string.
+# ItemSearch returns at most 10 pages of results.
+MAX_ITEM_PAGE = 10
 
-    If any values in the query arg are sequences and doseq is true, each
-    sequence element is converted to a separate parameter.
+# Shared by every client in the process so concurrent duplicates are coalesced whichever client sends them.
+requests_in_flight = SingleFlight()
+items_in_flight = InFlightItems()
 
-    If the query arg is a sequence of two-element tuples, the order of the
-    parameters in the output will match the order of parameters in the
-    input.
 
-    Taken straight from urllib.urlencode. This is necessary because urllib.urlencode uses quote_plus but aws expects
-    %20 instead of +.
+def chunks(iterable, size):
     """
-
-    if hasattr(query, "items"):
-        # mapping objects
-        query = query.items()
-    else:
-        # it's a bother at times that strings and string-like objects are
-        # sequences...
-        try:
-            # non-sequence items should not work with len()
-            # non-empty strings will fail this
-            if len(query) and not isinstance(query[0], tuple):
-                raise TypeError
-                # zero-length sequences of all types will get here and succeed,
-                # but that's a minor nit - since the original implementation
-                # allowed empty dicts that type of behavior probably should be
-                # preserved for consistency
-        except TypeError:
-            ty, va, tb = sys.exc_info()
-            raise TypeError("not a valid non-string sequence or mapping object").with_traceback(tb)
-
-    l = []
-    for k, v in query:
-        k = parse.quote(str(k), safe='')
-        v = parse.quote(str(v), safe='')
-        l.append(k + '=' + v)
-    return '&'.join(l)
+    Split an iterable into lists of at most `size` elements without reading it all into memory.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
 
 
 class AWS(object):
     version = ''
 
-    def __init__(self, associate_tag, access_key, secret_key, marketplace=None):
+    def __init__(self, associate_tag=None, access_key=None, secret_key=None, marketplace=None, rate_limit=None,
+                 burst=None, cache=None, hooks=None, credential_pool=None):
         """
 
         :param associate_tag: An alphanumeric token that uniquely identifies you as an Associate.
@@ -98,24 +61,79 @@ class AWS(object):
         :param secret_key: A key that is used in conjunction with the Access Key ID
             to cryptographically sign an API request.
         :param marketplace: The locale where you are making the request.
+        :param rate_limit: Requests per second allowed for the access key on the marketplace. The limit is shared
+            by every client and thread in the process using the same access key on the same marketplace. If None,
+            the limit already configured for them (if any) is used.
+        :param burst: Number of requests which can be sent at once after the access key has been idle.
+        :param cache: Optional aws.cache.BaseCache. Cached responses skip both the rate limit and the request.
+        :param hooks: Optional aws.tracing.Hooks receiving a RequestEvent for every request.
+        :param credential_pool: Optional aws.credentials.CredentialPool to sign requests with instead of a single
+            access key. rate_limit and burst then apply to every key of the pool.
         """
-        import requests
+        if credential_pool is None and not (access_key and secret_key):
+            raise ValueError('access_key and secret_key are required when no credential_pool is given')
         self.associate_tag = associate_tag
         self.access_key = access_key
         self.secret_key = secret_key
         self.marketplace = marketplace or MARKETPLACES['us']
-        self.session = requests.Session()
-        self.session.headers['User-Agent'] = 'python-amazon-aws'
+        self.credential_pool = credential_pool
+        if rate_limit is not None:
+            for credentials in credential_pool or [self.default_credentials]:
+                configure_rate_limit(credentials.access_key, rate_limit, burst, self.marketplace)
+        self.cache = cache
+        self.hooks = hooks
+        self.session = self.create_session()
+
+    def create_session(self):
+        import requests
+        session = requests.Session()
+        session.headers['User-Agent'] = USER_AGENT
+        return session
 
-    def generate_signature(self, url_params):
+    @property
+    def default_credentials(self):
+        return Credentials(self.associate_tag, self.access_key, self.secret_key)
+
+    def acquire_credentials(self):
+        """
+        Credentials to sign the next request with, picked from the credential pool if there is one.
+        """
+        if self.credential_pool is None:
+            return self.default_credentials
+        return self.credential_pool.acquire(self.marketplace)
+
+    def signer(self, credentials=None):
+        """
+        :param credentials: Credentials to sign with, defaults to acquire_credentials, which takes a turn of the
+            credential pool if there is one.
+        :return: Signer of the credentials on the client's marketplace.
+        """
+        if credentials is None:
+            credentials = self.acquire_credentials()
+        return get_signer(credentials.associate_tag, credentials.access_key, credentials.secret_key,
+                          self.marketplace)
+
+    def generate_signature(self, url_params, credentials=None):
         canonical_string = '&'.join(sorted(url_params.split('&')))
-        string_to_sign = "GET\n{endpoint}\n/onca/xml\n{params}".format(endpoint=self.marketplace,
-                                                                       params=canonical_string)
-        signature = base64.b64encode(
-            hmac.new(bytes(self.secret_key, encoding='utf-8'), string_to_sign.encode(encoding='utf-8'),
-                     digestmod=hashlib.sha256).digest())
-        encoded_signature = parse.quote(signature)
-        return encoded_signature
+        return self.signer(credentials).signature(canonical_string)
+
+    def cache_key(self, operation, extra=None):
+        """
+        Canonical key of a request, independent of the time it is made at and of the access key signing it.
+        """
+        params = dict(extra or {}, AssociateTag=self.associate_tag)
+        return cache_key(self.marketplace, operation, params)
+
+    def make_url(self, operation, extra=None, credentials=None):
+        """
+        Build the signed request url for an operation.
+
+        :param operation: Product Advertising API operation to execute.
+        :param extra: Any extra parameters which are required for a specific operation.
+        :param credentials: Credentials to sign with, defaults to acquire_credentials.
+        :return: Signed url ready to be sent to the marketplace.
+        """
+        return self.signer(credentials).url(operation, extra)
 
     def make_request(self, operation, extra=None):
         """
@@ -125,27 +143,45 @@ class AWS(object):
         :param extra: Any extra parameters which are required for a specific operation.
         :return: AWS API Response content. Default XML String.
         """
-        extra = extra or {}
-        base_params = dict(
-            AssociateTag=self.associate_tag,
-            AWSAccessKeyId=self.access_key,
-            Operation=operation,
-            Service='AWSECommerceService',
-            Timestamp=formatted_amazon_datetime_str()
-        )
-        base_params.update(extra)
-        url_params = '&'.join(sorted(urlencode(base_params).split('&')))
-        signature = self.generate_signature(url_params)
-        url_params += '&Signature=%s' % signature
-        url = parse.urlunsplit((
-            'http',
-            self.marketplace,
-            '/onca/xml',
-            url_params,
-            None
-        ))
-        response = self.session.get(url)
-        content = response.text
+        key = self.cache_key(operation, extra)
+        if self.cache is not None:
+            content = self.cache.get(key)
+            if content is not None:
+                if self.hooks is not None:
+                    self.hooks.request(RequestEvent(operation, self.marketplace).finish(CACHE_HIT, content=content))
+                return content
+        # Identical requests made at the same time share one call to the api.
+        return requests_in_flight.do(key, self.send_request, operation, extra, key)
+
+    def send_request(self, operation, extra, key):
+        event = RequestEvent(operation, self.marketplace) if self.hooks is not None else None
+        credentials = self.acquire_credentials()
+        try:
+            rate_limit = get_rate_limit(credentials.access_key, self.marketplace)
+            if rate_limit is not None:
+                rate_limit.acquire()
+            if event is not None:
+                event.mark(QUEUE)
+            url = self.make_url(operation, extra, credentials)
+            if event is not None:
+                event.mark(SIGN)
+            response = self.session.get(url)
+            if event is not None:
+                event.mark(NETWORK)
+            content = response.text
+            status = response.status_code
+        except Exception as e:
+            if event is not None:
+                self.hooks.request(event.finish(EXCEPTION, error=e))
+            raise
+        if event is not None:
+            event.mark(DECODE)
+            self.hooks.request(event.finish(outcome_for_status(status), status, content))
+        if self.credential_pool is not None:
+            self.credential_pool.report_response(credentials, status, content)
+        # Errors (throttling, expired signatures...) come back with a non 200 status and are never cached.
+        if self.cache is not None and status == 200:
+            self.cache.set(key, content, operation)
         return content
 
 
@@ -186,6 +222,47 @@ class Search(AWS):
         extra.update(**kwargs)
         return self.make_request('ItemSearch', extra=extra)
 
+    def iter_asin_search(self, search_index, brand, workers=4, max_pages=MAX_ITEM_PAGE, **kwargs):
+        """
+        Iterate over the items of every page of an asin_search.
+
+        The first page gives the number of pages, the rest of them are then fetched concurrently. Requests still
+        go through the rate limit, so `workers` only bounds how many wait for it at once.
+        :param search_index: Automotive, Electronics, etc.
+        :param brand: Brand name or part of a brand name.
+        :param workers: Number of pages fetched at once.
+        :param max_pages: Stop after this many pages, at most 10.
+        :param kwargs: Any extra url params to be sent to the api.
+        :return: Generator of parsed Item objects, in page order.
+        """
+        first = self.asin_search_page(search_index, brand, 1, kwargs)
+        yield from first.items.items
+        last_page = self.last_page(first, max_pages)
+        if last_page < 2:
+            return
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.asin_search_page, search_index, brand, page, kwargs)
+                       for page in range(2, last_page + 1)]
+            try:
+                for future in futures:
+                    yield from future.result().items.items
+            finally:
+                # Do not fetch the remaining pages if the caller stopped early or a page failed.
+                for future in futures:
+                    future.cancel()
+
+    def asin_search_page(self, search_index, brand, item_page, kwargs):
+        from aws.parsers import ItemSearchResponse
+        return ItemSearchResponse.from_string(self.asin_search(search_index, brand, item_page=item_page, **kwargs))
+
+    @staticmethod
+    def last_page(response, max_pages=MAX_ITEM_PAGE):
+        """
+        Last page worth requesting for a search, from its first response.
+        """
+        total_pages = response.items.total_pages
+        return min(int(total_pages) if total_pages else 1, max_pages, MAX_ITEM_PAGE)
+
 
 class Lookup(AWS):
     from aws.parsers.base import raise_error_for_content
@@ -202,3 +279,55 @@ class Lookup(AWS):
         extra.update(kwargs)
         r = self.make_request('ItemLookup', extra=extra)
         return r
+
+    def bulk_item_lookup(self, item_ids, response_groups=(), workers=4, **kwargs):
+        """
+        Lookup any number of items, 10 ItemIds per request, with the requests spread over a pool of threads.
+
+        Items are yielded as each batch finishes, so they will not necessarily be in the order of `item_ids`.
+        :param item_ids: Iterable of ASINs. It is consumed lazily so it can be a generator.
+        :param response_groups: Response groups requested for every batch.
+        :param workers: Number of batches in flight at once.
+        :param kwargs: Any extra url params to be sent to the api.
+        :return: Generator of parsed Item objects.
+        """
+        group = self.item_lookup_group(response_groups, kwargs)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for batch in chunks(item_ids, MAX_ITEM_IDS):
+                # ASINs already being looked up by another bulk lookup are shared instead of requested again.
+                owned, futures = items_in_flight.claim(group, batch)
+                if owned:
+                    executor.submit(self.lookup_batch, group, owned, response_groups, kwargs)
+                pending.update(futures)
+                # Keep a bounded number of batches queued so huge inputs are never fully materialized.
+                if len(pending) >= workers * 2 * MAX_ITEM_IDS:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future.result() is not None:
+                            yield future.result()
+            for future in as_completed(pending):
+                if future.result() is not None:
+                    yield future.result()
+
+    def item_lookup_group(self, response_groups, kwargs):
+        """
+        Key shared by lookups whose results are interchangeable, whatever ItemIds they are for.
+        """
+        return self.cache_key('ItemLookup', dict(kwargs, ResponseGroup=','.join(response_groups)))
+
+    def lookup_batch(self, group, item_ids, response_groups, kwargs):
+        """
+        Lookup a batch claimed from items_in_flight and hand every parsed Item to whoever is waiting for it.
+
+        :return: dict of ASIN to Item.
+        """
+        from aws.parsers import ItemLookupResponse
+        try:
+            content = self.item_lookup(item_ids, response_groups, **kwargs)
+            items = {item.asin: item for item in ItemLookupResponse.from_string(content).items.items}
+        except BaseException as e:
+            items_in_flight.fail(group, item_ids, e)
+            raise
+        items_in_flight.resolve(group, item_ids, items)
+        return items
@@ -0,0 +1,228 @@
+"""
+Append-only archive of api responses.
+
+Responses are appended by a background thread to segment files, each response a separate gzip member, so a
+segment is a valid gzip file of every response in it (`zcat responses-00001.xml.gz`) and any one response can be
+read back by seeking to its member. Every segment has a sidecar index, one json line per response, with the
+response's key, where it is in the segment and the request metadata, Ex
+
+    {"key": "webservices.amazon.com/ItemLookup?...", "segment": "responses-00001.xml.gz", "offset": 0,
+     "length": 1234, "operation": "ItemLookup", "params": {...}, "status": 200, "timestamp": 1500000000.0,
+     "error": null}
+
+Keys are the canonical request keys of aws.cache.cache_key, so they do not depend on when or with which access
+key a request was made.
+"""
+import gzip
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from urllib import parse
+
+from .cache import EXCLUDED_PARAMS, cache_key
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = 'responses-'
+SEGMENT_SUFFIX = '.xml.gz'
+INDEX_SUFFIX = '.idx.jsonl'
+SEGMENT_RE = re.compile(r'^{}(\d+){}$'.format(re.escape(SEGMENT_PREFIX), re.escape(SEGMENT_SUFFIX)))
+
+# Sentinel asking the writer thread to stop.
+_CLOSE = object()
+
+
+def request_key(url):
+    """
+    Archive key, operation and canonical parameters of a signed request url.
+
+    :return: (key, operation, params) where params leaves out the parameters excluded from cache keys.
+    """
+    split = parse.urlsplit(url)
+    params = {k: v for k, v in parse.parse_qsl(split.query, keep_blank_values=True) if k not in EXCLUDED_PARAMS}
+    operation = params.pop('Operation', None)
+    return cache_key(split.netloc, operation, params), operation, params
+
+
+class ResponseArchive(object):
+
+    def __init__(self, directory, max_segment_size=64 * 1024 * 1024, compresslevel=6, max_pending=10000):
+        """
+
+        :param directory: Directory of the segments and their indexes. Responses archived in it before are
+            readable, new responses go to a new segment.
+        :param max_segment_size: Compressed size in bytes after which a new segment is started.
+        :param compresslevel: gzip compression level.
+        :param max_pending: Number of responses waiting to be written after which append blocks.
+        """
+        self.directory = directory
+        self.max_segment_size = max_segment_size
+        self.compresslevel = compresslevel
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._lock = threading.Lock()
+        self._index = {}
+        self._segment_number = self._load_indexes()
+        self._segment = None
+        self._index_file = None
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._thread = threading.Thread(target=self._write_loop, name='ResponseArchive', daemon=True)
+        self._thread.start()
+
+    def _segment_name(self, number):
+        return '{}{:05d}{}'.format(SEGMENT_PREFIX, number, SEGMENT_SUFFIX)
+
+    def _index_name(self, number):
+        return '{}{:05d}{}'.format(SEGMENT_PREFIX, number, INDEX_SUFFIX)
+
+    def _load_indexes(self):
+        """
+        Read the indexes of the segments already in the directory.
+
+        :return: Number of the last segment.
+        """
+        numbers = sorted(int(m.group(1)) for m in map(SEGMENT_RE.match, os.listdir(self.directory)) if m)
+        for number in numbers:
+            index_path = os.path.join(self.directory, self._index_name(number))
+            if not os.path.exists(index_path):
+                continue
+            with open(index_path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._index[entry['key']] = entry
+        return numbers[-1] if numbers else 0
+
+    def append(self, key, content, operation=None, params=None, status=None, error=None, timestamp=None):
+        """
+        Queue a response to be archived. Only blocks if the writer is more than max_pending responses behind.
+
+        :param key: Key the response is fetched by, see request_key.
+        :param content: Response body, bytes or str.
+        :param operation: Product Advertising API operation of the request.
+        :param params: Canonical request parameters.
+        :param status: HTTP status of the response.
+        :param error: Error code of the response, if it is an error response.
+        :param timestamp: Epoch seconds the response was received at, defaults to now.
+        """
+        if self._closed:
+            raise ValueError('Archive is closed')
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        entry = {
+            'key': key,
+            'operation': operation,
+            'params': params,
+            'status': status,
+            'timestamp': time.time() if timestamp is None else timestamp,
+            'error': error,
+        }
+        self._queue.put((entry, content))
+
+    def append_response(self, url, status, content, error=None):
+        """
+        Archive the response to a signed request url.
+        """
+        key, operation, params = request_key(url)
+        self.append(key, content, operation=operation, params=params, status=status, error=error)
+        return key
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _CLOSE:
+                    self._close_segment()
+                    return
+                self._write(*item)
+            except Exception:
+                logger.exception('Could not archive response')
+            finally:
+                self._queue.task_done()
+
+    def _open_segment(self):
+        self._segment_number += 1
+        self._segment = open(os.path.join(self.directory, self._segment_name(self._segment_number)), 'ab')
+        self._index_file = open(os.path.join(self.directory, self._index_name(self._segment_number)), 'a')
+
+    def _close_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._index_file.close()
+            self._segment = self._index_file = None
+
+    def _write(self, entry, content):
+        if self._segment is None or self._segment.tell() >= self.max_segment_size:
+            self._close_segment()
+            self._open_segment()
+        data = gzip.compress(content, compresslevel=self.compresslevel)
+        entry['segment'] = os.path.basename(self._segment.name)
+        entry['offset'] = self._segment.tell()
+        entry['length'] = len(data)
+        self._segment.write(data)
+        self._segment.flush()
+        self._index_file.write(json.dumps(entry, sort_keys=True) + '\n')
+        self._index_file.flush()
+        with self._lock:
+            self._index[entry['key']] = entry
+
+    def flush(self):
+        """
+        Wait until every queued response is written.
+        """
+        self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._index)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._index
+
+    def entry(self, key):
+        """
+        :return: Index entry of the last response archived for the key, or None.
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            return dict(entry) if entry is not None else None
+
+    def entries(self):
+        """
+        :return: Index entries of every key, the last response archived for each.
+        """
+        with self._lock:
+            return [dict(entry) for entry in self._index.values()]
+
+    def get(self, key):
+        """
+        Read the last response archived for the key, decompressing only its own gzip member. Responses which are
+        still queued are not found, call flush first to wait for them.
+
+        :return: Response body as bytes, or None.
+        """
+        entry = self.entry(key)
+        if entry is None:
+            return None
+        with open(os.path.join(self.directory, entry['segment']), 'rb') as f:
+            f.seek(entry['offset'])
+            return gzip.decompress(f.read(entry['length']))
@@ -0,0 +1,4 @@
+"""
+Micro benchmarks. Run the suite with `python -m aws.benchmarks`, or a single module with
+`python -m aws.benchmarks.<name>`.
+"""
@@ -0,0 +1,5 @@
+import sys
+
+from aws.benchmarks.suite import main
+
+sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Signatures per second of the shared Signer compared to the original signing code.
+
+    python -m aws.benchmarks.signing
+"""
+import argparse
+import base64
+import datetime
+import hashlib
+import hmac
+import timeit
+from urllib import parse
+
+from aws.signing import Signer, convert_to_gmtime, urlencode
+
+MARKETPLACE = 'webservices.amazon.com'
+PARAMS = {
+    'ItemId': 'B005BPZFAO,B00005N5PF,B000FBK3QK,B0009XEWSA,B00004TFT1,B00008OE6I,B0007WTF8W,B000G1EJNA,'
+              'B00005JNOG,B0002KVQBA',
+    'ResponseGroup': 'OfferFull,SalesRank,ItemAttributes,Images',
+}
+
+
+def legacy_url(secret_key, operation, extra):
+    """
+    Signing as AWS.make_url did before Signer, kept as the point of comparison.
+    """
+    base_params = dict(
+        AssociateTag='tag',
+        AWSAccessKeyId='access',
+        Operation=operation,
+        Service='AWSECommerceService',
+        Timestamp=convert_to_gmtime(datetime.datetime.now()).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    )
+    base_params.update(extra)
+    url_params = '&'.join(sorted(urlencode(base_params).split('&')))
+    canonical_string = '&'.join(sorted(url_params.split('&')))
+    string_to_sign = "GET\n{endpoint}\n/onca/xml\n{params}".format(endpoint=MARKETPLACE, params=canonical_string)
+    signature = parse.quote(base64.b64encode(
+        hmac.new(bytes(secret_key, encoding='utf-8'), string_to_sign.encode(encoding='utf-8'),
+                 digestmod=hashlib.sha256).digest()))
+    return parse.urlunsplit(('http', MARKETPLACE, '/onca/xml', url_params + '&Signature=%s' % signature, None))
+
+
+def signatures_per_second(fn, number):
+    best = min(timeit.repeat(fn, number=number, repeat=5))
+    return number / best
+
+
+def run(number=20000):
+    signer = Signer('tag', 'access', 'secret', MARKETPLACE)
+    return {
+        'signer': signatures_per_second(lambda: signer.url('ItemLookup', PARAMS), number),
+        'legacy': signatures_per_second(lambda: legacy_url('secret', 'ItemLookup', PARAMS), number),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=20000, help='Signatures per timing run.')
+    args = parser.parse_args()
+    results = run(args.number)
+    for name, rate in results.items():
+        print('{:<8} {:>10,.0f} signatures/s'.format(name, rate))
+    print('speedup  {:>10.2f}x'.format(results['signer'] / results['legacy']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Micro benchmarks of the hot paths of a crawl, compared against stored baselines.
+
+    python -m aws.benchmarks [--filter parse] [--tolerance 0.25] [--save]
+
+Every benchmark runs against synthetic documents shaped like real responses: a single item, a page of 10 Large
+items and a 1000 item archive. Timings are the best of several runs, in seconds per call, and a benchmark is
+flagged as a regression when it is slower than its baseline by more than the tolerance. Baselines depend on the
+machine, re-record them with --save before comparing on a new one.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from collections import OrderedDict, namedtuple
+
+from lxml import etree
+
+from aws._aws import AWS
+from aws.benchmarks import synthetic
+from aws.parsers import ItemSearchResponse
+from aws.signing import amazon_timestamp, urlencode
+
+BASELINES_FP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+DEFAULT_TOLERANCE = 0.25
+
+Result = namedtuple('Result', ['name', 'seconds', 'baseline', 'regression'])
+
+DOCUMENTS = OrderedDict([
+    ('single', lambda: synthetic.item_search_response(items=1, bins=0)),
+    ('page', lambda: synthetic.item_search_response(items=10, total_results=400)),
+    ('archive', lambda: synthetic.item_search_response(items=1000, bins=0)),
+])
+
+
+def traverse(response):
+    """
+    Read every field a spider typically reads from a response, with fresh wrappers.
+    """
+    items = response.items
+    values = [items.total_results, items.total_pages]
+    for item in items.items:
+        attributes = item.item_attributes
+        summary = item.offer_summary
+        offer = item.offer
+        image_set = item.image_set_primary
+        values.extend([
+            item.asin, item.sales_rank, attributes.title, attributes.brand, attributes.manufacturer,
+            summary.lowest_new_price.amount, summary.lowest_used_price.amount, summary.total_new, summary.total_used,
+            offer.price.amount, offer.condition, item.large_image.url, image_set.large_image.url,
+        ])
+    return values
+
+
+def _parse(body):
+    return lambda: ItemSearchResponse.from_string(body)
+
+
+def _on_tree(body, fn):
+    # Parse once so only the work on the tree is timed. A new wrapper per call leaves nothing memoized.
+    tree = etree.fromstring(body)
+    return lambda: fn(ItemSearchResponse(tree))
+
+
+def _generate_signature():
+    client = AWS('tag', 'access', 'secret')
+    params = dict(
+        AssociateTag='tag', AWSAccessKeyId='access', Operation='ItemSearch', Service='AWSECommerceService',
+        Timestamp=amazon_timestamp(), SearchIndex='Automotive', Brand='Brand', ItemPage=1,
+        ResponseGroup='ItemIds,Large,SearchBins',
+    )
+    url_params = urlencode(params)
+    return lambda: client.generate_signature(url_params)
+
+
+def _process_response(body):
+    try:
+        from scrapy import Request
+        from scrapy.http import XmlResponse
+        from scrapy.utils.test import get_crawler
+        from aws.scrapy.middleware import ApiResponseDownloaderMiddleware
+    except ImportError:
+        return None
+    middleware = ApiResponseDownloaderMiddleware.from_crawler(get_crawler())
+    request = Request('http://webservices.amazon.com/onca/xml?Operation=ItemSearch')
+    response = XmlResponse(request.url, body=body, request=request)
+    return lambda: middleware.process_response(request, response, None)
+
+
+def benchmarks():
+    """
+    :return: OrderedDict of benchmark name to a function to time. Benchmarks whose dependencies are not
+        installed are left out.
+    """
+    bodies = OrderedDict((name, document()) for name, document in DOCUMENTS.items())
+    functions = OrderedDict()
+    for name, body in bodies.items():
+        functions['parse.{}'.format(name)] = _parse(body)
+    for name in ('page', 'archive'):
+        functions['traverse.{}'.format(name)] = _on_tree(bodies[name], traverse)
+        functions['records.{}'.format(name)] = _on_tree(bodies[name], lambda r: list(r.items.records()))
+    functions['search_bins.page'] = _on_tree(bodies['page'], lambda r: r.search_bins())
+    functions['sign.generate_signature'] = _generate_signature()
+    functions['middleware.process_response.page'] = _process_response(bodies['page'])
+    return OrderedDict((name, fn) for name, fn in functions.items() if fn is not None)
+
+
+def time_function(fn, repeat=5, min_time=0.2):
+    """
+    :return: Best seconds per call over `repeat` runs, each at least `min_time` seconds long.
+    """
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    number = max(number, int(number * min_time / elapsed) if elapsed else number)
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def load_baselines(path=BASELINES_FP):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baselines(timings, path=BASELINES_FP):
+    with open(path, 'w') as f:
+        json.dump(OrderedDict(sorted(timings.items())), f, indent=2)
+        f.write('\n')
+
+
+def compare(timings, baselines, tolerance=DEFAULT_TOLERANCE):
+    """
+    :param timings: dict of benchmark name to seconds per call.
+    :param baselines: dict of benchmark name to baseline seconds per call.
+    :param tolerance: Fraction a benchmark may be slower than its baseline before it is a regression.
+    :return: list of Result
+    """
+    results = []
+    for name, seconds in timings.items():
+        baseline = baselines.get(name)
+        regression = baseline is not None and seconds > baseline * (1 + tolerance)
+        results.append(Result(name, seconds, baseline, regression))
+    return results
+
+
+def format_result(result):
+    line = '{:<36} {:>12.1f} us'.format(result.name, result.seconds * 1e6)
+    if result.baseline is None:
+        return line + '   (no baseline)'
+    change = (result.seconds / result.baseline - 1) * 100
+    return line + ' {:>+8.1f}%{}'.format(change, '   REGRESSION' if result.regression else '')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m aws.benchmarks', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filter', default='', help='Only run benchmarks whose name contains this.')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing runs per benchmark, the best is kept.')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Fraction slower than the baseline which is flagged as a regression.')
+    parser.add_argument('--baselines', default=BASELINES_FP, help='Path of the baselines json file.')
+    parser.add_argument('--save', action='store_true', help='Store the timings as the new baselines.')
+    args = parser.parse_args(argv)
+
+    timings = OrderedDict()
+    for name, fn in benchmarks().items():
+        if args.filter in name:
+            timings[name] = time_function(fn, repeat=args.repeat)
+
+    baselines = load_baselines(args.baselines)
+    results = compare(timings, baselines, args.tolerance)
+    for result in results:
+        print(format_result(result))
+
+    if args.save:
+        save_baselines(dict(baselines, **timings), args.baselines)
+        print('Saved baselines to {}'.format(args.baselines))
+        return 0
+    regressions = [r.name for r in results if r.regression]
+    if regressions:
+        print('{} regression(s): {}'.format(len(regressions), ', '.join(regressions)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
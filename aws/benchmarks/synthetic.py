@@ -0,0 +1,233 @@
+"""
+Synthetic Product Advertising API documents with the shape and size of real responses.
+"""
+import random
+
+NAMESPACE = 'http://webservices.amazon.com/AWSECommerceService/2011-08-01'
+
+IMAGE = """<{tag}>
+    <URL>https://images-na.ssl-images-amazon.com/images/I/{image_id}._SL{size}_.jpg</URL>
+    <Height Units="pixels">{size}</Height>
+    <Width Units="pixels">{size}</Width>
+</{tag}>"""
+
+IMAGE_TAGS = (
+    ('SwatchImage', 30), ('SmallImage', 75), ('ThumbnailImage', 75), ('TinyImage', 110), ('MediumImage', 160),
+    ('LargeImage', 500),
+)
+ITEM_IMAGE_TAGS = ('SmallImage', 'MediumImage', 'LargeImage')
+
+ITEM = """<Item>
+    <ASIN>{asin}</ASIN>
+    <DetailPageURL>https://www.amazon.com/dp/{asin}?tag=tag</DetailPageURL>
+    <SalesRank>{sales_rank}</SalesRank>
+    {images}
+    <ImageSets>
+        <ImageSet Category="variant">{variant}</ImageSet>
+        <ImageSet Category="primary">{primary}</ImageSet>
+    </ImageSets>
+    <ItemAttributes>
+        <Binding>Automotive</Binding>
+        <Brand>{brand}</Brand>
+        <Color>Black</Color>
+        <Label>{brand}</Label>
+        <Manufacturer>{brand}</Manufacturer>
+        <Publisher>{brand}</Publisher>
+        <Title>{brand} Synthetic Item {asin}</Title>
+    </ItemAttributes>
+    <OfferSummary>
+        <LowestNewPrice>
+            <Amount>{new_price}</Amount>
+            <CurrencyCode>USD</CurrencyCode>
+            <FormattedPrice>${new_price_formatted}</FormattedPrice>
+        </LowestNewPrice>
+        <LowestUsedPrice>
+            <Amount>{used_price}</Amount>
+            <CurrencyCode>USD</CurrencyCode>
+            <FormattedPrice>${used_price_formatted}</FormattedPrice>
+        </LowestUsedPrice>
+        <TotalNew>{total_new}</TotalNew>
+        <TotalUsed>{total_used}</TotalUsed>
+        <TotalCollectible>0</TotalCollectible>
+        <TotalRefurbished>0</TotalRefurbished>
+    </OfferSummary>
+    <Offers>
+        <TotalOffers>1</TotalOffers>
+        <TotalOfferPages>1</TotalOfferPages>
+        <Offer>
+            <Merchant><Name>Amazon.com</Name></Merchant>
+            <OfferAttributes><Condition>New</Condition></OfferAttributes>
+            <OfferListing>
+                <OfferListingId>{asin}LISTING</OfferListingId>
+                <Price>
+                    <Amount>{new_price}</Amount>
+                    <CurrencyCode>USD</CurrencyCode>
+                    <FormattedPrice>${new_price_formatted}</FormattedPrice>
+                </Price>
+                <Availability>Usually ships in 24 hours</Availability>
+            </OfferListing>
+        </Offer>
+    </Offers>
+</Item>"""
+
+BIN = """<Bin>
+    <BinName>{name}</BinName>
+    <BinItemCount>{count}</BinItemCount>
+    {parameters}
+</Bin>"""
+
+BIN_PARAMETER = """<BinParameter>
+    <Name>{name}</Name>
+    <Value>{value}</Value>
+</BinParameter>"""
+
+SEARCH_BIN_SET = '<SearchBinSet NarrowBy="{narrow_by}">{bins}</SearchBinSet>'
+
+ITEM_SEARCH_RESPONSE = """<?xml version="1.0" ?>
+<ItemSearchResponse xmlns="{namespace}">
+    <OperationRequest>
+        <RequestId>00000000-0000-0000-0000-000000000000</RequestId>
+        <Arguments>
+            <Argument Name="Operation" Value="ItemSearch"></Argument>
+            <Argument Name="Service" Value="AWSECommerceService"></Argument>
+        </Arguments>
+        <RequestProcessingTime>0.05</RequestProcessingTime>
+    </OperationRequest>
+    <Items>
+        <Request>
+            <IsValid>True</IsValid>
+            <ItemSearchRequest>
+                <Brand>{brand}</Brand>
+                <ItemPage>{item_page}</ItemPage>
+                <ResponseGroup>ItemIds</ResponseGroup>
+                <ResponseGroup>Large</ResponseGroup>
+                <ResponseGroup>SearchBins</ResponseGroup>
+                <SearchIndex>Automotive</SearchIndex>
+            </ItemSearchRequest>
+        </Request>
+        <TotalResults>{total_results}</TotalResults>
+        <TotalPages>{total_pages}</TotalPages>
+        <MoreSearchResultsUrl>https://www.amazon.com/gp/search?tag=tag</MoreSearchResultsUrl>
+        {items}
+        <SearchBinSets>{bin_sets}</SearchBinSets>
+    </Items>
+</ItemSearchResponse>"""
+
+ITEM_LOOKUP_RESPONSE = """<?xml version="1.0" ?>
+<ItemLookupResponse xmlns="{namespace}">
+    <OperationRequest>
+        <RequestId>00000000-0000-0000-0000-000000000000</RequestId>
+        <Arguments>
+            <Argument Name="Operation" Value="ItemLookup"></Argument>
+            <Argument Name="Service" Value="AWSECommerceService"></Argument>
+        </Arguments>
+        <RequestProcessingTime>0.05</RequestProcessingTime>
+    </OperationRequest>
+    <Items>
+        <Request>
+            <IsValid>True</IsValid>
+            <ItemLookupRequest>
+                <IdType>ASIN</IdType>
+                {item_ids}
+                <ResponseGroup>Large</ResponseGroup>
+            </ItemLookupRequest>
+        </Request>
+        {items}
+    </Items>
+</ItemLookupResponse>"""
+
+
+def asin(n):
+    return 'B{:09d}'.format(n)
+
+
+def _price(cents):
+    return '{}.{:02d}'.format(cents // 100, cents % 100)
+
+
+def _images(image_id, tags=None):
+    return '\n'.join(IMAGE.format(tag=tag, image_id=image_id, size=size)
+                     for tag, size in IMAGE_TAGS if tags is None or tag in tags)
+
+
+def item_xml(n, brand='Brand', rng=None, item_id=None):
+    """
+    Large response group <Item> with images, image sets, attributes, offer summary and an offer.
+
+    :param item_id: ASIN of the item, defaults to asin(n).
+    """
+    rng = rng or random.Random(n)
+    image_id = '{:011x}'.format(rng.getrandbits(44))
+    new_price = rng.randint(100, 100000)
+    used_price = rng.randint(50, new_price)
+    return ITEM.format(
+        asin=item_id or asin(n),
+        sales_rank=rng.randint(1, 1000000),
+        images=_images(image_id, ITEM_IMAGE_TAGS),
+        variant=_images(image_id + 'V'),
+        primary=_images(image_id),
+        brand=brand,
+        new_price=new_price,
+        new_price_formatted=_price(new_price),
+        used_price=used_price,
+        used_price_formatted=_price(used_price),
+        total_new=rng.randint(0, 50),
+        total_used=rng.randint(0, 10),
+    )
+
+
+def search_bin_sets(bin_sets):
+    """
+    :param bin_sets: Iterable of (NarrowBy, bins) where bins are (name, count, {parameter: value}).
+    """
+    return ''.join(SEARCH_BIN_SET.format(narrow_by=narrow_by, bins='\n'.join(
+        BIN.format(name=name, count=count, parameters='\n'.join(
+            BIN_PARAMETER.format(name=k, value=v) for k, v in parameters.items()))
+        for name, count, parameters in bins)) for narrow_by, bins in bin_sets)
+
+
+def item_search_response(items=10, item_page=1, total_results=None, brand='Brand', bins=10, seed=0,
+                         bin_sets=None):
+    """
+    ItemSearchResponse with `items` Large items and `bins` BrandName and Subject search bins.
+
+    :param bin_sets: Search bins to use instead of the generated ones, see search_bin_sets.
+    :return: bytes
+    """
+    rng = random.Random(seed)
+    total_results = items if total_results is None else total_results
+    start = (item_page - 1) * 10
+    items = '\n'.join(item_xml(start + i, brand=brand, rng=rng) for i in range(items))
+    if bin_sets is None:
+        bin_sets = [
+            ('BrandName', [('{} {}'.format(brand, i), rng.randint(1, 500), {'Brand': '{} {}'.format(brand, i)})
+                           for i in range(bins)]),
+            ('Subject', [('Subject {}'.format(i), rng.randint(1, 500), {'BrowseNode': str(15684181 + i)})
+                         for i in range(bins)]),
+        ]
+    body = ITEM_SEARCH_RESPONSE.format(
+        namespace=NAMESPACE,
+        brand=brand,
+        item_page=item_page,
+        total_results=total_results,
+        total_pages=(total_results + 9) // 10,
+        items=items,
+        bin_sets=search_bin_sets(bin_sets),
+    )
+    return body.encode('utf-8')
+
+
+def item_lookup_response(item_ids, brand='Brand'):
+    """
+    ItemLookupResponse with a Large item for every ASIN. The same ASIN always gives the same item.
+
+    :return: bytes
+    """
+    body = ITEM_LOOKUP_RESPONSE.format(
+        namespace=NAMESPACE,
+        item_ids='\n'.join('<ItemId>{}</ItemId>'.format(item_id) for item_id in item_ids),
+        items='\n'.join(item_xml(0, brand=brand, rng=random.Random(item_id), item_id=item_id)
+                         for item_id in item_ids),
+    )
+    return body.encode('utf-8')
+
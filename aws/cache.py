@@ -0,0 +1,196 @@
+"""
+Response caches for AWS.make_request.
+
+Responses are keyed by marketplace, operation and the request parameters. Parameters which change on every
+request (Timestamp, Signature) or which only identify the caller (AWSAccessKeyId) are left out of the key,
+so the same lookup made with different keys or at different times is served from the cache.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib import parse
+
+EXCLUDED_PARAMS = frozenset(['Timestamp', 'Signature', 'AWSAccessKeyId'])
+
+DEFAULT_TTL = 60 * 60
+
+
+def cache_key(marketplace, operation, params):
+    """
+    Canonical cache key for a request.
+
+    :param marketplace: Marketplace host the request is sent to.
+    :param operation: Product Advertising API operation.
+    :param params: Request parameters. Excluded parameters are ignored.
+    :return: str
+    """
+    canonical = '&'.join(sorted(
+        '{}={}'.format(parse.quote(str(k), safe=''), parse.quote(str(v), safe=''))
+        for k, v in params.items() if k not in EXCLUDED_PARAMS
+    ))
+    return '{}/{}?{}'.format(marketplace, operation, canonical)
+
+
+class BaseCache(object):
+
+    def __init__(self, ttl=DEFAULT_TTL, ttls=None, clock=time.time):
+        """
+
+        :param ttl: Seconds a response is kept for when its operation has no entry in `ttls`.
+        :param ttls: dict of operation to seconds, Ex {'ItemLookup': 3600, 'ItemSearch': 600}
+        :param clock: Function returning the current time in seconds.
+        """
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def ttl_for(self, operation):
+        return self.ttls.get(operation, self.ttl)
+
+    def get(self, key):
+        """
+        :return: Cached content or None when the key is missing or expired.
+        """
+        with self._lock:
+            content = self._get(key, self.clock())
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return content
+
+    def set(self, key, content, operation=None):
+        ttl = self.ttl_for(operation)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._set(key, content, self.clock() + ttl)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def _get(self, key, now):
+        raise NotImplementedError
+
+    def _set(self, key, content, expires):
+        raise NotImplementedError
+
+
+class MemoryCache(BaseCache):
+    """
+    Least recently used in memory cache bounded by the total size of the cached content.
+    """
+
+    def __init__(self, max_size=64 * 1024 * 1024, **kwargs):
+        """
+
+        :param max_size: Maximum number of characters of content kept in memory.
+        """
+        super(MemoryCache, self).__init__(**kwargs)
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, content = entry
+        if expires <= now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return content
+
+    def _set(self, key, content, expires):
+        if key in self._entries:
+            self._remove(key)
+        if len(content) > self.max_size:
+            return
+        self._entries[key] = (expires, content)
+        self.size += len(content)
+        while self.size > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        expires, content = self._entries.pop(key)
+        self.size -= len(content)
+
+
+class DiskCache(BaseCache):
+    """
+    Least recently used cache stored in a sqlite database, bounded by the total size of the cached content.
+    """
+
+    def __init__(self, path, max_size=1024 * 1024 * 1024, **kwargs):
+        """
+
+        :param path: Path of the sqlite database. It is created if it does not exist.
+        :param max_size: Maximum number of bytes of content kept on disk.
+        """
+        super(DiskCache, self).__init__(**kwargs)
+        self.path = path
+        self.max_size = max_size
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('CREATE TABLE IF NOT EXISTS responses ('
+                         'key TEXT PRIMARY KEY, content BLOB, size INTEGER, expires REAL, accessed REAL)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+        self._db.commit()
+
+    @staticmethod
+    def _hash(key):
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    @property
+    def size(self):
+        with self._lock:
+            return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def _get(self, key, now):
+        h = self._hash(key)
+        row = self._db.execute('SELECT content, expires FROM responses WHERE key = ?', (h,)).fetchone()
+        if row is None:
+            return None
+        content, expires = row
+        if expires <= now:
+            self._db.execute('DELETE FROM responses WHERE key = ?', (h,))
+            self._db.commit()
+            return None
+        self._db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, h))
+        self._db.commit()
+        return content.decode('utf-8')
+
+    def _set(self, key, content, expires):
+        data = content.encode('utf-8')
+        if len(data) > self.max_size:
+            return
+        self._db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                         (self._hash(key), data, len(data), expires, self.clock()))
+        total = self._db.execute('SELECT SUM(size) FROM responses').fetchone()[0]
+        while total > self.max_size:
+            h, size = self._db.execute('SELECT key, size FROM responses ORDER BY accessed LIMIT 1').fetchone()
+            self._db.execute('DELETE FROM responses WHERE key = ?', (h,))
+            total -= size
+            self.evictions += 1
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
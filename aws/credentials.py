@@ -0,0 +1,174 @@
+"""
+Pools of credentials to spread requests over several access keys.
+
+Every access key has its own quota, so a pool of keys multiplies the number of requests which can be sent. Each
+request is signed with the key which has the most requests left in its rate bucket, and keys which keep getting
+RequestThrottled or SignatureDoesNotMatch errors are set aside for a while, Ex
+
+    pool = CredentialPool([('tag', 'access-1', 'secret-1'), ('tag', 'access-2', 'secret-2')])
+    lookup = Lookup(credential_pool=pool, rate_limit=1)
+"""
+import itertools
+import threading
+import time
+from collections import namedtuple
+
+from lxml import etree
+
+from .ratelimit import get_rate_limit
+
+Credentials = namedtuple('Credentials', ['associate_tag', 'access_key', 'secret_key'])
+
+# Errors which mean the key itself is the problem, rather than the request.
+BACKOFF_ERRORS = frozenset(['RequestThrottled', 'SignatureDoesNotMatch'])
+
+
+def to_credentials(c):
+    """
+    :param c: Credentials, (associate_tag, access_key, secret_key) tuple or dict with those keys.
+    """
+    if isinstance(c, Credentials):
+        return c
+    if isinstance(c, dict):
+        return Credentials(c['associate_tag'], c['access_key'], c['secret_key'])
+    return Credentials(*c)
+
+
+def error_code(content):
+    """
+    :return: Code of the error response in `content`, or None if it is not an error response.
+    """
+    from aws.parsers.base import ItemSearchErrorResponse
+    try:
+        response = ItemSearchErrorResponse.from_string(content)
+    except (ValueError, etree.XMLSyntaxError):
+        return None
+    return response.error.code if response.error else None
+
+
+class KeyStats(object):
+    """
+    Accounting of the requests made with one access key.
+    """
+    __slots__ = ('requests', 'throttled', 'signature_errors', 'failures', 'backed_off_until', 'last_used')
+
+    def __init__(self):
+        self.requests = 0
+        self.throttled = 0
+        self.signature_errors = 0
+        # Consecutive responses with one of BACKOFF_ERRORS.
+        self.failures = 0
+        self.backed_off_until = 0.0
+        self.last_used = 0
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__ if k != 'last_used'}
+
+
+class CredentialPool(object):
+
+    def __init__(self, credentials, failure_threshold=3, backoff=30, max_backoff=600, clock=time.monotonic):
+        """
+
+        :param credentials: Iterable of Credentials, (associate_tag, access_key, secret_key) tuples or dicts with
+            those keys.
+        :param failure_threshold: Consecutive throttled or signature errors after which a key is backed off.
+        :param backoff: Seconds a key is backed off for the first time. It doubles every time the key fails
+            again, up to `max_backoff`.
+        :param clock: Function returning the current time in seconds.
+        """
+        self.credentials = [to_credentials(c) for c in credentials]
+        if not self.credentials:
+            raise ValueError('A CredentialPool needs at least one set of credentials')
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.stats = {c.access_key: KeyStats() for c in self.credentials}
+        self._uses = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return iter(self.credentials)
+
+    def __len__(self):
+        return len(self.credentials)
+
+    def is_backed_off(self, credentials):
+        return self.stats[credentials.access_key].backed_off_until > self.clock()
+
+    def acquire(self, marketplace=None):
+        """
+        Pick the credentials to sign the next request to a marketplace with.
+
+        Keys which are not backed off are ranked by the tokens left in their rate bucket on the marketplace, then
+        by how long ago they were last used, so keys without a rate limit are used in turn. When every key is
+        backed off, the one whose backoff ends first is used.
+        :return: Credentials
+        """
+        with self._lock:
+            now = self.clock()
+            available = [c for c in self.credentials if self.stats[c.access_key].backed_off_until <= now]
+            if available:
+                chosen = max(available, key=lambda c: self._budget(c, marketplace))
+            else:
+                chosen = min(self.credentials, key=lambda c: self.stats[c.access_key].backed_off_until)
+            self.stats[chosen.access_key].last_used = next(self._uses)
+            return chosen
+
+    def _budget(self, credentials, marketplace):
+        bucket = get_rate_limit(credentials.access_key, marketplace)
+        return bucket.available if bucket is not None else 0.0, -self.stats[credentials.access_key].last_used
+
+    def report(self, credentials, code=None):
+        """
+        Record the outcome of a request made with `credentials`.
+
+        :param code: Error code of the response, None if it succeeded.
+        """
+        with self._lock:
+            stats = self.stats[credentials.access_key]
+            stats.requests += 1
+            if code == 'RequestThrottled':
+                stats.throttled += 1
+            elif code == 'SignatureDoesNotMatch':
+                stats.signature_errors += 1
+            if code not in BACKOFF_ERRORS:
+                stats.failures = 0
+                return
+            stats.failures += 1
+            if stats.failures >= self.failure_threshold:
+                delay = min(self.max_backoff, self.backoff * 2 ** (stats.failures - self.failure_threshold))
+                stats.backed_off_until = self.clock() + delay
+
+    def report_response(self, credentials, status, content):
+        """
+        Record the outcome of a request from its response.
+        """
+        self.report(credentials, None if status == 200 else error_code(content))
+
+    def summary(self):
+        """
+        :return: dict of access key to its KeyStats as a dict.
+        """
+        with self._lock:
+            return {access_key: stats.as_dict() for access_key, stats in self.stats.items()}
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_credential_pool(credentials, **kwargs):
+    """
+    Shared CredentialPool for a list of credentials, so every request made with them shares the accounting.
+
+    :param credentials: Iterable of credentials as accepted by CredentialPool.
+    :param kwargs: CredentialPool kwargs, only used when creating the pool.
+    """
+    key = tuple(to_credentials(c) for c in credentials)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = CredentialPool(key, **kwargs)
+        return pool
@@ -0,0 +1,379 @@
+"""
+Local stand-in for the Product Advertising API, for load testing crawls without spending any quota.
+
+The server answers signed /onca/xml requests the way the api does: signatures are checked with the same
+algorithm the clients sign with, requests older than 15 minutes expire, and RequestThrottled and RequestExpired
+errors can be sent at configurable rates or from a per key quota. ItemSearch and ItemLookup responses are the
+synthetic documents of aws.benchmarks.synthetic, or responses recorded in a ResponseArchive. Ex
+
+    python -m aws.devserver --port 8080 --credentials access:secret --quota 1 --latency 0.1
+
+and point a client or crawl at it
+
+    lookup = Lookup('tag', 'access', 'secret', marketplace='127.0.0.1:8080')
+
+or, for a crawl, AWS_MARKETPLACE = '127.0.0.1:8080'. The server reports the requests it serves per second.
+"""
+import argparse
+import calendar
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from hmac import compare_digest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from urllib import parse
+from xml.sax.saxutils import escape
+
+from ._aws import MAX_ITEM_IDS, MAX_ITEM_PAGE
+from .archive import ResponseArchive, request_key
+from .benchmarks.synthetic import item_lookup_response, item_search_response
+from .credentials import to_credentials
+from .ratelimit import TokenBucket
+from .signing import AMAZON_TIMESTAMP_FORMAT, PATH, get_signer, quote
+
+logger = logging.getLogger(__name__)
+
+# Seconds after its timestamp a request expires.
+REQUEST_EXPIRY = 15 * 60
+
+# Outcomes counted in DevServer.summary.
+OK = 'ok'
+RECORDED = 'recorded'
+THROTTLED = 'throttled'
+EXPIRED = 'expired'
+INVALID_SIGNATURE = 'invalid_signature'
+INVALID_KEY = 'invalid_key'
+ERROR = 'error'
+
+ERROR_RESPONSE = """<{operation}ErrorResponse xmlns="http://ecs.amazonaws.com/doc/2005-10-05/">
+    <Error>
+        <Code>{code}</Code>
+        <Message>{message}</Message>
+    </Error>
+    <RequestID>{request_id}</RequestID>
+</{operation}ErrorResponse>"""
+
+ERROR_MESSAGES = {
+    'AWS.InvalidPath': 'The path {path} is not valid.',
+    'MissingParameter': 'Your request is missing required parameters. Required parameters include {parameters}.',
+    'InvalidClientTokenId': 'The AWS Access Key Id you provided does not exist in our records.',
+    'SignatureDoesNotMatch': 'The request signature we calculated does not match the signature you provided.',
+    'AWS.InvalidParameterValue': '{value} is not a valid value for {parameter}.',
+    'RequestExpired': 'Request has expired. Timestamp date is {timestamp}.',
+    'RequestThrottled': 'AWS Access Key ID: {access_key}. You are submitting requests too quickly.',
+    'AWS.ParameterOutOfRange': 'The value you specified for {parameter} is invalid.',
+    'AWS.InvalidOperationParameter': 'The Operation parameter is invalid. {operation} is not a valid operation.',
+}
+
+
+def error_response(operation, code, message):
+    """
+    :return: bytes of the api's error document.
+    """
+    body = ERROR_RESPONSE.format(operation=operation if operation in ('ItemSearch', 'ItemLookup') else 'ItemLookup',
+                                 code=escape(code), message=escape(message), request_id=uuid.uuid4())
+    return body.encode('utf-8')
+
+
+def parse_timestamp(timestamp):
+    """
+    :return: Epoch seconds of an amazon formatted timestamp, or None if it is not one.
+    """
+    try:
+        return calendar.timegm(time.strptime(timestamp, AMAZON_TIMESTAMP_FORMAT))
+    except ValueError:
+        return None
+
+
+class DevServer(object):
+    """
+    Threaded HTTP server answering Product Advertising API requests, see the module docstring.
+
+    Every request is answered in `respond` and counted by outcome, see summary.
+    """
+
+    def __init__(self, credentials=None, host='127.0.0.1', port=0, throttle_rate=0.0, expire_rate=0.0, latency=0.0,
+                 jitter=0.0, quota=None, archive=None, archive_marketplace=None, total_results=100, seed=None):
+        """
+
+        :param credentials: Credentials requests have to be signed with, as accepted by CredentialPool, or a dict
+            of access key to secret key. Signatures are not checked when None.
+        :param throttle_rate: Fraction of requests answered with RequestThrottled.
+        :param expire_rate: Fraction of requests answered with RequestExpired.
+        :param latency: Seconds every response is delayed by.
+        :param jitter: Up to this many more seconds are added to the latency at random.
+        :param quota: Requests per second allowed for each access key, the rest are throttled. Unlimited when
+            None.
+        :param archive: ResponseArchive, or the directory of one, to serve recorded responses from. Requests which
+            were not recorded get synthetic responses.
+        :param archive_marketplace: Marketplace the archived responses were requested from, Ex
+            webservices.amazon.com. Defaults to the Host the requests are sent to.
+        :param total_results: Number of results of every ItemSearch.
+        :param seed: Seed of the random errors and latencies.
+        """
+        if isinstance(credentials, dict):
+            self.secret_keys = dict(credentials)
+        elif credentials is not None:
+            self.secret_keys = {c.access_key: c.secret_key for c in map(to_credentials, credentials)}
+        else:
+            self.secret_keys = None
+        self.throttle_rate = throttle_rate
+        self.expire_rate = expire_rate
+        self.latency = latency
+        self.jitter = jitter
+        self.quota = quota
+        if archive is not None and not isinstance(archive, ResponseArchive):
+            archive = ResponseArchive(archive)
+        self.archive = archive
+        self.archive_marketplace = archive_marketplace
+        self.total_results = total_results
+        self.clock = time.time
+        self.counts = Counter()
+        self.started = None
+        self._buckets = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server = _ThreadingHTTPServer((host, port), self._handler())
+        self.thread = None
+
+    @property
+    def host(self):
+        return '{}:{}'.format(*self.server.server_address)
+
+    def _random_below(self, rate):
+        if not rate:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    def delay(self):
+        """
+        :return: Seconds the next response is delayed by.
+        """
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    def _over_quota(self, access_key):
+        if self.quota is None:
+            return False
+        with self._lock:
+            bucket = self._buckets.get(access_key)
+            if bucket is None:
+                bucket = self._buckets[access_key] = TokenBucket(self.quota)
+            if bucket.available < 1:
+                return True
+            bucket.reserve()
+            return False
+
+    def _check_signature(self, host, access_key, pairs):
+        signature = None
+        unsigned = []
+        for k, v in pairs:
+            if k == 'Signature':
+                signature = v
+            else:
+                unsigned.append(quote(k) + '=' + quote(v))
+        unsigned.sort()
+        secret_key = self.secret_keys[access_key]
+        expected = parse.unquote(get_signer('', access_key, secret_key, host).signature('&'.join(unsigned)))
+        return signature is not None and compare_digest(signature, expected)
+
+    def respond(self, host, path):
+        """
+        Answer one request.
+
+        :param host: Host the request was sent to, the marketplace it was signed for.
+        :param path: Path and query of the request.
+        :return: (status, body bytes, outcome)
+        """
+        split = parse.urlsplit(path)
+        pairs = parse.parse_qsl(split.query, keep_blank_values=True)
+        params = dict(pairs)
+        operation = params.get('Operation')
+        access_key = params.get('AWSAccessKeyId', '')
+        timestamp = params.get('Timestamp')
+
+        def error(status, code, outcome=ERROR, **kwargs):
+            return status, error_response(operation, code, ERROR_MESSAGES[code].format(**kwargs)), outcome
+
+        if split.path != PATH:
+            return error(404, 'AWS.InvalidPath', path=split.path)
+        if self.secret_keys is not None:
+            missing = [p for p in ('Operation', 'AWSAccessKeyId', 'Timestamp', 'Signature') if not params.get(p)]
+            if missing:
+                return error(400, 'MissingParameter', parameters=', '.join(missing))
+            if access_key not in self.secret_keys:
+                return error(403, 'InvalidClientTokenId', INVALID_KEY)
+            if not self._check_signature(host, access_key, pairs):
+                return error(403, 'SignatureDoesNotMatch', INVALID_SIGNATURE)
+
+        if timestamp:
+            sent = parse_timestamp(timestamp)
+            if sent is None:
+                return error(400, 'AWS.InvalidParameterValue', parameter='Timestamp', value=timestamp)
+            if self.clock() - sent > REQUEST_EXPIRY:
+                return error(400, 'RequestExpired', EXPIRED, timestamp=timestamp)
+        if self._random_below(self.expire_rate):
+            return error(400, 'RequestExpired', EXPIRED, timestamp=timestamp)
+        if self._over_quota(access_key) or self._random_below(self.throttle_rate):
+            return error(503, 'RequestThrottled', THROTTLED, access_key=access_key)
+
+        if self.archive is not None:
+            key = request_key('http://{}{}'.format(self.archive_marketplace or host, path))[0]
+            entry = self.archive.entry(key)
+            if entry is not None:
+                return entry.get('status') or 200, self.archive.get(key), RECORDED
+
+        if operation == 'ItemSearch':
+            try:
+                item_page = int(params.get('ItemPage') or 1)
+            except ValueError:
+                item_page = 0
+            if not 1 <= item_page <= MAX_ITEM_PAGE:
+                return error(400, 'AWS.ParameterOutOfRange', parameter='ItemPage')
+            items = max(0, min(10, self.total_results - (item_page - 1) * 10))
+            body = item_search_response(items=items, item_page=item_page, total_results=self.total_results,
+                                        brand=escape(params.get('Brand') or 'Brand'), seed=item_page)
+            return 200, body, OK
+        if operation == 'ItemLookup':
+            item_ids = [i for i in params.get('ItemId', '').split(',') if i]
+            if not 1 <= len(item_ids) <= MAX_ITEM_IDS:
+                return error(400, 'AWS.ParameterOutOfRange', parameter='ItemId')
+            return 200, item_lookup_response([escape(i) for i in item_ids]), OK
+        return error(400, 'AWS.InvalidOperationParameter', operation=operation)
+
+    def _handler(self):
+        dev_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, body, outcome = dev_server.respond(self.headers.get('Host', dev_server.host), self.path)
+                with dev_server._lock:
+                    dev_server.counts[outcome] += 1
+                delay = dev_server.delay()
+                if delay:
+                    time.sleep(delay)
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/xml;charset=UTF-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        return Handler
+
+    def summary(self):
+        """
+        :return: dict of the number of requests of each outcome, the total number of requests and the requests
+            served per second since the server started.
+        """
+        with self._lock:
+            summary = dict(self.counts)
+        summary['requests'] = sum(self.counts.values())
+        elapsed = time.monotonic() - self.started if self.started is not None else 0
+        summary['requests_per_second'] = summary['requests'] / elapsed if elapsed > 0 else 0.0
+        return summary
+
+    def start(self):
+        """
+        Serve requests from a background thread.
+        """
+        self.started = time.monotonic()
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), name='DevServer',
+                                       daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    # Load tests open many connections at once.
+    request_queue_size = 128
+
+
+def _credentials(value):
+    access_key, sep, secret_key = value.partition(':')
+    if not sep:
+        raise argparse.ArgumentTypeError('Credentials must be given as ACCESS_KEY:SECRET_KEY')
+    return access_key, secret_key
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m aws.devserver', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on.')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on.')
+    parser.add_argument('--credentials', type=_credentials, action='append', metavar='ACCESS_KEY:SECRET_KEY',
+                        help='Credentials requests have to be signed with, can be given several times. '
+                             'Signatures are not checked without any.')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with RequestThrottled.')
+    parser.add_argument('--expire-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with RequestExpired.')
+    parser.add_argument('--quota', type=float, help='Requests per second allowed for each access key.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds every response is delayed by.')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many more seconds of latency.')
+    parser.add_argument('--archive', help='Directory of a response archive to serve recorded responses from.')
+    parser.add_argument('--archive-marketplace', help='Marketplace the archived responses were requested from.')
+    parser.add_argument('--total-results', type=int, default=100, help='Number of results of every ItemSearch.')
+    parser.add_argument('--seed', type=int, help='Seed of the random errors and latencies.')
+    parser.add_argument('--report-interval', type=float, default=10,
+                        help='Seconds between reports of the requests served.')
+    args = parser.parse_args(argv)
+
+    server = DevServer(
+        credentials=dict(args.credentials) if args.credentials else None,
+        host=args.host,
+        port=args.port,
+        throttle_rate=args.throttle_rate,
+        expire_rate=args.expire_rate,
+        latency=args.latency,
+        jitter=args.jitter,
+        quota=args.quota,
+        archive=args.archive,
+        archive_marketplace=args.archive_marketplace,
+        total_results=args.total_results,
+        seed=args.seed,
+    )
+    print('Serving the Product Advertising API on http://{}{}'.format(server.host, PATH))
+    last_requests, last_time = 0, time.monotonic()
+    with server:
+        try:
+            while True:
+                time.sleep(args.report_interval)
+                summary = server.summary()
+                now = time.monotonic()
+                rate = (summary['requests'] - last_requests) / (now - last_time)
+                last_requests, last_time = summary['requests'], now
+                print('{:.1f} requests/s, {}'.format(rate, ', '.join(
+                    '{} {}'.format(k, v) for k, v in sorted(summary.items()) if k != 'requests_per_second')))
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""
+Batched export of parsed items to JSON lines, CSV or Parquet files.
+
+Items are turned into flat rows, see to_row, as they are added, so their trees can be freed right away. Rows are
+buffered and handed to a background thread in batches, which serializes each batch with a single write and
+starts a new file once the current one is larger than `max_file_size`. Ex
+
+    with BatchExporter('exports', format='csv') as exporter:
+        for response in responses:
+            exporter.add_all(response.items.items)
+
+Parquet files need pyarrow.
+"""
+import csv
+import io
+import json
+import logging
+import os
+import queue
+import re
+import threading
+
+from .parsers.records import ItemRecord
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ItemRecord.__slots__
+INT_FIELDS = frozenset(['sales_rank', 'price', 'lowest_new_price', 'lowest_used_price', 'total_new', 'total_used'])
+
+# Sentinel asking the writer thread to stop.
+_CLOSE = object()
+
+
+def to_row(item):
+    """
+    :param item: Item, ItemRecord, or a dict or scrapy Item of the fields.
+    :return: dict of field name to value.
+    """
+    if isinstance(item, ItemRecord):
+        return item.as_dict()
+    if hasattr(item, 'to_record'):
+        return item.to_record().as_dict()
+    return dict(item)
+
+
+class JsonLinesWriter(object):
+    extension = 'jsonl'
+
+    def __init__(self, path, fields):
+        self.fields = fields
+        self.file = open(path, 'w', encoding='utf-8')
+
+    @property
+    def size(self):
+        return self.file.tell()
+
+    def write_rows(self, rows):
+        fields = self.fields
+        self.file.write(''.join(json.dumps({k: row.get(k) for k in fields}) + '\n' for row in rows))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class CsvWriter(object):
+    extension = 'csv'
+
+    def __init__(self, path, fields):
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.DictWriter(self.file, fields, extrasaction='ignore')
+        self.writer.writeheader()
+
+    @property
+    def size(self):
+        return self.file.tell()
+
+    def write_rows(self, rows):
+        # Rows are formatted in memory first so the batch goes to the file in a single write.
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, self.writer.fieldnames, extrasaction='ignore').writerows(rows)
+        self.file.write(buffer.getvalue())
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter(object):
+    """
+    Writes every batch as a row group. Fields in INT_FIELDS are int64 columns, the others strings.
+    """
+    extension = 'parquet'
+
+    def __init__(self, path, fields):
+        if pyarrow is None:
+            raise ImportError('pyarrow is required to export to Parquet')
+        self.fields = fields
+        self.schema = pyarrow.schema([(k, pyarrow.int64() if k in INT_FIELDS else pyarrow.string()) for k in fields])
+        self.file = open(path, 'wb')
+        self.writer = pyarrow.parquet.ParquetWriter(self.file, self.schema)
+
+    @property
+    def size(self):
+        return self.file.tell()
+
+    def write_rows(self, rows):
+        columns = {k: [row.get(k) for row in rows] for k in self.fields}
+        self.writer.write_table(pyarrow.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+        self.file.close()
+
+
+WRITERS = {w.extension: w for w in (JsonLinesWriter, CsvWriter, ParquetWriter)}
+
+
+class BatchExporter(object):
+
+    def __init__(self, directory, format='jsonl', prefix='items', fields=FIELDS, batch_size=1000,
+                 max_file_size=256 * 1024 * 1024, max_pending=4):
+        """
+
+        :param directory: Directory the files are written to. Files already in it are kept, numbering continues
+            after them.
+        :param format: One of WRITERS, jsonl, csv or parquet.
+        :param prefix: Files are named <prefix>-00001.<format>.
+        :param fields: Fields of the rows which are exported, in order. Defaults to the ItemRecord fields.
+        :param batch_size: Number of rows written at once.
+        :param max_file_size: Size in bytes after which a new file is started.
+        :param max_pending: Number of batches waiting to be written after which add blocks.
+        """
+        if format not in WRITERS:
+            raise ValueError('format must be one of {}, got {}'.format(', '.join(sorted(WRITERS)), format))
+        self.writer_class = WRITERS[format]
+        if self.writer_class is ParquetWriter and pyarrow is None:
+            raise ImportError('pyarrow is required to export to Parquet')
+        self.directory = directory
+        self.prefix = prefix
+        self.fields = tuple(fields)
+        self.batch_size = batch_size
+        self.max_file_size = max_file_size
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.files = []
+        self.rows = 0
+        self.error = None
+        self._buffer = []
+        self._writer = None
+        self._file_number = self._last_file_number()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._thread = threading.Thread(target=self._write_loop, name='BatchExporter', daemon=True)
+        self._thread.start()
+
+    def _file_name(self, number):
+        return '{}-{:05d}.{}'.format(self.prefix, number, self.writer_class.extension)
+
+    def _last_file_number(self):
+        pattern = re.compile(r'^{}-(\d+)\.{}$'.format(re.escape(self.prefix), re.escape(self.writer_class.extension)))
+        numbers = [int(m.group(1)) for m in map(pattern.match, os.listdir(self.directory)) if m]
+        return max(numbers) if numbers else 0
+
+    def add(self, item):
+        """
+        Buffer one item, see to_row. Only blocks if the writer is more than max_pending batches behind.
+        """
+        if self._closed:
+            raise ValueError('Exporter is closed')
+        self._buffer.append(to_row(item))
+        if len(self._buffer) >= self.batch_size:
+            self._submit()
+
+    def add_all(self, items):
+        for item in items:
+            self.add(item)
+
+    def _submit(self):
+        if self._buffer:
+            batch, self._buffer = self._buffer, []
+            self._queue.put(batch)
+
+    def _write_loop(self):
+        while True:
+            batch = self._queue.get()
+            try:
+                if batch is _CLOSE:
+                    self._close_file()
+                    return
+                self._write(batch)
+            except Exception as e:
+                logger.exception('Could not export rows')
+                self.error = self.error or e
+            finally:
+                self._queue.task_done()
+
+    def _write(self, batch):
+        if self._writer is None or self._writer.size >= self.max_file_size:
+            self._close_file()
+            self._file_number += 1
+            path = os.path.join(self.directory, self._file_name(self._file_number))
+            self._writer = self.writer_class(path, self.fields)
+            self.files.append(path)
+        self._writer.write_rows(batch)
+        self.rows += len(batch)
+
+    def _close_file(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _raise_for_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def flush(self):
+        """
+        Write the buffered rows and wait until every batch is written.
+
+        :raises: The first exception the writer thread ran into.
+        """
+        self._submit()
+        self._queue.join()
+        self._raise_for_error()
+
+    def close(self):
+        """
+        Write the buffered rows and close the current file.
+
+        :raises: The first exception the writer thread ran into.
+        """
+        if self._closed:
+            return
+        self._submit()
+        self._closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        self._raise_for_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,97 @@
+"""
+Send the same lookup or search to several marketplaces at once.
+
+Every marketplace has its own quota, so each one gets its own client with its own rate bucket and connection
+pool, and the requests to different marketplaces run in parallel. Ex
+
+    fan_out = MarketplaceFanOut(Lookup, associate_tags, access_key, secret_key, ['us', 'uk', 'de'], rate_limit=1)
+    contents = fan_out.call('item_lookup', ['B005BPZFAO'], response_groups=['OfferSummary'])
+    # {'us': '<ItemLookupResponse ...', 'uk': '<ItemLookupResponse ...', 'de': RequestThrottledError(...)}
+"""
+import asyncio
+import inspect
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from ._aws import MARKETPLACES
+
+
+class MarketplaceFanOut(object):
+
+    def __init__(self, client_class, associate_tag, access_key, secret_key, marketplaces=None, **kwargs):
+        """
+
+        :param client_class: Search, Lookup or any other AWS subclass.
+        :param associate_tag: Associate tag, or dict of marketplace to associate tag since Associates are
+            registered per locale.
+        :param access_key: Your AWS Access Key ID which uniquely identifies you.
+        :param secret_key: A key that is used in conjunction with the Access Key ID
+            to cryptographically sign an API request.
+        :param marketplaces: Marketplaces to send requests to, either keys of MARKETPLACES or hosts. Defaults to
+            every marketplace in MARKETPLACES.
+        :param kwargs: Passed to every client, Ex rate_limit, cache. rate_limit applies to each marketplace.
+        """
+        marketplaces = marketplaces or sorted(MARKETPLACES)
+        self.clients = OrderedDict()
+        for marketplace in marketplaces:
+            tag = associate_tag.get(marketplace) if isinstance(associate_tag, dict) else associate_tag
+            self.clients[marketplace] = client_class(tag, access_key, secret_key,
+                                                     marketplace=MARKETPLACES.get(marketplace, marketplace), **kwargs)
+
+    @property
+    def marketplaces(self):
+        return list(self.clients)
+
+    def call(self, method, *args, **kwargs):
+        """
+        Call a client method on every marketplace in parallel.
+
+        :param method: Name of the client method, Ex 'item_lookup'.
+        :param args: Positional args of the method.
+        :param kwargs: Keyword args of the method.
+        :return: OrderedDict of marketplace to what the method returned, or to the exception it raised. Methods
+            returning generators, Ex bulk_item_lookup, are run to completion and give a list.
+        """
+        with ThreadPoolExecutor(max_workers=len(self.clients)) as executor:
+            futures = OrderedDict(
+                (marketplace, executor.submit(self._call, client, method, args, kwargs))
+                for marketplace, client in self.clients.items()
+            )
+            results = OrderedDict()
+            for marketplace, future in futures.items():
+                try:
+                    results[marketplace] = future.result()
+                except Exception as e:
+                    results[marketplace] = e
+            return results
+
+    @staticmethod
+    def _call(client, method, args, kwargs):
+        result = getattr(client, method)(*args, **kwargs)
+        if inspect.isgenerator(result):
+            result = list(result)
+        return result
+
+
+class AsyncMarketplaceFanOut(MarketplaceFanOut):
+    """
+    MarketplaceFanOut of AsyncSearch or AsyncLookup clients. Marketplace hosts each get their own shared
+    aiohttp session, so their own connection pool.
+    """
+
+    async def call(self, method, *args, **kwargs):
+        """
+        Coroutine version of MarketplaceFanOut.call. Methods returning async generators give a list.
+        """
+        results = await asyncio.gather(
+            *[self._call(client, method, args, kwargs) for client in self.clients.values()],
+            return_exceptions=True
+        )
+        return OrderedDict(zip(self.clients, results))
+
+    @staticmethod
+    async def _call(client, method, args, kwargs):
+        result = getattr(client, method)(*args, **kwargs)
+        if inspect.isasyncgen(result):
+            return [x async for x in result]
+        return await result
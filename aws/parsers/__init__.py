@@ -2,3 +2,5 @@ from .itemsearch import ItemSearchResponse, SearchBinSet
 from .errors import RequestThrottledError, SignatureDoesNotMatchError
 from .api_response import ApiResponse
 from.item_lookup import ItemLookupResponse
+from .records import ItemRecord
+from .columns import responses_to_columns
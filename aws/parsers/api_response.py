@@ -3,7 +3,8 @@ from __future__ import unicode_literals
 from collections import namedtuple
 
 from .base import BaseElementWrapper, OperationRequest, Items, Bin
-from .helpers import first_element, load_into
+from .helpers import first_element, load_into, memoized_property
+from .columns import responses_to_columns
 
 ITEM_SEARCH_NAMESPACES = {
     'a': 'http://webservices.amazon.com/AWSECommerceService/2011-08-01'
@@ -11,16 +12,27 @@ ITEM_SEARCH_NAMESPACES = {
 
 
 class ApiResponse(BaseElementWrapper):
+    __slots__ = ()
+
     namespaces = ITEM_SEARCH_NAMESPACES
 
-    @property
+    @memoized_property
     @load_into(OperationRequest)
     @first_element
     def operation_request(self):
         return self.xpath('./a:OperationRequest')
 
-    @property
+    @memoized_property
     @load_into(Items)
     @first_element
     def items(self):
         return self.xpath('./a:Items')
+
+    def to_columns(self, use_numpy=None):
+        """
+        Extract the items of the response into typed columns, see aws.parsers.columns.
+
+        :param use_numpy: Force NumPy arrays on or off. Defaults to using NumPy when it is installed.
+        :return: dict of field name to Column(values, mask).
+        """
+        return responses_to_columns([self], use_numpy=use_numpy)
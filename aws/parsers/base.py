@@ -1,11 +1,12 @@
-from functools import partial
 from collections import namedtuple
+from functools import lru_cache
 import warnings
-import re
+import inspect
 
 from lxml import etree
 
-from .helpers import first_element, load_into, parse_bool
+from .helpers import first_element, load_into, parse_bool, memoized_property
+from .records import ItemRecord
 
 
 ITEM_SEARCH_NAMESPACES = {
@@ -17,20 +18,52 @@ class XMLWarning(Warning):
     pass
 
 
+@lru_cache(maxsize=1024)
+def _compile_xpath(path, namespaces):
+    return etree.XPath(path, namespaces=dict(namespaces))
+
+
+def compile_xpath(path, namespaces):
+    """
+    Get the compiled XPath for a path, compiling it on first use.
+
+    Cached by path and namespace mapping, so equal namespace dicts share the compiled expression. The cache is
+    bounded in case expressions are built from data.
+    :param path: XPath expression. Use XPath variables ($name) instead of formatting values into the string.
+    :param namespaces: Prefix to namespace mapping used in the expression.
+    :return: etree.XPath
+    """
+    return _compile_xpath(path, tuple(sorted(namespaces.items())))
+
+
 class BaseElementWrapper(object):
+    # Subclasses declare empty __slots__ so wrappers stay small and never get a __dict__.
+    __slots__ = ('element', '_namespaces', '_cache')
 
     namespaces = ITEM_SEARCH_NAMESPACES
+    # Set to False (or pass validate=False) to skip document validation on hot paths.
+    validate = True
 
     def __init__(self, element, *args, **kwargs):
         self.element = element
-        if kwargs.get('namespaces'):
-            self.namespaces = kwargs['namespaces']
-        if element is None:
-            self.xpath = lambda *args, **kwargs: None
-        else:
-            self.xpath = partial(self.element.xpath, namespaces=self.namespaces)
+        self._namespaces = kwargs.get('namespaces') or self.namespaces
+        # Values of memoized properties, created on first use.
+        self._cache = None
+        if element is not None and kwargs.get('validate', self.validate):
             self._element_validation()
 
+    def xpath(self, path, **variables):
+        """
+        Evaluate an XPath expression against the element.
+
+        :param path: XPath expression, compiled once and reused by every wrapper.
+        :param variables: Values for XPath variables in the expression.
+        :return: XPath result or None when there is no element.
+        """
+        if self.element is None:
+            return None
+        return compile_xpath(path, self._namespaces)(self.element, **variables)
+
     def __nonzero__(self):
         return self.element is not None
 
@@ -41,8 +74,11 @@ class BaseElementWrapper(object):
         self._warn_if_no_namespace()
 
     def _warn_if_no_namespace(self):
-        s = etree.tostring(self.element)
-        if not re.findall(br'\sxmlns=\".*?\"', s):
+        # Only the root is checked so each document is validated once, no matter how many
+        # wrappers are built from its children.
+        if self.element.getparent() is not None:
+            return
+        if None not in self.element.nsmap:
             warnings.warn('Document is missing a namespace. Parsers may not behave as expected.', category=XMLWarning)
 
     def to_string(self):
@@ -55,41 +91,41 @@ class BaseElementWrapper(object):
 
 
 class ErrorElement(BaseElementWrapper):
+    __slots__ = ()
 
-    def __init__(self, element, *args, **kwargs):
-        self.namespaces = kwargs.pop('namespaces', {})
-        super(ErrorElement, self).__init__(element)
+    namespaces = {}
 
-    @property
+    @memoized_property
     @first_element
     def code(self):
         return self.xpath('./a:Code/text()')
 
-    @property
+    @memoized_property
     @first_element
     def message(self):
         return self.xpath('./a:Message/text()')
 
 
 class ItemSearchErrorResponse(BaseElementWrapper):
+    __slots__ = ()
 
     namespaces = {
         'a': 'http://ecs.amazonaws.com/doc/2005-10-05/'
     }
 
-    @property
+    @memoized_property
     @first_element
     def request_id(self):
         return self.xpath('./a:RequestID/text()')
 
-    @property
+    @memoized_property
     @first_element
     def _error(self):
         return self.xpath('./a:Error')
 
-    @property
+    @memoized_property
     def error(self):
-        return ErrorElement(self._error, namespaces=self.namespaces)
+        return ErrorElement(self._error, namespaces=self._namespaces)
 
     def raise_for_error(self):
         # Prevent issues with recursive imports
@@ -106,11 +142,19 @@ class ItemSearchErrorResponse(BaseElementWrapper):
 
 
 def raise_error_for_content(f):
-    def inner(*args, **kwargs):
-        content = f(*args, **kwargs)
+    def check(content):
         potential_err = ItemSearchErrorResponse.from_string(content)
         potential_err.raise_for_error()
         return content
+
+    def inner(*args, **kwargs):
+        content = f(*args, **kwargs)
+        if inspect.isawaitable(content):
+            # Coroutine based clients hand back the pending request, check it once it resolves.
+            async def wait_for_content():
+                return check(await content)
+            return wait_for_content()
+        return check(content)
     return inner
 
 
@@ -121,16 +165,18 @@ class KeyValuePair(BaseElementWrapper):
         Header
         Argument
     """
+    __slots__ = ()
+
     namespaces = ITEM_SEARCH_NAMESPACES
 
     KeyValue = namedtuple('KeyValue', ['key', 'value'])
 
-    @property
+    @memoized_property
     @first_element
     def name(self):
         return self.xpath('./@Name')
 
-    @property
+    @memoized_property
     @first_element
     def value(self):
         return self.xpath('./@Value')
@@ -149,85 +195,90 @@ class KeyValuePair(BaseElementWrapper):
 
 
 class CurrencyElement(BaseElementWrapper):
+    __slots__ = ()
 
-    @property
+    @memoized_property
     @first_element
     def amount(self):
         return self.xpath('./a:Amount/text()')
 
-    @property
+    @memoized_property
     @first_element
     def currency_code(self):
         return self.xpath('./a:CurrencyCode/text()')
 
-    @property
+    @memoized_property
     @first_element
     def formatted_price(self):
         return self.xpath('./a:FormattedPrice/text()')
 
 
 class OfferSummary(BaseElementWrapper):
+    __slots__ = ()
+
     namespaces = ITEM_SEARCH_NAMESPACES
 
-    @property
+    @memoized_property
     @load_into(CurrencyElement, namespaces=namespaces)
     @first_element
     def lowest_new_price(self):
         return self.xpath('./a:LowestNewPrice')
 
-    @property
+    @memoized_property
     @load_into(CurrencyElement, namespaces=namespaces)
     @first_element
     def lowest_used_price(self):
         return self.xpath('./a:LowestUsedPrice')
 
-    @property
+    @memoized_property
     @first_element
     def total_new(self):
         return self.xpath('./a:TotalNew/text()')
 
-    @property
+    @memoized_property
     @first_element
     def total_used(self):
         return self.xpath('./a:TotalUsed/text()')
 
-    @property
+    @memoized_property
     @first_element
     def total_collectible(self):
         return self.xpath('./a:TotalCollectible/text()')
 
-    @property
+    @memoized_property
     @first_element
     def total_refurbished(self):
         return self.xpath('./a:TotalRefurbished/text()')
 
 
 class OfferListing(BaseElementWrapper):
+    __slots__ = ()
+
     namespaces = ITEM_SEARCH_NAMESPACES
 
-    @property
+    @memoized_property
     @first_element
     def offer_listing_id(self):
         return self.xpath('./a:OfferListingId/text()')
 
-    @property
+    @memoized_property
     @load_into(CurrencyElement, namespaces=namespaces)
     @first_element
     def price(self):
         return self.xpath('./a:Price')
 
-    @property
+    @memoized_property
     @load_into(CurrencyElement, namespaces=namespaces)
     @first_element
     def amount_saved(self):
         return self.xpath('./a:AmountSaved')
 
-    @property
+    @memoized_property
     @first_element
     def percentage_saved(self):
         return self.xpath('./a:PercentageSaved/text()')
 
-    @property
+    @memoized_property
     @first_element
     def availability(self):
         return self.xpath('./a:Availability/text()')
@@ -238,59 +289,62 @@ class OfferListing(BaseElementWrapper):
 
 
 class Image(BaseElementWrapper):
+    __slots__ = ()
+
     namespaces = ITEM_SEARCH_NAMESPACES
 
-    @property
+    @memoized_property
     @first_element
     def url(self):
         return self.xpath('./a:URL/text()')
 
-    @property
+    @memoized_property
     @first_element
     def height(self):
         return self.xpath('./a:Height/text()')
 
-    @property
+    @memoized_property
     @first_element
     def width(self):
         return self.xpath('./a:Width/text()')
 
 
 class ImageSet(BaseElementWrapper):
+    __slots__ = ()
 
     namespaces = ITEM_SEARCH_NAMESPACES
 
-    @property
+    @memoized_property
     @load_into(Image)
     @first_element
     def swatch_image(self):
         return self.xpath('./a:SwatchImage')
 
-    @property
+    @memoized_property
     @load_into(Image)
     @first_element
     def small_image(self):
         return self.xpath('./a:SmallImage')
 
-    @property
+    @memoized_property
     @load_into(Image)
     @first_element
     def thumbnail_image(self):
         return self.xpath('./a:ThumbnailImage')
 
-    @property
+    @memoized_property
     @load_into(Image)
     @first_element
     def tiny_image(self):
         return self.xpath('./a:TinyImage')
 
-    @property
+    @memoized_property
     @load_into(Image)
     @first_element
     def medium_image(self):
         return self.xpath('./a:MediumImage')
 
-    @property
+    @memoized_property
     @load_into(Image)
     @first_element
     def large_image(self):
@@ -302,188 +356,197 @@ class Offer(BaseElementWrapper):
     Offer has been condensed to "flatten" the xml. Amazon still retains the old layout even though they
     will only ever bring at most 1 offer back. So by condensing this it saves a lot of development time.
     """
+    __slots__ = ()
+
     namespaces = ITEM_SEARCH_NAMESPACES
 
-    @property
+    @memoized_property
     @first_element
     def merchant(self):
         return self.xpath('./a:Merchant/a:Name/text()')
 
-    @property
+    @memoized_property
     @first_element
     def condition(self):
         return self.xpath('./a:OfferAttributes/a:Condition/text()')
 
-    @property
+    @memoized_property
     @load_into(OfferListing)
     @first_element
     def _offer(self):
         return self.xpath('./a:OfferListing')
 
-    @property
+    @memoized_property
     def price(self):
         return self._offer.price
 
-    @property
+    @memoized_property
     def amount_saved(self):
         return self._offer.amount_saved
 
-    @property
+    @memoized_property
     def percentage_saved(self):
         return self._offer.percentage_saved
 
-    @property
+    @memoized_property
     def availability(self):
         return self._offer.availability
 
 
 class OperationRequest(BaseElementWrapper):
+    __slots__ = ()
+
     namespaces = ITEM_SEARCH_NAMESPACES
 
-    @property
+    @memoized_property
     def http_headers(self):
         return [KeyValuePair(x).as_tuple() for x in self.xpath('./a:HTTPHeaders//a:Header')]
 
-    @property
+    @memoized_property
     @first_element
     def request_id(self):
         return self.xpath('./a:RequestId/text()')
 
-    @property
+    @memoized_property
     def arguments(self):
         return [KeyValuePair(x).as_tuple() for x in self.xpath('./a:Arguments//a:Argument')]
 
-    @property
+    @memoized_property
     @first_element
     def request_processing_time(self):
         return self.xpath('./a:RequestProcessingTime/text()')
 
 
 class ItemSearchRequest(BaseElementWrapper):
+    __slots__ = ()
+
     namespaces = ITEM_SEARCH_NAMESPACES
 
-    @property
+    @memoized_property
     @first_element
     def brand(self):
         return self.xpath('./a:Brand/text()')
 
-    @property
+    @memoized_property
     @first_element
     def item_page(self):
         return self.xpath('./a:ItemPage/text()')
 
-    @property
+    @memoized_property
     def response_groups(self):
         return self.xpath('.//a:ResponseGroup/text()')
 
-    @property
+    @memoized_property
     @first_element
     def search_index(self):
         return self.xpath('./a:SearchIndex/text()')
 
 
 class Request(BaseElementWrapper):
+    __slots__ = ()
 
     namespaces = ITEM_SEARCH_NAMESPACES
 
-    @property
+    @memoized_property
     @parse_bool
     @first_element
     def is_valid(self):
         return self.xpath('./a:IsValid/text()')
 
-    @property
+    @memoized_property
     @load_into(ItemSearchRequest)
     @first_element
     def item_search_request(self):
         return self.xpath('./a:ItemSearchRequest')
 
-    @property
+    @memoized_property
     @load_into(ErrorElement, namespaces=namespaces)
     def errors(self):
         return self.xpath('./a:Errors//a:Error')
 
 
 class ItemAttributes(BaseElementWrapper):
+    __slots__ = ()
 
     namespaces = ITEM_SEARCH_NAMESPACES
 
-    @property
+    @memoized_property
     @first_element
     def brand(self):
         return self.xpath('./a:Brand/text()')
 
-    @property
+    @memoized_property
     @first_element
     def manufacturer(self):
         return self.xpath('./a:Manufacturer/text()')
 
-    @property
+    @memoized_property
     @first_element
     def title(self):
         return self.xpath('./a:Title/text()')
 
-    @property
+    @memoized_property
     @first_element
     def color(self):
         return self.xpath('./a:Color/text()')
 
-    @property
+    @memoized_property
     @first_element
     def label(self):
         return self.xpath('./a:Label/text()')
 
-    @property
+    @memoized_property
     @first_element
     def publisher(self):
         return self.xpath('./a:Publisher/text()')
 
 
 class Item(BaseElementWrapper):
+    __slots__ = ()
 
     namespaces = ITEM_SEARCH_NAMESPACES
 
-    @property
+    @memoized_property
     @first_element
     def asin(self):
         return self.xpath('./a:ASIN/text()')
 
-    @property
+    @memoized_property
     @first_element
     def sales_rank(self):
         return self.xpath('./a:SalesRank/text()')
 
-    @property
+    @memoized_property
     @load_into(ItemAttributes)
     @first_element
     def item_attributes(self):
         return self.xpath('./a:ItemAttributes')
 
-    @property
+    @memoized_property
     @load_into(Offer)
     @first_element
     def offer(self):
         return self.xpath('./a:Offers/a:Offer')
 
-    @property
+    @memoized_property
     @load_into(OfferSummary)
     @first_element
     def offer_summary(self):
         return self.xpath('./a:OfferSummary')
 
-    @property
+    @memoized_property
     @load_into(Image)
     @first_element
     def small_image(self):
         return self.xpath('./a:SmallImage')
 
-    @property
+    @memoized_property
     @load_into(Image)
     @first_element
     def medium_image(self):
         return self.xpath('./a:MediumImage')
 
-    @property
+    @memoized_property
     @load_into(Image)
     @first_element
     def large_image(self):
@@ -492,16 +555,24 @@ class Item(BaseElementWrapper):
     @load_into(ImageSet)
     @first_element
     def image_set(self, category):
-        return self.xpath('./a:ImageSets/a:ImageSet[@Category="{}"]'.format(category))
+        return self.xpath('./a:ImageSets/a:ImageSet[@Category=$category]', category=category)
 
-    @property
+    @memoized_property
     def image_set_variant(self):
         return self.image_set('variant')
 
-    @property
+    @memoized_property
     def image_set_primary(self):
         return self.image_set('primary')
 
+    def to_record(self):
+        """
+        Extract the commonly used fields in a single pass over the item.
+
+        :return: ItemRecord which does not reference the tree.
+        """
+        return ItemRecord.from_element(self.element)
+
     def __unicode__(self):
         return self.asin
 
@@ -513,68 +584,95 @@ class Item(BaseElementWrapper):
 
 
 class Items(BaseElementWrapper):
+    __slots__ = ()
 
     namespaces = ITEM_SEARCH_NAMESPACES
 
-    @property
+    @memoized_property
     @load_into(Request)
     @first_element
     def request(self):
         return self.xpath('./a:Request')
 
-    @property
+    @memoized_property
     @first_element
     def total_results(self):
         return self.xpath('./a:TotalResults/text()')
 
-    @property
+    @memoized_property
     @first_element
     def total_pages(self):
         return self.xpath('./a:TotalPages/text()')
 
-    @property
+    @memoized_property
     @first_element
     def more_search_results_url(self):
         return self.xpath('./a:MoreSearchResultsUrl/text()')
 
-    @property
+    @memoized_property
     def items(self):
         return [Item(x) for x in self.xpath('.//a:Item')]
 
+    def records(self, clear=False):
+        """
+        Generate an ItemRecord for every item without building Item wrappers.
+
+        :param clear: Clear each <Item> subtree once its record is built so its memory can be freed while
+            the rest of the response is still being read.
+        :return: Generator of ItemRecord.
+        """
+        for element in self.xpath('.//a:Item') or ():
+            yield ItemRecord.from_element(element)
+            if clear:
+                element.clear()
+
 
 class BinParameter(KeyValuePair):
+    __slots__ = ()
+
     namespaces = ITEM_SEARCH_NAMESPACES
 
-    @property
+    @memoized_property
     @first_element
     def name(self):
         return self.xpath('./a:Name/text()')
 
-    @property
+    @memoized_property
     @first_element
     def value(self):
         return self.xpath('./a:Value/text()')
 
 
 class Bin(BaseElementWrapper):
+    __slots__ = ()
+
     namespaces = ITEM_SEARCH_NAMESPACES
 
-    @property
+    @memoized_property
     @first_element
     def bin_name(self):
         return self.xpath('./a:BinName/text()')
 
-    @property
+    @memoized_property
     @first_element
     def bin_item_count(self):
         return self.xpath('./a:BinItemCount/text()')
 
-    @property
+    @memoized_property
     @load_into(BinParameter)
     @first_element
     def bin_parameter(self):
         return self.xpath('./a:BinParameter')
 
+    @memoized_property
+    @load_into(BinParameter)
+    def bin_parameters(self):
+        """
+        Every parameter narrowing the search to this bin. PriceRange bins have both a MinimumPrice and a
+        MaximumPrice.
+        """
+        return self.xpath('./a:BinParameter') or []
+
     def __unicode__(self):
         return self.bin_name
 
@@ -590,6 +688,4 @@ class Bin(BaseElementWrapper):
         )
 
     def as_request_params(self):
-        return {
-            self.bin_parameter.name: self.bin_parameter.value
-        }
\ No newline at end of file
+        return {p.name: p.value for p in self.bin_parameters}
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""
+Columnar extraction of search and lookup responses for vectorized analytics.
+
+Columns are NumPy arrays when NumPy is installed, otherwise integer columns are `array.array` and text columns
+are lists. Every column comes with a mask which is True where the item did not have a value.
+"""
+import array
+from collections import namedtuple
+from itertools import chain
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+Column = namedtuple('Column', ['values', 'mask'])
+
+TEXT_COLUMNS = ('asin',)
+INT_COLUMNS = ('sales_rank', 'lowest_new_price', 'lowest_used_price', 'total_new', 'total_used')
+COLUMNS = TEXT_COLUMNS + INT_COLUMNS
+
+
+def _column(values, integer, use_numpy):
+    mask = [x is None for x in values]
+    if integer:
+        values = [0 if x is None else x for x in values]
+    else:
+        values = ['' if x is None else x for x in values]
+    if use_numpy:
+        return Column(numpy.array(values, dtype=numpy.int64 if integer else str), numpy.array(mask, dtype=bool))
+    return Column(array.array('q', values) if integer else values, array.array('b', mask))
+
+
+def records_to_columns(records, use_numpy=None):
+    """
+    Turn ItemRecords into one Column per field.
+
+    :param records: Iterable of ItemRecord.
+    :param use_numpy: Force NumPy arrays on or off. Defaults to using NumPy when it is installed.
+    :return: dict of field name to Column. Null values are stored as 0 or '' and flagged in the mask.
+    """
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    elif use_numpy and numpy is None:
+        raise ImportError('NumPy is required for use_numpy=True')
+    values = {name: [] for name in COLUMNS}
+    for record in records:
+        for name in COLUMNS:
+            values[name].append(getattr(record, name))
+    columns = {name: _column(values[name], False, use_numpy) for name in TEXT_COLUMNS}
+    columns.update({name: _column(values[name], True, use_numpy) for name in INT_COLUMNS})
+    return columns
+
+
+def responses_to_columns(responses, use_numpy=None):
+    """
+    Concatenate the items of many responses into a single set of columns.
+
+    :param responses: Iterable of ItemSearchResponse or ItemLookupResponse.
+    :param use_numpy: Force NumPy arrays on or off. Defaults to using NumPy when it is installed.
+    :return: dict of field name to Column.
+    """
+    return records_to_columns(chain.from_iterable(r.items.records() for r in responses), use_numpy=use_numpy)
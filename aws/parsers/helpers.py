@@ -51,4 +51,29 @@ def load_into(element_wrapper, *args, **kwargs):
             return element_wrapper(r, *args, **kwargs)
 
         return inner
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+
+class memoized_property(object):
+    """
+    Property which is computed on first access and then served from the instance `_cache` dict.
+
+    Wrappers are read only views of an immutable tree, so a value never has to be computed twice. The cache
+    lives in a slot instead of __dict__ so it works with BaseElementWrapper.__slots__.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.__doc__ = f.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        cache = instance._cache
+        if cache is None:
+            cache = instance._cache = {}
+        try:
+            return cache[self]
+        except KeyError:
+            value = cache[self] = self.f(instance)
+            return value
@@ -5,4 +5,4 @@ from .api_response import ApiResponse
 
 
 class ItemLookupResponse(ApiResponse, BaseElementWrapper):
-    pass
+    __slots__ = ()
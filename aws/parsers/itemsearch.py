@@ -18,10 +18,11 @@ class SearchBinSet(object):
 
 
 class ItemSearchResponse(ApiResponse, BaseElementWrapper):
+    __slots__ = ()
+
     @load_into(Bin)
     def search_bins(self, narrow_by=None):
         if narrow_by is not None:
-            xpath = './a:Items/a:SearchBinSets/a:SearchBinSet[@NarrowBy="{}"]//a:Bin'.format(narrow_by)
-        else:
-            xpath = './a:Items/a:SearchBinSets/a:SearchBinSet//a:Bin'
-        return self.xpath(xpath)
+            return self.xpath('./a:Items/a:SearchBinSets/a:SearchBinSet[@NarrowBy=$narrow_by]//a:Bin',
+                              narrow_by=narrow_by)
+        return self.xpath('./a:Items/a:SearchBinSets/a:SearchBinSet//a:Bin')
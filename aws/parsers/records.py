@@ -0,0 +1,131 @@
+"""
+Compact, tree free records extracted from <Item> elements in a single pass.
+"""
+
+
+def _local_name(element):
+    tag = element.tag
+    if not isinstance(tag, str):
+        # Comments and processing instructions.
+        return None
+    return tag[tag.find('}') + 1:]
+
+
+def _child_text(element, name):
+    for child in element:
+        if _local_name(child) == name:
+            return child.text
+    return None
+
+
+def _to_int(value):
+    if value is None:
+        return None
+    try:
+        return int(value.strip())
+    except ValueError:
+        return None
+
+
+class ItemRecord(object):
+    """
+    Flat copy of the commonly used fields of an Item.
+
+    Prices are integers in the smallest currency unit (cents for USD), exactly as Amazon sends them. A record
+    holds plain Python values only, so the tree it came from can be freed as soon as it is built.
+    """
+    __slots__ = ('asin', 'sales_rank', 'title', 'brand', 'manufacturer', 'price', 'currency_code',
+                 'lowest_new_price', 'lowest_used_price', 'total_new', 'total_used', 'small_image_url',
+                 'medium_image_url', 'large_image_url')
+
+    def __init__(self, **kwargs):
+        for field in self.__slots__:
+            setattr(self, field, kwargs.get(field))
+
+    @classmethod
+    def from_element(cls, element):
+        """
+        Build a record from an <Item> element, visiting each element of interest once.
+        """
+        record = cls()
+        for child in element:
+            handler = _ITEM_HANDLERS.get(_local_name(child))
+            if handler is not None:
+                handler(record, child)
+        return record
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __eq__(self, other):
+        if not isinstance(other, ItemRecord):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        return '<{} asin={}>'.format(self.__class__.__name__, self.asin)
+
+
+def _item_attributes(record, element):
+    for child in element:
+        name = _local_name(child)
+        if name == 'Title':
+            record.title = child.text
+        elif name == 'Brand':
+            record.brand = child.text
+        elif name == 'Manufacturer':
+            record.manufacturer = child.text
+
+
+def _offer_summary(record, element):
+    for child in element:
+        name = _local_name(child)
+        if name == 'LowestNewPrice':
+            record.lowest_new_price = _to_int(_child_text(child, 'Amount'))
+            record.currency_code = record.currency_code or _child_text(child, 'CurrencyCode')
+        elif name == 'LowestUsedPrice':
+            record.lowest_used_price = _to_int(_child_text(child, 'Amount'))
+            record.currency_code = record.currency_code or _child_text(child, 'CurrencyCode')
+        elif name == 'TotalNew':
+            record.total_new = _to_int(child.text)
+        elif name == 'TotalUsed':
+            record.total_used = _to_int(child.text)
+
+
+def _offers(record, element):
+    # Offers/Offer/OfferListing/Price, Amazon only ever returns a single offer.
+    for offer in element:
+        if _local_name(offer) != 'Offer':
+            continue
+        for listing in offer:
+            if _local_name(listing) != 'OfferListing':
+                continue
+            for child in listing:
+                if _local_name(child) == 'Price':
+                    record.price = _to_int(_child_text(child, 'Amount'))
+                    record.currency_code = record.currency_code or _child_text(child, 'CurrencyCode')
+                    return
+
+
+def _image(field):
+    def handler(record, element):
+        setattr(record, field, _child_text(element, 'URL'))
+    return handler
+
+
+def _set_text(field, convert=None):
+    def handler(record, element):
+        setattr(record, field, convert(element.text) if convert else element.text)
+    return handler
+
+
+_ITEM_HANDLERS = {
+    'ASIN': _set_text('asin'),
+    'SalesRank': _set_text('sales_rank', _to_int),
+    'ItemAttributes': _item_attributes,
+    'OfferSummary': _offer_summary,
+    'Offers': _offers,
+    'SmallImage': _image('small_image_url'),
+    'MediumImage': _image('medium_image_url'),
+    'LargeImage': _image('large_image_url'),
+}
@@ -0,0 +1,148 @@
+"""
+Process wide request pacing for the Product Advertising API.
+
+Every access key has its own quota on every marketplace, so a single TokenBucket is kept per key and
+marketplace and shared by every client and thread in the process.
+"""
+import asyncio
+import threading
+import time
+
+
+class TokenBucket(object):
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        """
+
+        :param rate: Number of requests allowed per second.
+        :param burst: Number of requests which can be sent at once after the bucket has been idle.
+            Defaults to one second worth of requests.
+        :param clock: Function returning the current time in seconds.
+        """
+        self._lock = threading.Lock()
+        self.clock = clock
+        self.configure(rate, burst)
+        self.tokens = self.burst
+        self.updated = clock()
+
+    def configure(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError('rate must be greater than 0, got {}'.format(rate))
+        with self._lock:
+            self.rate = float(rate)
+            self.burst = float(burst or max(1.0, rate))
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    @property
+    def available(self):
+        """
+        Number of tokens which could be taken right now without waiting.
+        """
+        with self._lock:
+            self._refill(self.clock())
+            return self.tokens
+
+    def reserve(self, tokens=1):
+        """
+        Take tokens from the bucket, going into debt if there are not enough of them.
+
+        Callers are queued in the order they reserve, so the bucket never hands out more than `rate`
+        tokens per second no matter how many threads are waiting.
+        :return: Number of seconds the caller has to wait before its tokens are available.
+        """
+        with self._lock:
+            self._refill(self.clock())
+            self.tokens -= tokens
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self, tokens=1):
+        """
+        Block the calling thread until `tokens` are available.
+        """
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self, tokens=1):
+        """
+        Coroutine version of acquire which only suspends the calling task.
+        """
+        delay = self.reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+
+_buckets = {}
+# Keys of the marketplace buckets created from the key-wide rate, which follow it when it is configured again.
+_default_buckets = set()
+_buckets_lock = threading.Lock()
+
+
+def configure_rate_limit(access_key, rate, burst=None, marketplace=None):
+    """
+    Set the request rate for an access key on a marketplace. Every client using the key on the marketplace
+    shares the same bucket.
+
+    :param access_key: AWS Access Key ID the quota belongs to.
+    :param rate: Number of requests allowed per second.
+    :param burst: Number of requests which can be sent at once after the key has been idle.
+    :param marketplace: Marketplace host the quota applies to. When None, the rate is the default of every
+        marketplace without a rate of its own: each of them gets its own bucket with this rate and burst, so the
+        key's throughput grows with the number of marketplaces it is used on.
+    :return: TokenBucket for the key.
+    """
+    with _buckets_lock:
+        key = (access_key, marketplace)
+        _default_buckets.discard(key)
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = _buckets[key] = TokenBucket(rate, burst)
+        else:
+            bucket.configure(rate, burst)
+        if marketplace is None:
+            for default_key in _default_buckets:
+                if default_key[0] == access_key:
+                    _buckets[default_key].configure(rate, burst)
+        return bucket
+
+
+def get_rate_limit(access_key, marketplace=None):
+    """
+    :return: TokenBucket for the access key on the marketplace. A marketplace without a rate of its own gets a
+        bucket of its own with the key's default rate, see configure_rate_limit. None if no rate has been
+        configured for either.
+    """
+    bucket = _buckets.get((access_key, marketplace))
+    if bucket is not None or marketplace is None:
+        return bucket
+    with _buckets_lock:
+        default = _buckets.get((access_key, None))
+        if default is None:
+            return None
+        key = (access_key, marketplace)
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = _buckets[key] = TokenBucket(default.rate, default.burst)
+            _default_buckets.add(key)
+        return bucket
+
+
+def clear_rate_limit(access_key, marketplace=None):
+    """
+    Remove the rate of an access key on a marketplace. Clearing the key-wide rate also removes the marketplace
+    buckets which were created from it.
+    """
+    with _buckets_lock:
+        _buckets.pop((access_key, marketplace), None)
+        _default_buckets.discard((access_key, marketplace))
+        if marketplace is None:
+            for key in [k for k in _default_buckets if k[0] == access_key]:
+                _default_buckets.discard(key)
+                _buckets.pop(key, None)
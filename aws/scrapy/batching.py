@@ -0,0 +1,189 @@
+"""
+Pack single ASIN lookups into ItemLookup requests of 10 ItemIds.
+"""
+from collections import OrderedDict
+
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+from scrapy.utils.spider import iterate_spider_output
+from twisted.python.failure import Failure
+
+from aws._aws import MAX_ITEM_IDS
+from aws.cache import cache_key
+from aws.scrapy.middleware import PARSED_RESPONSE_META_KEY, parsed_response
+from aws.scrapy.request import AwsItemLookupRequest
+
+# Request meta key of a batch holding the requests it was made of, by ASIN.
+LOOKUP_BATCH_META_KEY = 'aws_lookup_batch'
+
+# Request meta key holding the Item looked up for a batched request, None if the response did not have it.
+LOOKUP_ITEM_META_KEY = 'aws_lookup_item'
+
+
+def looked_up_item(response):
+    """
+    Get the Item a response to a single ASIN AwsItemLookupRequest is for.
+
+    Works for requests which were batched by AwsItemLookupBatchMiddleware and for requests which were sent on
+    their own.
+    :return: Item, or None if the response did not have it.
+    """
+    request = response.request
+    if LOOKUP_ITEM_META_KEY in request.meta:
+        return request.meta[LOOKUP_ITEM_META_KEY]
+    item_ids = getattr(request, 'item_ids', None)
+    for item in parsed_response(response).items.items:
+        if not item_ids or item.asin in item_ids:
+            return item
+    return None
+
+
+class AwsItemLookupBatchMiddleware(object):
+    """
+    Spider middleware sending the single ASIN AwsItemLookupRequests a spider yields as ItemLookups of up to
+    10 ItemIds. Enable it with
+
+        SPIDER_MIDDLEWARES = {'aws.scrapy.batching.AwsItemLookupBatchMiddleware': 500}
+
+    Requests with the same response groups and parameters are buffered together. A buffer is sent when it has
+    AWS_LOOKUP_BATCH_SIZE ASINs, when its oldest request has waited AWS_LOOKUP_BATCH_TIMEOUT seconds, or when the
+    spider runs out of other requests. Every request's callback is then called as if the request had been sent on
+    its own: the response's request, and so meta and cb_kwargs, is the original one, and looked_up_item(response)
+    is its Item. If the batch fails, every request's errback is called. Ex
+
+        def parse(self, response):
+            for asin in asins:
+                yield AwsItemLookupRequest(asin, callback=self.parse_item, meta={'rank': rank})
+
+        def parse_item(self, response):
+            item = looked_up_item(response)
+    """
+
+    def __init__(self, crawler):
+        from twisted.internet import reactor
+        self.crawler = crawler
+        self.settings = crawler.settings
+        self.batch_size = min(self.settings.getint('AWS_LOOKUP_BATCH_SIZE', MAX_ITEM_IDS), MAX_ITEM_IDS)
+        self.timeout = self.settings.getfloat('AWS_LOOKUP_BATCH_TIMEOUT', 1.0)
+        self.stats = crawler.stats
+        self.clock = reactor
+        # Group key to OrderedDict of ASIN to the requests waiting for it.
+        self.buffers = {}
+        self.timers = {}
+        crawler.signals.connect(self.spider_idle, signal=signals.spider_idle)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    @staticmethod
+    def batchable(request):
+        return (isinstance(request, AwsItemLookupRequest) and len(request.item_ids) == 1 and
+                LOOKUP_BATCH_META_KEY not in request.meta)
+
+    @staticmethod
+    def group_key(request):
+        """
+        Key shared by the requests which can go in the same batch.
+        """
+        return cache_key('', request.OPERATION,
+                         dict(request.extra_params, ResponseGroup=','.join(request.response_groups)))
+
+    def process_spider_output(self, response, result, spider):
+        for r in result:
+            if not self.batchable(r):
+                yield r
+                continue
+            batch = self.add(r)
+            if batch is not None:
+                yield batch
+
+    async def process_spider_output_async(self, response, result, spider):
+        """
+        process_spider_output for callbacks which are async generators.
+        """
+        async for r in result:
+            if not self.batchable(r):
+                yield r
+                continue
+            batch = self.add(r)
+            if batch is not None:
+                yield batch
+
+    def add(self, request):
+        """
+        Buffer a request.
+
+        :return: Batch request if the buffer is full, else None.
+        """
+        key = self.group_key(request)
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            buffer = self.buffers[key] = OrderedDict()
+            self.timers[key] = self.clock.callLater(self.timeout, self._timed_out, key)
+        buffer.setdefault(request.item_ids[0], []).append(request)
+        self.stats.inc_value('aws_lookup_batch/requests')
+        if len(buffer) >= self.batch_size:
+            return self.flush(key)
+        return None
+
+    def flush(self, key):
+        """
+        :return: Batch request of everything buffered under `key`.
+        """
+        buffer = self.buffers.pop(key)
+        timer = self.timers.pop(key)
+        if timer.active():
+            timer.cancel()
+        first = next(iter(buffer.values()))[0]
+        self.stats.inc_value('aws_lookup_batch/batches')
+        return AwsItemLookupRequest(
+            list(buffer), response_groups=first.response_groups, extra=first.extra_params,
+            callback=self.parse_batch, errback=self.batch_failed,
+            priority=max(r.priority for requests in buffer.values() for r in requests),
+            meta={LOOKUP_BATCH_META_KEY: buffer},
+        )
+
+    def _timed_out(self, key):
+        self.stats.inc_value('aws_lookup_batch/timed_out')
+        self.crawler.engine.crawl(self.flush(key))
+
+    def spider_idle(self, spider):
+        if not self.buffers:
+            return
+        for key in list(self.buffers):
+            self.crawler.engine.crawl(self.flush(key))
+        raise DontCloseSpider
+
+    def parse_batch(self, response):
+        """
+        Call the callback of every request in the batch with its Item.
+        """
+        spider = self.crawler.spider
+        parser = parsed_response(response)
+        items = {}
+        for item in parser.items.items:
+            items.setdefault(item.asin, item)
+        for asin, requests in response.request.meta[LOOKUP_BATCH_META_KEY].items():
+            item = items.get(asin)
+            if item is None:
+                self.stats.inc_value('aws_lookup_batch/missing')
+            for request in requests:
+                request.meta[PARSED_RESPONSE_META_KEY] = parser
+                request.meta[LOOKUP_ITEM_META_KEY] = item
+                callback = request.callback or spider.parse
+                for r in iterate_spider_output(callback(response.replace(request=request), **request.cb_kwargs)):
+                    yield r
+
+    def batch_failed(self, failure):
+        """
+        Call the errback of every request in the batch, with a copy of the failure whose request is the original
+        one.
+        """
+        for requests in failure.request.meta[LOOKUP_BATCH_META_KEY].values():
+            for request in requests:
+                if request.errback is not None:
+                    request_failure = Failure(failure.value, failure.type, failure.tb)
+                    request_failure.request = request
+                    for r in iterate_spider_output(request.errback(request_failure)):
+                        yield r
@@ -0,0 +1,158 @@
+"""
+Enumerate every ASIN of a search, past the 10 pages ItemSearch serves, by narrowing it with its search bins.
+"""
+from aws._aws import MAX_ITEM_PAGE
+from aws.cache import cache_key
+from aws.parsers.itemsearch import SearchBinSet
+from aws.scrapy.middleware import parsed_response
+from aws.scrapy.request import AwsAsinSearchRequest
+
+# Request meta key holding the extra parameters of a drill down request and the bin types it was narrowed by.
+DRILL_DOWN_META_KEY = 'aws_drill_down'
+
+DEFAULT_NARROW_BY = (SearchBinSet.BRAND_NAME, SearchBinSet.PRICE_RANGE, SearchBinSet.SUBJECT)
+
+# Subject bins of a search narrowed to a browse node are its child nodes, so they can narrow it again. Other bin
+# types are only used once.
+NESTED_BIN_SETS = frozenset([SearchBinSet.SUBJECT])
+
+
+def record_item(item, response):
+    return item.to_record().as_dict()
+
+
+class SearchBinDrillDown(object):
+    """
+    Split a search into its search bins, recursively, until every part fits in the pages ItemSearch serves.
+
+    The first page of a search tells how many results it has. When there are more than `max_pages` pages, a
+    request is made for every bin of the first of `narrow_by` which narrows the search, and so on down the bins
+    of each of those. Once a search fits, its remaining pages, and never more than its TotalPages, are requested.
+    All of those requests are yielded at once so scrapy downloads the leaves concurrently. Bins overlap, so
+    every ASIN is only passed to `item_callback` the first time it is seen, and a search with parameters which
+    were already requested is not requested again. Ex
+
+        class BrandSpider(scrapy.Spider):
+            brands = ['Bosch', 'Denso', 'Bosch']
+
+            def start_requests(self):
+                self.drill_down = SearchBinDrillDown.from_crawler(self.crawler)
+                for brand in self.brands:
+                    request = self.drill_down.start_request('Automotive', brand)
+                    if request is not None:
+                        yield request
+    """
+
+    def __init__(self, item_callback=record_item, narrow_by=DEFAULT_NARROW_BY, max_pages=MAX_ITEM_PAGE, max_depth=6,
+                 stats=None, **request_kwargs):
+        """
+
+        :param item_callback: Called as item_callback(item, response) with every new parsed Item. What it returns,
+            if not None, is yielded back to scrapy. Defaults to a dict of the item's ItemRecord.
+        :param narrow_by: SearchBinSet types, in the order they are used to narrow a search.
+        :param max_pages: Pages served for a search, at most 10.
+        :param max_depth: Maximum number of times a search is narrowed.
+        :param stats: Optional scrapy stats collector.
+        :param request_kwargs: Any extra kwargs for the AwsAsinSearchRequests, Ex priority, errback.
+        """
+        self.item_callback = item_callback
+        self.narrow_by = tuple(narrow_by)
+        self.max_pages = min(max_pages, MAX_ITEM_PAGE)
+        self.max_depth = max_depth
+        self.stats = stats
+        self.request_kwargs = request_kwargs
+        self.seen_asins = set()
+        self.requested = set()
+
+    @classmethod
+    def from_crawler(cls, crawler, **kwargs):
+        return cls(stats=crawler.stats, **kwargs)
+
+    def _inc_stat(self, key, count=1):
+        if self.stats is not None:
+            self.stats.inc_value('aws_drill_down/{}'.format(key), count)
+
+    def start_request(self, search_index, brand, extra=None):
+        """
+        :return: AwsAsinSearchRequest for the first page of the search, None if it was already requested.
+        """
+        return self._request(search_index, brand, extra or {}, 1, ())
+
+    def _request(self, search_index, brand, extra, item_page, narrowed):
+        key = cache_key('', AwsAsinSearchRequest.OPERATION,
+                        dict(extra, SearchIndex=search_index, Brand=brand, ItemPage=item_page))
+        if key in self.requested:
+            self._inc_stat('duplicate_request')
+            return None
+        self.requested.add(key)
+        self._inc_stat('request')
+        meta = dict(self.request_kwargs.get('meta') or {})
+        meta[DRILL_DOWN_META_KEY] = {'extra': extra, 'narrowed': narrowed}
+        kwargs = dict(self.request_kwargs, meta=meta)
+        return AwsAsinSearchRequest(search_index, brand, item_page=item_page, extra=extra, callback=self.parse,
+                                    **kwargs)
+
+    def parse(self, response):
+        request = response.request
+        parser = parsed_response(response)
+        for item in parser.items.items:
+            if item.asin in self.seen_asins:
+                self._inc_stat('duplicate_asin')
+                continue
+            self.seen_asins.add(item.asin)
+            result = self.item_callback(item, response)
+            if result is not None:
+                yield result
+
+        if int(request.item_page) != 1:
+            return
+        for r in self.follow(request, parser):
+            yield r
+
+    def follow(self, request, parser):
+        """
+        Requests following the first page of a search: narrower searches, or the rest of its pages.
+        """
+        state = request.meta[DRILL_DOWN_META_KEY]
+        extra, narrowed = state['extra'], state['narrowed']
+        total_pages = int(parser.items.total_pages or 0)
+        last_page = total_pages
+        if total_pages > self.max_pages:
+            narrow_by, bins = self.narrowing_bins(parser, dict(extra, Brand=request.brand), narrowed)
+            if bins:
+                self._inc_stat('split')
+                for bin_ in bins:
+                    r = self._request(request.search_index, request.brand, dict(extra, **bin_.as_request_params()), 1,
+                                      narrowed + (narrow_by,))
+                    if r is not None:
+                        yield r
+                # Bins only list the largest parts of some searches. When they do not add up to the whole search,
+                # its own pages are requested too for the results which are in none of them.
+                total_results = int(parser.items.total_results or 0)
+                if sum(int(b.bin_item_count or 0) for b in bins) >= total_results:
+                    return
+            else:
+                self._inc_stat('truncated')
+            last_page = self.max_pages
+        self._inc_stat('leaf')
+        for page in range(2, last_page + 1):
+            r = self._request(request.search_index, request.brand, extra, page, narrowed)
+            if r is not None:
+                yield r
+
+    def narrowing_bins(self, parser, extra, narrowed):
+        """
+        :param extra: Parameters of the search.
+        :return: (SearchBinSet type, bins) of the first type of `narrow_by` with bins which narrow the search
+            further, or (None, []).
+        """
+        if len(narrowed) >= self.max_depth:
+            return None, []
+        for narrow_by in self.narrow_by:
+            if narrow_by in narrowed and narrow_by not in NESTED_BIN_SETS:
+                continue
+            bins = [b for b in parser.search_bins(narrow_by) or ()
+                    if any(extra.get(k) != v for k, v in b.as_request_params().items())]
+            if bins:
+                return narrow_by, bins
+        return None, []
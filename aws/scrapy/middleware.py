@@ -1,24 +1,141 @@
 import os
 import logging
-import time
+import random
 
+from lxml import etree
+from scrapy import signals
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet.task import deferLater
+
+from aws.archive import ResponseArchive
 from aws.parsers import ItemSearchResponse
 from aws.parsers.base import ItemSearchErrorResponse
 from aws.parsers.errors import ItemSearchError, RequestThrottledError, RequestExpiredError
+from aws.scrapy.request import AwsRequest
+
+# Request meta key holding the ItemSearchResponse parsed by ApiResponseDownloaderMiddleware.
+PARSED_RESPONSE_META_KEY = 'aws_response'
+
+# Request meta key holding the body of the last response to the request and its parsed tree.
+RESPONSE_TREE_META_KEY = 'aws_response_tree'
+
+
+def parsed_response(response):
+    """
+    Get the parsed body of a response.
+
+    Reuses the tree parsed by ApiResponseDownloaderMiddleware so the spider does not parse the body again. Falls
+    back to parsing the body when the middleware is not enabled.
+    :param response: scrapy Response for an AwsRequest.
+    :return: ItemSearchResponse
+    """
+    request = response.request
+    parser = request.meta.get(PARSED_RESPONSE_META_KEY) if request is not None else None
+    if parser is None:
+        parser = ItemSearchResponse.from_string(response.body)
+    return parser
+
+
+def response_tree(request, response):
+    """
+    Parse the body of a response once, however many middlewares and extensions look at it.
+
+    The tree is kept in the request meta along with the body it was parsed from, so a copy of the request made
+    for a retry never gets the tree of an earlier response.
+    :raises: etree.XMLSyntaxError if the body is not XML.
+    :return: lxml Element of the body.
+    """
+    cached = request.meta.get(RESPONSE_TREE_META_KEY)
+    if cached is not None and cached[0] is response.body:
+        return cached[1]
+    tree = etree.fromstring(response.body)
+    request.meta[RESPONSE_TREE_META_KEY] = (response.body, tree)
+    return tree
+
+
+def response_error_code(request, response):
+    """
+    :return: Code of the error a response to an AwsRequest is, None if it succeeded or is not an error response.
+    """
+    if response.status == 200:
+        return None
+    try:
+        error = ItemSearchErrorResponse(response_tree(request, response)).error
+    except (ValueError, etree.XMLSyntaxError):
+        return None
+    return error.code if error else None
+
+
+class AwsRequestSigningMiddleware(object):
+    """
+    Sign AwsRequests right before they are downloaded instead of when they are created.
+
+    Requests can wait in a deep scheduler queue long enough for their Timestamp to expire. Enable it late in
+    the chain so nothing runs between signing and the download, Ex
+        DOWNLOADER_MIDDLEWARES = {'aws.scrapy.middleware.AwsRequestSigningMiddleware': 950}
+
+    When AWS_CREDENTIALS is set, the credentials are picked from the pool when signing, and the outcome of the
+    response is reported back to the pool so keys which keep failing are backed off.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.stats = self.crawler.stats
+
+    def process_request(self, request, spider):
+        if isinstance(request, AwsRequest):
+            request.sign()
+            self.stats.inc_value('aws_request_signed')
+
+    def process_response(self, request, response, spider):
+        if isinstance(request, AwsRequest) and request.credential_pool is not None:
+            code = response_error_code(request, response)
+            request.credential_pool.report(request.credentials, code)
+            if code is not None:
+                self.stats.inc_value('aws_credentials/{}/{}'.format(request.aws_access_key, code))
+        return response
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
 
 class ApiResponseDownloaderMiddleware(object):
+    """
+    Retry throttled and expired requests, and raise for error responses.
+
+    Error responses are archived to a ResponseArchive in AWS_RESPONSE_ARCHIVE_DIR, and so is every response when
+    WRITE_RESPONSES is set. The archive is written from a background thread so the reactor is never blocked.
+    """
     root = os.path.dirname(os.path.abspath(__file__))
-    write_response_fp = os.path.join(root, 'response.xml')
-    error_response_fp = os.path.join(root, 'error-response.xml')
+    archive_dir = os.path.join(root, 'responses')
 
     def __init__(self, crawler):
+        from twisted.internet import reactor
         self.logger = logging.getLogger(self.__class__.__name__)
         self.crawler = crawler
         self.settings = self.crawler.settings
         self.stats = self.crawler.stats
         self.max_retry_times = self.settings.getint('AWS_REQUEST_THROTTLED_RETRY_TIMES')
         self.priority_adjust = self.settings.getint('AWS_REQUEST_THROTTLED_RETRY_PRIORITY_ADJUST')
+        self.retry_delay = self.settings.getfloat('AWS_REQUEST_THROTTLED_RETRY_DELAY', 1)
+        self.max_retry_delay = self.settings.getfloat('AWS_REQUEST_THROTTLED_RETRY_MAX_DELAY', 60)
         self.write_responses = self.settings.getbool('WRITE_RESPONSES')
+        self.archive_dir = self.settings.get('AWS_RESPONSE_ARCHIVE_DIR') or self.archive_dir
+        self._archive = None
+        self.clock = reactor
+        self.crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+
+    @property
+    def archive(self):
+        # Opened on first use so crawls which never archive anything do not create the directory.
+        if self._archive is None:
+            self._archive = ResponseArchive(self.archive_dir)
+        return self._archive
+
+    def spider_closed(self, spider):
+        if self._archive is not None:
+            self._archive.close()
 
     def _raise_for_request_error(self, parser):
         """
@@ -30,36 +147,56 @@ class ApiResponseDownloaderMiddleware(object):
                 raise ItemSearchError.from_element(parser.items.request.errors[0])
             raise ItemSearchError('UNKNOWN_ERROR', 'Request failed but no error was found')
 
-    def _retry(self, request, reason, spider):
+    def _backoff(self, retries):
+        """
+        Exponential backoff with jitter. Half of the delay is random so requests throttled together
+        do not all come back at the same time.
+        """
+        delay = min(self.max_retry_delay, self.retry_delay * 2 ** (retries - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _retry(self, request, reason, spider, backoff=True):
         retries = request.meta.get('retry_times', 0) + 1
-        timeout = request.meta.get('timeout', 1) ** 2
 
         if retries <= self.max_retry_times:
-            time.sleep(timeout)
+            timeout = self._backoff(retries) if backoff else 0
             self.logger.debug("Retrying %(request)s (failed %(retries)d times): %(reason)s - Timeout set to %(timeout)s",
                               {'request': request, 'retries': retries, 'reason': reason, 'timeout': timeout},
                               extra={'spider': spider})
             retryreq = request.copy()
             retryreq.meta['retry_times'] = retries
-            retryreq.meta['timeout'] = 2 if timeout == 1 else timeout
+            retryreq.meta.pop(RESPONSE_TREE_META_KEY, None)
             retryreq.dont_filter = True
             retryreq.priority = request.priority + self.priority_adjust
-            return retryreq
+            if not timeout:
+                return retryreq
+            return self._delayed(timeout, retryreq)
         else:
             self.logger.debug("Gave up retrying %(request)s (failed %(retries)d times): %(reason)s",
                               {'request': request, 'retries': retries, 'reason': reason},
                               extra={'spider': spider})
 
+    async def _delayed(self, timeout, request):
+        """
+        Hand the retry back after `timeout` seconds. Waits on the reactor instead of sleeping so every other
+        download goes on meanwhile, and is a coroutine because Scrapy deprecates returning a Deferred from
+        process_response.
+        """
+        await maybe_deferred_to_future(deferLater(self.clock, timeout, lambda: None))
+        return request
+
     def process_response(self, request, response, spider):
         if self.write_responses:
-            with open(self.write_response_fp, 'wb') as f:
-                f.write(response.body)
+            self.archive.append_response(request.url, response.status, response.body)
+            self.stats.inc_value('aws_response_archive/responses')
 
         # Raise for any potential error which could have been brought back.
         # This is needed because instead of wrapping the error in the response,
         # they just send back the error as a body.xml
         # Ex the body will just be <ItemSearchError><!-- error stuff here --></ItemSearchError>
-        potential_err = ItemSearchErrorResponse.from_string(response.body)
+        # The body is parsed once and the same tree is shared by every wrapper and handed to the spider.
+        tree = response_tree(request, response)
+        potential_err = ItemSearchErrorResponse(tree)
         try:
             potential_err.raise_for_error()
         except RequestThrottledError as e:
@@ -71,18 +208,21 @@ class ApiResponseDownloaderMiddleware(object):
             # the signature will no longer match when the engine finally sends the request out.
             self.stats.inc_value('request_expired')
             self.logger.debug(e)
-            return self._retry(request, 'RequestExpired', spider) or response
+            return self._retry(request, 'RequestExpired', spider, backoff=False) or response
         except:
-            with open(self.error_response_fp, 'wb') as f:
-                f.write(response.body)
+            if not self.write_responses:
+                self.archive.append_response(request.url, response.status, response.body,
+                                             error=potential_err.error.code)
+            self.stats.inc_value('aws_response_archive/errors')
             raise
 
         # Now parse the body and raise for any request errors.
         # This is different from above because the response is actually what we expect, its just that
         # if the request failed due to parameters, there will be an error contained in the <Request> part of the
         # xml.
-        parser = ItemSearchResponse.from_string(response.body)
+        parser = ItemSearchResponse(tree)
         self._raise_for_request_error(parser)
+        request.meta[PARSED_RESPONSE_META_KEY] = parser
         return response
 
     @classmethod
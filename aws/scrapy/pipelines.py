@@ -0,0 +1,60 @@
+"""
+Item pipelines.
+"""
+import os
+
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet import threads
+
+from aws.export import FIELDS, BatchExporter
+
+
+class AwsExportPipeline(object):
+    """
+    Export every item to batched JSON lines, CSV or Parquet files with a BatchExporter. Enable it with
+
+        ITEM_PIPELINES = {'aws.scrapy.pipelines.AwsExportPipeline': 800}
+        AWS_EXPORT_DIR = 'exports'
+
+    Items can be parsed Items, ItemRecords or dicts, see aws.export.to_row. Files of each spider are written to
+    AWS_EXPORT_DIR/<spider name>/.
+
+    Batches are written from a background thread, but process_item blocks the reactor, and so the whole crawl,
+    whenever the writer is more than AWS_EXPORT_MAX_PENDING batches behind. This keeps memory bounded when the
+    disk can not keep up; raise the setting to trade memory for fewer stalls.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.settings = crawler.settings
+        self.directory = self.settings.get('AWS_EXPORT_DIR')
+        if not self.directory:
+            raise NotConfigured
+        self.format = self.settings.get('AWS_EXPORT_FORMAT', 'jsonl')
+        self.fields = self.settings.getlist('AWS_EXPORT_FIELDS') or FIELDS
+        self.batch_size = self.settings.getint('AWS_EXPORT_BATCH_SIZE', 1000)
+        self.max_file_size = self.settings.getint('AWS_EXPORT_MAX_FILE_SIZE', 256 * 1024 * 1024)
+        self.max_pending = self.settings.getint('AWS_EXPORT_MAX_PENDING', 4)
+        self.stats = crawler.stats
+        self.exporter = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def open_spider(self, spider):
+        self.exporter = BatchExporter(os.path.join(self.directory, spider.name), format=self.format,
+                                      prefix=spider.name, fields=self.fields, batch_size=self.batch_size,
+                                      max_file_size=self.max_file_size, max_pending=self.max_pending)
+
+    def process_item(self, item, spider):
+        self.exporter.add(item)
+        self.stats.inc_value('aws_export/items')
+        return item
+
+    async def close_spider(self, spider):
+        # The last batch is written and the file closed in a thread so the reactor keeps running meanwhile.
+        await maybe_deferred_to_future(threads.deferToThread(self.exporter.close))
+        self.stats.set_value('aws_export/rows', self.exporter.rows)
+        self.stats.set_value('aws_export/files', len(self.exporter.files))
@@ -1,138 +1,97 @@
-import datetime
-import sys
+import json
 from collections import defaultdict
-from urllib import parse
-import hmac
-import base64
-import hashlib
 
 from scrapy import Request
 from scrapy.exceptions import CloseSpider
 from scrapy.utils.project import get_project_settings
 
-
-def convert_to_gmtime(dt):
-    """
-    Convert the supplied date to GMT.
-    :param dt:
-    :return: parameter converted to GMT.
-    :rtype: datetime.datetime
-    """
-    # Get the local time offset from gmt. Added 1 second to account for the time the computer takes to
-    # generate utcnow and now.
-    hr_diff = (((datetime.datetime.utcnow() - datetime.datetime.now()).seconds + 1) / 60) / 60
-    return dt + datetime.timedelta(hours=hr_diff)
+from aws._aws import MAX_ITEM_IDS
+from aws.credentials import Credentials, get_credential_pool
+from aws.signing import get_signer
 
 
-def formatted_amazon_datetime_str(dt=None):
+def credential_pool_from_settings(settings):
     """
-    Format a datetime object to amazon timestamp format spec. (YYYY-MM-DDThh:mm:ssZ) where T and Z are literals.
-    :param dt: optional datetime to suppy. If none supplied, then use current datetime.
-    :return: Formatted timestamp to use in request url.
-    """
-    dt = dt or datetime.datetime.now()
-    gmtime = convert_to_gmtime(dt)
-    return gmtime.strftime('%Y-%m-%dT%H:%M:%S.000Z')
-
-
-def urlencode(query):
-    """Encode a sequence of two-element tuples or dictionary into a URL query string.
+    Shared CredentialPool of the AWS_CREDENTIALS setting, or None if it is not set.
 
-    If any values in the query arg are sequences and doseq is true, each
-    sequence element is converted to a separate parameter.
-
-    If the query arg is a sequence of two-element tuples, the order of the
-    parameters in the output will match the order of parameters in the
-    input.
-
-    Taken straight from urllib.urlencode. This is necessary because urllib.urlencode uses quote_plus but aws expects
-    %20 instead of +.
+    AWS_CREDENTIALS is a list of dicts with associate_tag, access_key and secret_key keys, or the same list as a
+    json string so it can be given on the command line.
     """
-
-    if hasattr(query, "items"):
-        # mapping objects
-        query = query.items()
-    else:
-        # it's a bother at times that strings and string-like objects are
-        # sequences...
-        try:
-            # non-sequence items should not work with len()
-            # non-empty strings will fail this
-            if len(query) and not isinstance(query[0], tuple):
-                raise TypeError
-                # zero-length sequences of all types will get here and succeed,
-                # but that's a minor nit - since the original implementation
-                # allowed empty dicts that type of behavior probably should be
-                # preserved for consistency
-        except TypeError:
-            ty, va, tb = sys.exc_info()
-            raise TypeError("not a valid non-string sequence or mapping object").with_traceback(tb)
-
-    l = []
-    for k, v in query:
-        k = parse.quote(str(k), safe='')
-        v = parse.quote(str(v), safe='')
-        l.append(k + '=' + v)
-    return '&'.join(l)
+    credentials = settings.get('AWS_CREDENTIALS')
+    if not credentials:
+        return None
+    if isinstance(credentials, str):
+        credentials = json.loads(credentials)
+    return get_credential_pool(credentials)
 
 
 class AwsRequest(Request):
     def __init__(self, operation, extra, *args, **kwargs):
+        self.operation = operation
         self.extra = extra
         self.settings = get_project_settings()
         self.aws_access_key = self.settings.get('AWS_ACCESS_KEY_ID')
         self.aws_secret_key = self.settings.get('AWS_SECRET_ACCESS_KEY')
         self.aws_associate_tag = self.settings.get('AWS_ASSOCIATE_TAG')
-        if not self.aws_access_key:
-            raise CloseSpider('`AWS_ACCESS_KEY_ID` is undefined in settings.py.')
-        if not self.aws_secret_key:
-            raise CloseSpider('`AWS_SECRET_ACCESS_KEY` is undefined in settings.py.')
+        self.credential_pool = credential_pool_from_settings(self.settings)
+        if self.credential_pool is None:
+            if not self.aws_access_key:
+                raise CloseSpider('`AWS_ACCESS_KEY_ID` is undefined in settings.py.')
+            if not self.aws_secret_key:
+                raise CloseSpider('`AWS_SECRET_ACCESS_KEY` is undefined in settings.py.')
         self.aws_marketplace = self.settings.get('AWS_MARKETPLACE')
+        self.acquire_credentials()
         url = self.make_url(operation, extra)
         kwargs.update({'url': url})
         super(AwsRequest, self).__init__(*args, **kwargs)
 
+    def sign(self):
+        """
+        Stamp the request with the current time and sign it again.
+
+        The url built in __init__ can sit in the scheduler long enough for Amazon to reject it with
+        RequestExpired. AwsRequestSigningMiddleware calls this right before the request is downloaded.
+
+        The credentials picked in __init__ are kept, so every request only takes one turn of the pool, unless the
+        key has been backed off since. Retries are copies of the request and pick credentials again.
+        """
+        if self.credential_pool is not None and self.credential_pool.is_backed_off(self.credentials):
+            self.acquire_credentials()
+        self._set_url(self.make_url(self.operation, self.extra))
+
+    def acquire_credentials(self):
+        """
+        Pick the credentials to sign with from the AWS_CREDENTIALS pool, if it is set.
+        """
+        if self.credential_pool is not None:
+            credentials = self.credential_pool.acquire(self.aws_marketplace)
+            self.aws_associate_tag, self.aws_access_key, self.aws_secret_key = credentials
+
+    @property
+    def credentials(self):
+        return Credentials(self.aws_associate_tag, self.aws_access_key, self.aws_secret_key)
+
+    def replace(self, *args, **kwargs):
+        """Create a new Request with the same attributes except for those
+        given new values.
+        """
+        for x in ['url', 'method', 'headers', 'body', 'cookies', 'meta',
+                  'encoding', 'priority', 'dont_filter', 'callback', 'errback', 'cb_kwargs', 'flags',
+                  'operation', 'extra']:
+            kwargs.setdefault(x, getattr(self, x))
+        cls = kwargs.pop('cls', self.__class__)
+        return cls(*args, **kwargs)
+
+    @property
+    def signer(self):
+        return get_signer(self.aws_associate_tag, self.aws_access_key, self.aws_secret_key, self.aws_marketplace)
+
     def generate_signature(self, url_params):
         canonical_string = '&'.join(sorted(url_params.split('&')))
-        string_to_sign = "GET\n{endpoint}\n/onca/xml\n{params}".format(endpoint=self.aws_marketplace,
-                                                                       params=canonical_string)
-        signature = base64.b64encode(
-            hmac.new(
-                bytes(self.aws_secret_key, encoding='ascii'),
-                bytes(string_to_sign, encoding='ascii'),
-                hashlib.sha256
-            ).digest()
-        )
-        encoded_signature = parse.quote(signature)
-        return encoded_signature
+        return self.signer.signature(canonical_string)
 
     def make_url(self, operation, extra=None):
-        extra = extra or {}
-        base_params = dict(
-            AssociateTag=self.aws_associate_tag,
-            AWSAccessKeyId=self.aws_access_key,
-            Operation=operation,
-            Service='AWSECommerceService',
-            Timestamp=formatted_amazon_datetime_str()
-        )
-        base_params.update(extra)
-
-        # Sort and urlencode the params in accordance to the docs.
-        url_params = '&'.join(sorted(urlencode(base_params).split('&')))
-        signature = self.generate_signature(url_params)
-
-        # Add the signature to the request url
-        url_params += '&Signature={}'.format(signature)
-        url = parse.urlunsplit(
-            (
-                'http',
-                self.aws_marketplace,
-                '/onca/xml',
-                url_params,
-                None
-            )
-        )
-        return url
+        return self.signer.url(operation, extra)
 
 
 class AwsAsinSearchRequest(AwsRequest):
@@ -170,8 +129,45 @@ class AwsAsinSearchRequest(AwsRequest):
         given new values.
         """
         for x in ['url', 'method', 'headers', 'body', 'cookies', 'meta',
-                  'encoding', 'priority', 'dont_filter', 'callback', 'errback',
+                  'encoding', 'priority', 'dont_filter', 'callback', 'errback', 'cb_kwargs', 'flags',
                   'search_index', 'brand', 'item_page', 'response_groups', 'extra']:
             kwargs.setdefault(x, getattr(self, x))
         cls = kwargs.pop('cls', self.__class__)
-        return cls(*args, **kwargs)
\ No newline at end of file
+        return cls(*args, **kwargs)
+
+
+class AwsItemLookupRequest(AwsRequest):
+    OPERATION = 'ItemLookup'
+
+    def __init__(self, item_ids, response_groups=('Large',), extra=None, *args, **kwargs):
+        """
+
+        :param item_ids: ASIN, or list of at most 10 ASINs.
+        :param response_groups: Response groups of the items.
+        :param extra: Any extra url params to be sent to the api.
+        :param args: scrapy Request args.
+        :param kwargs: scrapy Request kwargs.
+        """
+        if isinstance(item_ids, str):
+            item_ids = [item_ids]
+        self.item_ids = list(item_ids)
+        if not 0 < len(self.item_ids) <= MAX_ITEM_IDS:
+            raise ValueError('An ItemLookup takes 1 to {} ItemIds, got {}'.format(MAX_ITEM_IDS, len(self.item_ids)))
+        self.response_groups = response_groups
+        # Kept apart from `extra`, which AwsRequest replaces with every parameter of the request.
+        self.extra_params = extra or {}
+        extra = dict(ItemId=','.join(self.item_ids), ResponseGroup=','.join(response_groups))
+        extra.update(self.extra_params)
+        super(AwsItemLookupRequest, self).__init__(self.OPERATION, extra, **kwargs)
+
+    def replace(self, *args, **kwargs):
+        """Create a new Request with the same attributes except for those
+        given new values.
+        """
+        for x in ['url', 'method', 'headers', 'body', 'cookies', 'meta',
+                  'encoding', 'priority', 'dont_filter', 'callback', 'errback', 'cb_kwargs', 'flags',
+                  'item_ids', 'response_groups']:
+            kwargs.setdefault(x, getattr(self, x))
+        kwargs.setdefault('extra', self.extra_params)
+        cls = kwargs.pop('cls', self.__class__)
+        return cls(*args, **kwargs)
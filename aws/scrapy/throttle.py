@@ -0,0 +1,168 @@
+"""
+AutoThrottle for the Product Advertising API.
+
+Scrapy's AutoThrottle targets a number of concurrent requests from the server latency, but the api answers
+quickly right up to the access key's quota and then throttles. AwsAutoThrottle instead probes for the quota:
+the request rate of a download slot grows steadily while responses come back fine and is cut down as soon as
+requests get throttled (additive increase, multiplicative decrease). Enable it with
+
+    EXTENSIONS = {'aws.scrapy.throttle.AwsAutoThrottle': 0}
+    AWS_AUTOTHROTTLE_ENABLED = True
+"""
+import logging
+import math
+import time
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from aws.scrapy.middleware import response_error_code
+from aws.scrapy.request import AwsRequest
+
+logger = logging.getLogger(__name__)
+
+# Weight of the latest response in the moving averages of latency, throttle and expiry rates.
+EWMA_WEIGHT = 0.2
+
+
+class SlotThrottle(object):
+    """
+    Request rate control of one download slot.
+    """
+
+    def __init__(self, rate, min_rate, max_rate, step, backoff_factor, min_concurrency, max_concurrency, now):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.step = step
+        self.backoff_factor = backoff_factor
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency = None
+        self.throttle_rate = 0.0
+        self.expiry_rate = 0.0
+        self.last_backoff = now
+
+    @property
+    def delay(self):
+        return 1.0 / self.rate
+
+    @property
+    def concurrency(self):
+        """
+        Requests which have to be in flight to sustain the rate at the current latency (Little's law).
+        """
+        in_flight = math.ceil(self.rate * (self.latency or 0)) + 1
+        return int(min(max(in_flight, self.min_concurrency), self.max_concurrency))
+
+    def _average(self, average, value):
+        return value if average is None else average + EWMA_WEIGHT * (value - average)
+
+    def update(self, latency, code, now):
+        """
+        Adjust the rate from one response.
+
+        :param latency: Seconds the response took.
+        :param code: Error code of the response, None if it succeeded.
+        :param now: Current time in seconds.
+        """
+        throttled = code == 'RequestThrottled'
+        expired = code == 'RequestExpired'
+        self.throttle_rate = self._average(self.throttle_rate, float(throttled))
+        self.expiry_rate = self._average(self.expiry_rate, float(expired))
+        if code is None:
+            # Error responses are fast and would make the latency look better than it is.
+            self.latency = self._average(self.latency, latency)
+
+        if throttled:
+            # Every request in flight when the quota was hit comes back throttled, so the rate is only cut once
+            # per round trip.
+            if now - self.last_backoff >= (self.latency or latency):
+                self.rate = max(self.min_rate, self.rate * self.backoff_factor)
+                self.last_backoff = now
+        elif code is None and self.expiry_rate < 0.5 * EWMA_WEIGHT:
+            # Grow by `step` requests per second for every second without throttling. Expired requests mean
+            # requests already wait too long in the queue, so the rate is held for the few responses after one.
+            self.rate = min(self.max_rate, self.rate + self.step / self.rate)
+
+
+class AwsAutoThrottle(object):
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.settings = crawler.settings
+        if not self.settings.getbool('AWS_AUTOTHROTTLE_ENABLED'):
+            raise NotConfigured
+        self.debug = self.settings.getbool('AWS_AUTOTHROTTLE_DEBUG')
+        self.start_rate = self.settings.getfloat('AWS_AUTOTHROTTLE_START_RATE', 1.0)
+        self.min_rate = self.settings.getfloat('AWS_AUTOTHROTTLE_MIN_RATE', 1 / 60.0)
+        self.max_rate = self.settings.getfloat('AWS_AUTOTHROTTLE_MAX_RATE', 50)
+        self.step = self.settings.getfloat('AWS_AUTOTHROTTLE_RATE_STEP', 0.1)
+        self.backoff_factor = self.settings.getfloat('AWS_AUTOTHROTTLE_BACKOFF_FACTOR', 0.5)
+        self.min_concurrency = self.settings.getint('AWS_AUTOTHROTTLE_MIN_CONCURRENCY', 1)
+        self.max_concurrency = self.settings.getint('AWS_AUTOTHROTTLE_MAX_CONCURRENCY',
+                                                    self.settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN', 8))
+        if not 0 < self.min_rate <= self.start_rate <= self.max_rate:
+            raise NotConfigured('AWS_AUTOTHROTTLE_START_RATE must be between AWS_AUTOTHROTTLE_MIN_RATE and '
+                                'AWS_AUTOTHROTTLE_MAX_RATE, and the rates greater than 0.')
+        if not 0 < self.backoff_factor < 1:
+            raise NotConfigured('AWS_AUTOTHROTTLE_BACKOFF_FACTOR must be between 0 and 1.')
+        self.stats = crawler.stats
+        self.clock = time.monotonic
+        self.slots = {}
+        crawler.signals.connect(self.response_downloaded, signal=signals.response_downloaded)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def _slot_throttle(self, key):
+        throttle = self.slots.get(key)
+        if throttle is None:
+            throttle = self.slots[key] = SlotThrottle(
+                self.start_rate, self.min_rate, self.max_rate, self.step, self.backoff_factor,
+                self.min_concurrency, self.max_concurrency, self.clock()
+            )
+        return throttle
+
+    def _get_slot(self, request):
+        key = request.meta.get('download_slot')
+        if key is None:
+            return None, None
+        return key, self.crawler.engine.downloader.slots.get(key)
+
+    def response_downloaded(self, response, request, spider):
+        latency = request.meta.get('download_latency')
+        if not isinstance(request, AwsRequest) or latency is None:
+            return
+        key, slot = self._get_slot(request)
+        if slot is None:
+            return
+        code = response_error_code(request, response)
+        throttle = self._slot_throttle(key)
+        old_delay, old_concurrency = slot.delay, slot.concurrency
+        throttle.update(latency, code, self.clock())
+        slot.delay = throttle.delay
+        slot.concurrency = throttle.concurrency
+        if code in ('RequestThrottled', 'RequestExpired'):
+            self.stats.inc_value('aws_autothrottle/{}'.format(code))
+        self.stats.set_value('aws_autothrottle/rate/{}'.format(key), throttle.rate)
+
+        if self.debug:
+            logger.info(
+                "slot: %(slot)s | rate:%(rate)6.2f/s | conc:%(concurrency)2d (%(concurrency_diff)+d) | "
+                "delay:%(delay)5d ms (%(delay_diff)+d) | latency:%(latency)5d ms | throttled:%(throttled)4.0f%% | "
+                "expired:%(expired)4.0f%%",
+                {
+                    'slot': key,
+                    'rate': throttle.rate,
+                    'concurrency': slot.concurrency,
+                    'concurrency_diff': slot.concurrency - old_concurrency,
+                    'delay': slot.delay * 1000,
+                    'delay_diff': (slot.delay - old_delay) * 1000,
+                    'latency': latency * 1000,
+                    'throttled': throttle.throttle_rate * 100,
+                    'expired': throttle.expiry_rate * 100,
+                },
+                extra={'spider': spider}
+            )
@@ -0,0 +1,173 @@
+"""
+Request signing shared by the api clients and the scrapy requests.
+
+http://docs.aws.amazon.com/AWSECommerceService/latest/DG/rest-signature.html
+"""
+import base64
+import datetime
+import hashlib
+import hmac
+import sys
+import time
+from functools import lru_cache
+from urllib import parse
+
+AMAZON_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.000Z'
+SERVICE = 'AWSECommerceService'
+PATH = '/onca/xml'
+
+# (second, formatted timestamp) of the last timestamp generated.
+_last_timestamp = (None, None)
+
+
+def amazon_timestamp(now=None):
+    """
+    Current UTC time in amazon timestamp format (YYYY-MM-DDThh:mm:ss.000Z).
+
+    The formatted value only changes once a second, so it is reused until then.
+    :param now: Optional epoch seconds to format instead of the current time.
+    """
+    global _last_timestamp
+    second = int(time.time() if now is None else now)
+    cached_second, formatted = _last_timestamp
+    if cached_second != second:
+        formatted = time.strftime(AMAZON_TIMESTAMP_FORMAT, time.gmtime(second))
+        _last_timestamp = (second, formatted)
+    return formatted
+
+
+def convert_to_gmtime(dt):
+    """
+    Convert the supplied date to GMT.
+    :param dt:
+    :return: parameter converted to GMT.
+    :rtype: datetime.datetime
+    """
+    # Get the local time offset from gmt. Added 1 second to account for the time the computer takes to
+    # generate utcnow and now.
+    hr_diff = (((datetime.datetime.utcnow() - datetime.datetime.now()).seconds + 1) / 60) / 60
+    return dt + datetime.timedelta(hours=hr_diff)
+
+
+def formatted_amazon_datetime_str(dt=None):
+    """
+    Format a datetime object to amazon timestamp format spec. (YYYY-MM-DDThh:mm:ssZ) where T and Z are literals.
+    :param dt: optional local datetime to suppy. If none supplied, then use current datetime.
+    :return: Formatted timestamp to use in request url.
+    """
+    if dt is None:
+        return amazon_timestamp()
+    gmtime = convert_to_gmtime(dt)
+    return gmtime.strftime(AMAZON_TIMESTAMP_FORMAT)
+
+
+def quote(value):
+    return parse.quote(str(value), safe='')
+
+
+def urlencode(query):
+    """Encode a sequence of two-element tuples or dictionary into a URL query string.
+
+    If any values in the query arg are sequences and doseq is true, each
+    sequence element is converted to a separate parameter.
+
+    If the query arg is a sequence of two-element tuples, the order of the
+    parameters in the output will match the order of parameters in the
+    input.
+
+    Taken straight from urllib.urlencode. This is necessary because urllib.urlencode uses quote_plus but aws expects
+    %20 instead of +.
+    """
+
+    if hasattr(query, "items"):
+        # mapping objects
+        query = query.items()
+    else:
+        # it's a bother at times that strings and string-like objects are
+        # sequences...
+        try:
+            # non-sequence items should not work with len()
+            # non-empty strings will fail this
+            if len(query) and not isinstance(query[0], tuple):
+                raise TypeError
+                # zero-length sequences of all types will get here and succeed,
+                # but that's a minor nit - since the original implementation
+                # allowed empty dicts that type of behavior probably should be
+                # preserved for consistency
+        except TypeError:
+            ty, va, tb = sys.exc_info()
+            raise TypeError("not a valid non-string sequence or mapping object").with_traceback(tb)
+
+    l = []
+    for k, v in query:
+        l.append(quote(k) + '=' + quote(v))
+    return '&'.join(l)
+
+
+class Signer(object):
+    """
+    Signs requests for one set of credentials on one marketplace.
+
+    The HMAC is keyed and fed the constant part of the string to sign once, and the credential parameters are
+    encoded once, so signing a request only encodes and sorts its own parameters.
+    """
+
+    def __init__(self, associate_tag, access_key, secret_key, marketplace):
+        self.associate_tag = associate_tag
+        self.access_key = access_key
+        self.marketplace = marketplace
+        self._static_params = {'AssociateTag': associate_tag, 'AWSAccessKeyId': access_key, 'Service': SERVICE}
+        self._static_pairs = [quote(k) + '=' + quote(v) for k, v in self._static_params.items()]
+        self._reserved = frozenset(self._static_params) | {'Operation', 'Timestamp'}
+        prefix = 'GET\n{}\n{}\n'.format(marketplace, PATH)
+        self._hmac = hmac.new(secret_key.encode('utf-8'), prefix.encode('utf-8'), digestmod=hashlib.sha256)
+
+    def signature(self, canonical_query):
+        """
+        :param canonical_query: Sorted, encoded query string.
+        :return: url encoded signature of the query.
+        """
+        h = self._hmac.copy()
+        h.update(canonical_query.encode('utf-8'))
+        return parse.quote(base64.b64encode(h.digest()))
+
+    def canonical_query(self, operation, params=None, timestamp=None):
+        """
+        Sorted, encoded query string of a request, without the signature.
+
+        :param operation: Product Advertising API operation.
+        :param params: Operation parameters. They take precedence over the credential parameters.
+        :param timestamp: Optional amazon formatted timestamp, defaults to now.
+        """
+        params = params or {}
+        if self._reserved.isdisjoint(params):
+            pairs = self._static_pairs + [
+                'Operation=' + quote(operation),
+                'Timestamp=' + quote(timestamp or amazon_timestamp()),
+            ]
+        else:
+            merged = dict(self._static_params, Operation=operation, Timestamp=timestamp or amazon_timestamp())
+            merged.update(params)
+            params = merged
+            pairs = []
+        pairs.extend(quote(k) + '=' + quote(v) for k, v in params.items())
+        pairs.sort()
+        return '&'.join(pairs)
+
+    def signed_query(self, operation, params=None, timestamp=None):
+        query = self.canonical_query(operation, params, timestamp)
+        return query + '&Signature=' + self.signature(query)
+
+    def url(self, operation, params=None, timestamp=None):
+        """
+        :return: Signed url ready to be sent to the marketplace.
+        """
+        return parse.urlunsplit(('http', self.marketplace, PATH, self.signed_query(operation, params, timestamp), None))
+
+
+@lru_cache(maxsize=128)
+def get_signer(associate_tag, access_key, secret_key, marketplace):
+    """
+    Shared Signer for a set of credentials and a marketplace.
+    """
+    return Signer(associate_tag, access_key, secret_key, marketplace)
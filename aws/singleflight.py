@@ -0,0 +1,105 @@
+"""
+Coalescing of identical requests which are in flight at the same time.
+
+The first caller for a key does the work, every caller arriving while it is running waits for and shares its
+result instead of spending quota on a duplicate request.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight(object):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Call fn, or wait for the call already running for `key`.
+
+        :return: Result of the call. If the call raised, every caller sharing it raises the same exception.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight(object):
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn, *args, **kwargs):
+        """
+        Await fn(*args, **kwargs), or the call already running for `key` on the same event loop.
+        """
+        key = (asyncio.get_event_loop(), key)
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(fn(*args, **kwargs))
+            task.add_done_callback(lambda t: self._calls.pop(key, None))
+        # Shield the shared call so one caller being cancelled does not cancel it for everyone else.
+        return await asyncio.shield(task)
+
+
+class InFlightItems(object):
+    """
+    Registry of individual ids which are being looked up, so overlapping bulk lookups can share them.
+
+    Ids are grouped by a key describing the rest of the lookup (response groups, marketplace...) since the same
+    id looked up with different parameters gives a different result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures = {}
+
+    def claim(self, group, ids):
+        """
+        Register ids as being looked up.
+
+        :return: (owned, futures). `owned` are the ids nobody else is looking up, the caller must look them up
+            and then call resolve or fail. `futures` has a concurrent.futures.Future for every id.
+        """
+        owned = []
+        futures = []
+        with self._lock:
+            for id_ in ids:
+                future = self._futures.get((group, id_))
+                if future is None:
+                    future = self._futures[(group, id_)] = Future()
+                    owned.append(id_)
+                futures.append(future)
+        return owned, futures
+
+    def _pop(self, group, ids):
+        with self._lock:
+            return [self._futures.pop((group, id_)) for id_ in ids]
+
+    def resolve(self, group, ids, results):
+        """
+        :param results: dict of id to result. Ids missing from it resolve to None.
+        """
+        for id_, future in zip(ids, self._pop(group, ids)):
+            future.set_result(results.get(id_))
+
+    def fail(self, group, ids, exception):
+        for future in self._pop(group, ids):
+            future.set_exception(exception)
@@ -0,0 +1,101 @@
+"""
+Minimal local stand-in for the Product Advertising API used by the client tests.
+"""
+import threading
+import time
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from urllib import parse
+
+ITEM_LOOKUP_RESPONSE = """<ItemLookupResponse xmlns="http://webservices.amazon.com/AWSECommerceService/2011-08-01">
+    <Items>
+        <Request>
+            <IsValid>True</IsValid>
+        </Request>
+        {items}
+    </Items>
+</ItemLookupResponse>"""
+
+ITEM = '<Item><ASIN>{asin}</ASIN></Item>'
+
+THROTTLED_RESPONSE = """<ItemLookupErrorResponse xmlns="http://ecs.amazonaws.com/doc/2005-10-05/">
+    <Error>
+        <Code>RequestThrottled</Code>
+        <Message>AWS Access Key ID: asdf. You are submitting requests too quickly.</Message>
+    </Error>
+    <RequestID>b0b5ef2d-5c8f-4e6e-a4f6-44a1f5a5e35b</RequestID>
+</ItemLookupErrorResponse>"""
+
+
+def item_lookup_body(item_ids):
+    return ITEM_LOOKUP_RESPONSE.format(items=''.join(ITEM.format(asin=asin) for asin in item_ids))
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubServer(object):
+    """
+    Serve ItemLookup responses echoing back the requested ItemIds from a background thread.
+
+    Every request is recorded in `requests` as a dict of its query parameters. `max_in_flight` tracks the
+    highest number of requests which were being served at the same time. `body` is either a fixed response
+    or a function of the query parameters returning the response.
+    """
+
+    def __init__(self, delay=0.0, body=None, status=200):
+        self.delay = delay
+        self.body = body
+        self.status = status
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self.server = _ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def host(self):
+        return '{}:{}'.format(*self.server.server_address)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                params = dict(parse.parse_qsl(parse.urlsplit(self.path).query))
+                with stub._lock:
+                    stub.requests.append(params)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                    if callable(stub.body):
+                        body = stub.body(params)
+                    else:
+                        body = stub.body or item_lookup_body(params.get('ItemId', '').split(','))
+                    body = body.encode('utf-8')
+                    self.send_response(stub.status)
+                    self.send_header('Content-Type', 'text/xml;charset=UTF-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
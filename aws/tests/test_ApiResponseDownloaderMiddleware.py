@@ -0,0 +1,103 @@
+import inspect
+from unittest import TestCase, mock
+
+from lxml import etree
+from scrapy import Request
+from scrapy.http import XmlResponse
+from scrapy.utils.test import get_crawler
+from twisted.internet.defer import ensureDeferred
+from twisted.internet.task import Clock
+
+from aws.parsers import ItemSearchResponse
+from aws.scrapy.middleware import (ApiResponseDownloaderMiddleware, PARSED_RESPONSE_META_KEY, RESPONSE_TREE_META_KEY,
+                                   parsed_response, response_error_code)
+from aws.scrapy.request import AwsAsinSearchRequest
+from aws.tests.stub_server import THROTTLED_RESPONSE, item_lookup_body
+from aws.tests.test_AwsRequest import SETTINGS
+
+EXPIRED_RESPONSE = THROTTLED_RESPONSE.replace('RequestThrottled', 'RequestExpired')
+
+
+class TestApiResponseDownloaderMiddleware(TestCase):
+
+    def setUp(self):
+        self.crawler = get_crawler(settings_dict={
+            'AWS_REQUEST_THROTTLED_RETRY_TIMES': 2,
+            'AWS_REQUEST_THROTTLED_RETRY_PRIORITY_ADJUST': -1,
+        })
+        self.middleware = ApiResponseDownloaderMiddleware.from_crawler(self.crawler)
+        self.middleware.clock = Clock()
+        self.request = Request('http://webservices.amazon.com/onca/xml?Operation=ItemLookup')
+
+    def response(self, body, status=200):
+        return XmlResponse(self.request.url, status=status, body=body.encode('utf-8'), request=self.request)
+
+    def test_valid_response(self):
+        response = self.response(item_lookup_body(['A1']))
+        self.assertIs(self.middleware.process_response(self.request, response, None), response)
+
+    def test_throttled_retry_is_deferred(self):
+        result = self.middleware.process_response(self.request, self.response(THROTTLED_RESPONSE, 503), None)
+        self.assertTrue(inspect.iscoroutine(result))
+        retried = []
+        ensureDeferred(result).addCallback(retried.append)
+        self.assertEqual(retried, [])
+
+        # Backoff for the first retry is between half and all of AWS_REQUEST_THROTTLED_RETRY_DELAY.
+        self.middleware.clock.advance(1)
+        self.assertEqual(len(retried), 1)
+        self.assertEqual(retried[0].meta['retry_times'], 1)
+        self.assertEqual(retried[0].priority, -1)
+        self.assertTrue(retried[0].dont_filter)
+        self.assertEqual(self.crawler.stats.get_value('request_throttled'), 1)
+
+    def test_backoff_grows(self):
+        for retries in range(1, 8):
+            delay = self.middleware._backoff(retries)
+            expected = min(60, 2 ** (retries - 1))
+            self.assertGreaterEqual(delay, expected / 2)
+            self.assertLessEqual(delay, expected)
+
+    def test_gives_up(self):
+        self.request.meta['retry_times'] = 2
+        response = self.response(THROTTLED_RESPONSE, 503)
+        self.assertIs(self.middleware.process_response(self.request, response, None), response)
+
+    def test_expired_retries_immediately(self):
+        result = self.middleware.process_response(self.request, self.response(EXPIRED_RESPONSE, 400), None)
+        self.assertIsInstance(result, Request)
+        self.assertEqual(result.meta['retry_times'], 1)
+
+    def test_retry_keeps_cb_kwargs(self):
+        with mock.patch('aws.scrapy.request.get_project_settings', return_value=SETTINGS):
+            self.request = AwsAsinSearchRequest('Automotive', 'Brand', item_page=2, cb_kwargs={'rank': 1})
+            result = self.middleware.process_response(self.request, self.response(EXPIRED_RESPONSE, 400), None)
+        self.assertIsInstance(result, AwsAsinSearchRequest)
+        self.assertEqual(result.item_page, 2)
+        self.assertEqual(result.cb_kwargs, {'rank': 1})
+
+    def test_error_response_parsed_once(self):
+        response = self.response(EXPIRED_RESPONSE, 400)
+        with mock.patch('aws.scrapy.middleware.etree.fromstring', wraps=etree.fromstring) as fromstring:
+            self.assertEqual(response_error_code(self.request, response), 'RequestExpired')
+            retry = self.middleware.process_response(self.request, response, None)
+        self.assertEqual(fromstring.call_count, 1)
+        self.assertNotIn(RESPONSE_TREE_META_KEY, retry.meta)
+
+    def test_error_code(self):
+        self.assertIsNone(response_error_code(self.request, self.response(item_lookup_body(['A1']))))
+        self.assertIsNone(response_error_code(self.request, self.response('not xml', 500)))
+        self.assertEqual(response_error_code(self.request, self.response(THROTTLED_RESPONSE, 503)),
+                         'RequestThrottled')
+
+    def test_parsed_response_is_shared(self):
+        response = self.response(item_lookup_body(['A1', 'A2']))
+        self.middleware.process_response(self.request, response, None)
+        parser = parsed_response(response)
+        self.assertIs(parser, self.request.meta[PARSED_RESPONSE_META_KEY])
+        self.assertIsInstance(parser, ItemSearchResponse)
+        self.assertEqual([x.asin for x in parser.items.items], ['A1', 'A2'])
+
+    def test_parsed_response_without_middleware(self):
+        response = self.response(item_lookup_body(['A1']))
+        self.assertEqual(parsed_response(response).items.items[0].asin, 'A1')
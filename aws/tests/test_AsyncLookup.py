@@ -0,0 +1,76 @@
+import asyncio
+from unittest import TestCase
+
+from aws import AsyncLookup, AsyncSearch, close_sessions
+from aws._async import get_session
+from aws.parsers import ItemLookupResponse
+from aws.parsers.errors import RequestThrottledError
+from aws.tests.stub_server import StubServer, THROTTLED_RESPONSE
+
+
+def run(coro):
+    async def wrapper():
+        try:
+            return await coro
+        finally:
+            await close_sessions()
+    return asyncio.run(wrapper())
+
+
+class TestAsyncLookup(TestCase):
+
+    def test_item_lookup(self):
+        with StubServer() as stub:
+            client = AsyncLookup('tag', 'access', 'secret', marketplace=stub.host)
+            content = run(client.item_lookup(item_ids=['A1', 'A2'], response_groups=['ItemIds']))
+        parser = ItemLookupResponse.from_string(content)
+        self.assertEqual([x.asin for x in parser.items.items], ['A1', 'A2'])
+        self.assertEqual(stub.requests[0]['ItemId'], 'A1,A2')
+        self.assertEqual(stub.requests[0]['Operation'], 'ItemLookup')
+        self.assertIn('Signature', stub.requests[0])
+
+    def test_concurrency_limit(self):
+        with StubServer(delay=0.05) as stub:
+            client = AsyncLookup('tag', 'access', 'secret', marketplace=stub.host, concurrency=3)
+
+            async def lookups():
+                return await asyncio.gather(*[client.item_lookup(item_ids=[str(i)]) for i in range(12)])
+
+            results = run(lookups())
+        self.assertEqual(len(results), 12)
+        self.assertEqual(len(stub.requests), 12)
+        self.assertLessEqual(stub.max_in_flight, 3)
+        self.assertGreater(stub.max_in_flight, 1)
+
+    def test_raises_for_error_content(self):
+        with StubServer(body=THROTTLED_RESPONSE, status=503) as stub:
+            client = AsyncLookup('tag', 'access', 'secret', marketplace=stub.host)
+            with self.assertRaises(RequestThrottledError):
+                run(client.item_lookup(item_ids=['A1']))
+
+    def test_shared_session(self):
+        with StubServer() as stub:
+            search = AsyncSearch('tag', 'access', 'secret', marketplace=stub.host)
+            lookup = AsyncLookup('tag', 'access', 'secret', marketplace=stub.host)
+
+            async def sessions():
+                await search.asin_search('All', 'brand')
+                await lookup.item_lookup(item_ids=['A1'])
+                return get_session(search.marketplace), get_session(lookup.marketplace)
+
+            first, second = run(sessions())
+        self.assertIs(first, second)
+        self.assertEqual(stub.requests[0]['Operation'], 'ItemSearch')
+
+    def test_bulk_item_lookup(self):
+        asins = ['A{}'.format(i) for i in range(45)]
+        with StubServer(delay=0.02) as stub:
+            client = AsyncLookup('tag', 'access', 'secret', marketplace=stub.host, concurrency=2)
+
+            async def lookup():
+                return [item.asin async for item in client.bulk_item_lookup(iter(asins))]
+
+            found = run(lookup())
+        self.assertEqual(len(stub.requests), 5)
+        self.assertLessEqual(stub.max_in_flight, 2)
+        self.assertEqual(sorted(found), sorted(asins))
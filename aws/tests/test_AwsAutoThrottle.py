@@ -0,0 +1,120 @@
+from unittest import TestCase, mock
+
+from scrapy import Request
+from scrapy.exceptions import NotConfigured
+from scrapy.http import XmlResponse
+from scrapy.utils.test import get_crawler
+
+from aws.scrapy.request import AwsRequest
+from aws.scrapy.throttle import AwsAutoThrottle
+from aws.tests.stub_server import THROTTLED_RESPONSE, item_lookup_body
+from aws.tests.test_AwsRequest import SETTINGS
+
+EXPIRED_RESPONSE = THROTTLED_RESPONSE.replace('RequestThrottled', 'RequestExpired')
+
+
+class Slot(object):
+
+    def __init__(self, concurrency=8, delay=0):
+        self.concurrency = concurrency
+        self.delay = delay
+
+
+class TestAwsAutoThrottle(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('aws.scrapy.request.get_project_settings', return_value=SETTINGS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.crawler = get_crawler(settings_dict={
+            'AWS_AUTOTHROTTLE_ENABLED': True,
+            'AWS_AUTOTHROTTLE_START_RATE': 1,
+            'AWS_AUTOTHROTTLE_MAX_CONCURRENCY': 16,
+        })
+        self.slot = Slot()
+        self.crawler.engine = mock.Mock()
+        self.crawler.engine.downloader.slots = {'aws': self.slot}
+        self.throttle = AwsAutoThrottle.from_crawler(self.crawler)
+        self.now = 0.0
+        self.throttle.clock = lambda: self.now
+
+    def respond(self, body=None, status=200, latency=0.2, request=None):
+        if request is None:
+            request = AwsRequest('ItemLookup', {'ItemId': 'A1'}, meta={'download_slot': 'aws'})
+        request.meta['download_latency'] = latency
+        body = body or item_lookup_body(['A1'])
+        response = XmlResponse(request.url, status=status, body=body.encode('utf-8'), request=request)
+        self.throttle.response_downloaded(response, request, None)
+        return self.throttle.slots.get('aws')
+
+    def test_not_enabled(self):
+        with self.assertRaises(NotConfigured):
+            AwsAutoThrottle.from_crawler(get_crawler())
+
+    def test_invalid_settings(self):
+        with self.assertRaises(NotConfigured):
+            AwsAutoThrottle.from_crawler(get_crawler(settings_dict={
+                'AWS_AUTOTHROTTLE_ENABLED': True, 'AWS_AUTOTHROTTLE_BACKOFF_FACTOR': 2}))
+
+    def test_rate_grows_without_throttling(self):
+        for _ in range(10):
+            state = self.respond()
+        self.assertGreater(state.rate, 1)
+        self.assertAlmostEqual(self.slot.delay, 1 / state.rate)
+
+    def test_throttled_cuts_rate_once_per_round_trip(self):
+        for _ in range(20):
+            self.respond()
+        rate = self.throttle.slots['aws'].rate
+        self.now = 10
+        for _ in range(5):
+            state = self.respond(THROTTLED_RESPONSE, 503)
+        self.assertAlmostEqual(state.rate, rate / 2)
+        self.assertEqual(self.crawler.stats.get_value('aws_autothrottle/RequestThrottled'), 5)
+        self.now = 11
+        self.assertAlmostEqual(self.respond(THROTTLED_RESPONSE, 503).rate, rate / 4)
+
+    def test_rate_bounds(self):
+        self.now = 0
+        for i in range(50):
+            self.now += 1
+            state = self.respond(THROTTLED_RESPONSE, 503)
+        self.assertAlmostEqual(state.rate, 1 / 60.0)
+
+    def test_expired_holds_rate(self):
+        rate = self.respond().rate
+        self.assertEqual(self.respond(EXPIRED_RESPONSE, 400).rate, rate)
+        self.assertEqual(self.respond().rate, rate)
+        self.assertEqual(self.crawler.stats.get_value('aws_autothrottle/RequestExpired'), 1)
+
+    def test_concurrency_follows_latency(self):
+        state = self.respond(latency=3)
+        self.assertEqual(self.slot.concurrency, 5)
+        for _ in range(30):
+            self.respond(latency=3)
+        self.assertEqual(self.slot.concurrency, state.concurrency)
+        self.assertGreater(self.slot.concurrency, 5)
+
+    def test_other_requests_are_ignored(self):
+        request = Request('http://example.com', meta={'download_slot': 'aws', 'download_latency': 0.1})
+        self.throttle.response_downloaded(XmlResponse(request.url, body=b'<a/>', request=request), request, None)
+        self.assertEqual(self.throttle.slots, {})
+        self.assertEqual(self.slot.delay, 0)
+
+    def test_settles_below_quota(self):
+        # The api allows 5 requests per second. Simulate a crawl sending requests at the slot's rate.
+        quota = 5.0
+        rates = []
+        for _ in range(3000):
+            state = self.throttle.slots.get('aws')
+            rate = state.rate if state else 1
+            self.now += 1 / rate
+            if rate > quota:
+                state = self.respond(THROTTLED_RESPONSE, 503, latency=0.1)
+            else:
+                state = self.respond(latency=0.2)
+            rates.append(state.rate)
+        settled = rates[1000:]
+        self.assertGreater(min(settled), quota * 0.4)
+        self.assertLess(max(settled), quota * 1.1)
+        self.assertGreater(sum(settled) / len(settled), quota * 0.6)
@@ -0,0 +1,145 @@
+from unittest import TestCase, mock
+
+from scrapy import Request
+from scrapy.exceptions import DontCloseSpider
+from scrapy.http import XmlResponse
+from scrapy.spiders import Spider
+from scrapy.utils.test import get_crawler
+from twisted.internet.task import Clock
+from twisted.python.failure import Failure
+
+from aws.benchmarks import synthetic
+from aws.scrapy.batching import LOOKUP_BATCH_META_KEY, AwsItemLookupBatchMiddleware, looked_up_item
+from aws.scrapy.request import AwsItemLookupRequest
+from aws.tests.test_AwsRequest import SETTINGS, query
+
+
+class LookupSpider(Spider):
+    name = 'lookup'
+
+    def parse(self, response):
+        yield {'default': looked_up_item(response).asin}
+
+    def parse_item(self, response, rank=None):
+        item = looked_up_item(response)
+        yield {'asin': item.asin if item is not None else None, 'meta': response.meta.get('key'), 'rank': rank}
+
+    def failed(self, failure):
+        yield {'failed': failure.request.item_ids, 'meta': failure.request.meta.get('key'),
+               'error': failure.getErrorMessage()}
+
+
+class TestAwsItemLookupBatchMiddleware(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('aws.scrapy.request.get_project_settings', return_value=SETTINGS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.crawler = get_crawler(settings_dict={'AWS_LOOKUP_BATCH_TIMEOUT': 2})
+        self.crawler.engine = mock.Mock()
+        self.spider = self.crawler.spider = LookupSpider()
+        self.middleware = AwsItemLookupBatchMiddleware.from_crawler(self.crawler)
+        self.middleware.clock = Clock()
+
+    def lookup(self, asin, **kwargs):
+        kwargs.setdefault('callback', self.spider.parse_item)
+        return AwsItemLookupRequest(asin, **kwargs)
+
+    def output(self, result):
+        return list(self.middleware.process_spider_output(None, result, self.spider))
+
+    def respond(self, batch, asins=None):
+        asins = batch.item_ids if asins is None else asins
+        body = synthetic.item_lookup_response(asins)
+        return XmlResponse(batch.url, body=body, request=batch)
+
+    def test_full_batch(self):
+        other = Request('http://example.com')
+        output = self.output([other] + [self.lookup('A{}'.format(i)) for i in range(12)])
+        self.assertEqual(len(output), 2)
+        self.assertIs(output[0], other)
+        batch = output[1]
+        self.assertEqual(query(batch)['ItemId'], ','.join('A{}'.format(i) for i in range(10)))
+        self.assertEqual(self.crawler.stats.get_value('aws_lookup_batch/requests'), 12)
+        self.assertEqual(self.crawler.stats.get_value('aws_lookup_batch/batches'), 1)
+
+    def test_routes_items_to_their_requests(self):
+        requests = [self.lookup('A{}'.format(i), meta={'key': i}, cb_kwargs={'rank': i * 10}) for i in range(10)]
+        batch = self.output(requests)[0]
+        results = list(batch.callback(self.respond(batch)))
+        self.assertEqual(results, [{'asin': 'A{}'.format(i), 'meta': i, 'rank': i * 10} for i in range(10)])
+
+    def test_missing_item(self):
+        batch = self.output([self.lookup('A{}'.format(i)) for i in range(10)])[0]
+        results = list(batch.callback(self.respond(batch, ['A{}'.format(i) for i in range(9)])))
+        self.assertEqual(results[-1]['asin'], None)
+        self.assertEqual(self.crawler.stats.get_value('aws_lookup_batch/missing'), 1)
+
+    def test_same_asin_twice(self):
+        requests = [self.lookup('A1', meta={'key': 'first'}), self.lookup('A1', meta={'key': 'second'})]
+        self.assertEqual(self.output(requests), [])
+        self.middleware.clock.advance(2)
+        batch = self.crawler.engine.crawl.call_args[0][0]
+        self.assertEqual(batch.item_ids, ['A1'])
+        self.assertEqual([r['meta'] for r in batch.callback(self.respond(batch))], ['first', 'second'])
+
+    def test_default_callback(self):
+        batch = self.output([self.lookup('A{}'.format(i), callback=None) for i in range(10)])[0]
+        self.assertEqual(list(batch.callback(self.respond(batch)))[0], {'default': 'A0'})
+
+    def test_groups_by_parameters(self):
+        output = self.output([self.lookup('A{}'.format(i), response_groups=('Large',)) for i in range(5)] +
+                             [self.lookup('B{}'.format(i), response_groups=('OfferSummary',)) for i in range(10)])
+        self.assertEqual(len(output), 1)
+        self.assertEqual(query(output[0])['ResponseGroup'], 'OfferSummary')
+        self.assertEqual(len(self.middleware.buffers), 1)
+
+    def test_timeout(self):
+        self.output([self.lookup('A1'), self.lookup('A2')])
+        self.middleware.clock.advance(1)
+        self.assertFalse(self.crawler.engine.crawl.called)
+        self.middleware.clock.advance(1)
+        batch = self.crawler.engine.crawl.call_args[0][0]
+        self.assertEqual(batch.item_ids, ['A1', 'A2'])
+        self.assertEqual(self.middleware.buffers, {})
+
+    def test_full_batch_cancels_timeout(self):
+        self.output([self.lookup('A{}'.format(i)) for i in range(10)])
+        self.assertEqual(self.middleware.clock.getDelayedCalls(), [])
+
+    def test_spider_idle(self):
+        self.middleware.spider_idle(self.spider)
+        self.output([self.lookup('A1')])
+        self.assertRaises(DontCloseSpider, self.middleware.spider_idle, self.spider)
+        self.assertEqual(self.crawler.engine.crawl.call_args[0][0].item_ids, ['A1'])
+        self.assertEqual(self.middleware.clock.getDelayedCalls(), [])
+
+    def test_batches_pass_through(self):
+        batch = self.output([self.lookup('A{}'.format(i)) for i in range(10)])[0]
+        retry = batch.replace(item_ids=['A1'])
+        self.assertIn(LOOKUP_BATCH_META_KEY, retry.meta)
+        self.assertEqual(self.output([retry]), [retry])
+        pair = self.lookup(['A1', 'A2'])
+        self.assertEqual(self.output([pair]), [pair])
+
+    def test_errbacks(self):
+        requests = [self.lookup('A{}'.format(i), errback=self.spider.failed, meta={'key': i}) for i in range(9)]
+        batch = self.output(requests + [self.lookup('B')])[0]
+        failure = Failure(ValueError('failed'))
+        failure.request = batch
+        results = list(batch.errback(failure))
+        self.assertEqual(results, [{'failed': ['A{}'.format(i)], 'meta': i, 'error': 'failed'} for i in range(9)])
+        self.assertIs(failure.request, batch)
+
+
+class TestLookedUpItem(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('aws.scrapy.request.get_project_settings', return_value=SETTINGS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_request_sent_on_its_own(self):
+        request = AwsItemLookupRequest('A2')
+        response = XmlResponse(request.url, body=synthetic.item_lookup_response(['A1', 'A2']), request=request)
+        self.assertEqual(looked_up_item(response).asin, 'A2')
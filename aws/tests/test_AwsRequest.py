@@ -0,0 +1,106 @@
+from unittest import TestCase, mock
+from urllib import parse
+
+from scrapy.settings import Settings
+from scrapy.utils.test import get_crawler
+
+from aws.scrapy.middleware import AwsRequestSigningMiddleware
+from aws.scrapy.request import AwsRequest, AwsAsinSearchRequest, AwsItemLookupRequest
+
+SETTINGS = Settings({
+    'AWS_ACCESS_KEY_ID': 'access',
+    'AWS_SECRET_ACCESS_KEY': 'secret',
+    'AWS_ASSOCIATE_TAG': 'tag',
+    'AWS_MARKETPLACE': 'webservices.amazon.com',
+})
+
+
+def query(request):
+    return dict(parse.parse_qsl(parse.urlsplit(request.url).query))
+
+
+class TestAwsRequest(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('aws.scrapy.request.get_project_settings', return_value=SETTINGS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_url(self):
+        request = AwsRequest('ItemLookup', {'ItemId': 'A1'})
+        params = query(request)
+        self.assertEqual(params['Operation'], 'ItemLookup')
+        self.assertEqual(params['ItemId'], 'A1')
+        self.assertEqual(params['AWSAccessKeyId'], 'access')
+        self.assertIn('Signature', params)
+
+    def test_sign_restamps(self):
+        request = AwsRequest('ItemLookup', {'ItemId': 'A1'})
+        with mock.patch('aws.signing.amazon_timestamp', return_value='2030-01-01T00:00:00.000Z'):
+            request.sign()
+        params = query(request)
+        self.assertEqual(params['Timestamp'], '2030-01-01T00:00:00.000Z')
+        self.assertEqual(params['ItemId'], 'A1')
+
+    def test_copy(self):
+        request = AwsRequest('ItemLookup', {'ItemId': 'A1'}, meta={'key': 'value'}, cb_kwargs={'x': 1}, flags=['f'])
+        copy = request.copy()
+        self.assertIsInstance(copy, AwsRequest)
+        self.assertEqual(copy.operation, 'ItemLookup')
+        self.assertEqual(copy.meta, {'key': 'value'})
+        self.assertEqual(copy.cb_kwargs, {'x': 1})
+        self.assertEqual(copy.flags, ['f'])
+
+    def test_asin_search_copy(self):
+        request = AwsAsinSearchRequest('Automotive', 'Brand', item_page=2, cb_kwargs={'x': 1}, flags=['f'])
+        copy = request.copy()
+        self.assertEqual(query(copy)['ItemPage'], '2')
+        self.assertEqual(copy.cb_kwargs, {'x': 1})
+        self.assertEqual(copy.flags, ['f'])
+
+    def test_asin_search_sign(self):
+        request = AwsAsinSearchRequest('Automotive', 'Brand', item_page=2)
+        request.sign()
+        params = query(request)
+        self.assertEqual(params['Operation'], 'ItemSearch')
+        self.assertEqual(params['ItemPage'], '2')
+        self.assertEqual(params['Brand'], 'Brand')
+
+    def test_item_lookup(self):
+        request = AwsItemLookupRequest('A1', response_groups=('ItemAttributes', 'OfferSummary'),
+                                       extra={'Condition': 'New'})
+        params = query(request)
+        self.assertEqual(params['Operation'], 'ItemLookup')
+        self.assertEqual(params['ItemId'], 'A1')
+        self.assertEqual(params['ResponseGroup'], 'ItemAttributes,OfferSummary')
+        self.assertEqual(params['Condition'], 'New')
+        self.assertEqual(request.item_ids, ['A1'])
+
+    def test_item_lookup_replace(self):
+        request = AwsItemLookupRequest(['A1', 'A2'], extra={'Condition': 'New'}, cb_kwargs={'rank': 1})
+        copy = request.replace(item_ids=['A3'])
+        self.assertEqual(query(copy)['ItemId'], 'A3')
+        self.assertEqual(query(copy)['Condition'], 'New')
+        self.assertEqual(copy.cb_kwargs, {'rank': 1})
+        self.assertEqual(query(request.copy())['ItemId'], 'A1,A2')
+
+    def test_item_lookup_max_item_ids(self):
+        self.assertRaises(ValueError, AwsItemLookupRequest, ['A{}'.format(i) for i in range(11)])
+        self.assertRaises(ValueError, AwsItemLookupRequest, [])
+
+
+class TestAwsRequestSigningMiddleware(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('aws.scrapy.request.get_project_settings', return_value=SETTINGS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.crawler = get_crawler()
+        self.middleware = AwsRequestSigningMiddleware.from_crawler(self.crawler)
+
+    def test_process_request(self):
+        request = AwsRequest('ItemLookup', {'ItemId': 'A1'})
+        with mock.patch('aws.signing.amazon_timestamp', return_value='2030-01-01T00:00:00.000Z'):
+            self.assertIsNone(self.middleware.process_request(request, None))
+        self.assertEqual(query(request)['Timestamp'], '2030-01-01T00:00:00.000Z')
+        self.assertEqual(self.crawler.stats.get_value('aws_request_signed'), 1)
@@ -1,6 +1,7 @@
+import warnings
 from unittest import TestCase
 
-from aws.parsers.base import BaseElementWrapper
+from aws.parsers.base import BaseElementWrapper, XMLWarning, compile_xpath
 from aws.parsers.helpers import parse_bool
 
 
@@ -20,6 +21,34 @@ class TestBaseElementWrapper(TestCase):
         self.assertEqual(parser.to_string(), xml_string)
 
 
+class TestNamespaceValidation(TestCase):
+
+    def test_warns_without_namespace(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            BaseElementWrapper.from_string('<Element>Testing</Element>')
+        self.assertEqual([w.category for w in caught], [XMLWarning])
+
+    def test_no_warning_with_namespace(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            BaseElementWrapper.from_string('<Element xmlns="suppressWarnings">Testing</Element>')
+        self.assertEqual(caught, [])
+
+    def test_children_are_not_validated(self):
+        parser = BaseElementWrapper.from_string('<Element xmlns="suppressWarnings"><Child/></Element>')
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            BaseElementWrapper(parser.element[0])
+        self.assertEqual(caught, [])
+
+    def test_validation_disabled(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            BaseElementWrapper.from_string('<Element>Testing</Element>', validate=False)
+        self.assertEqual(caught, [])
+
+
 class TestParseBool(TestCase):
 
     def test_true_with_upper(self):
@@ -33,3 +62,23 @@ class TestParseBool(TestCase):
 
     def test_false_with_lower(self):
         self.assertFalse(parse_bool(lambda: 'false')())
+
+
+class TestCompileXPath(TestCase):
+
+    def test_compiled_once(self):
+        namespaces = {'a': 'suppressWarnings'}
+        self.assertIs(compile_xpath('./a:Child', namespaces), compile_xpath('./a:Child', namespaces))
+
+    def test_namespaces_are_part_of_key(self):
+        self.assertIsNot(compile_xpath('./a:Child', {'a': 'one'}), compile_xpath('./a:Child', {'a': 'two'}))
+
+    def test_equal_namespaces_share_key(self):
+        self.assertIs(compile_xpath('./a:Child/b:Child', {'a': 'one', 'b': 'two'}),
+                      compile_xpath('./a:Child/b:Child', {'b': 'two', 'a': 'one'}))
+
+    def test_variables(self):
+        parser = BaseElementWrapper.from_string('<Element xmlns="suppressWarnings"><Child Name="x"/></Element>',
+                                                namespaces={'a': 'suppressWarnings'})
+        self.assertEqual(len(parser.xpath('./a:Child[@Name=$name]', name='x')), 1)
+        self.assertEqual(len(parser.xpath('./a:Child[@Name=$name]', name='y')), 0)
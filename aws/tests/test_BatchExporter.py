@@ -0,0 +1,141 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase, mock
+
+from scrapy.exceptions import NotConfigured
+from scrapy.spiders import Spider
+from scrapy.utils.test import get_crawler
+from twisted.internet.defer import ensureDeferred, maybeDeferred
+
+from aws.benchmarks.synthetic import item_search_response
+from aws.export import FIELDS, BatchExporter, pyarrow, to_row
+from aws.parsers import ItemSearchResponse
+from aws.parsers.records import ItemRecord
+from aws.scrapy.pipelines import AwsExportPipeline
+
+
+class TestBatchExporter(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.items = ItemSearchResponse.from_string(item_search_response(items=10)).items.items
+
+    def read_jsonl(self, path):
+        with open(path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_to_row(self):
+        record = self.items[0].to_record()
+        self.assertEqual(to_row(self.items[0]), record.as_dict())
+        self.assertEqual(to_row(record), record.as_dict())
+        self.assertEqual(to_row({'asin': 'A1'}), {'asin': 'A1'})
+
+    def test_jsonl(self):
+        with BatchExporter(self.directory, batch_size=3) as exporter:
+            exporter.add_all(self.items)
+        self.assertEqual(exporter.rows, 10)
+        self.assertEqual(exporter.files, [os.path.join(self.directory, 'items-00001.jsonl')])
+        rows = self.read_jsonl(exporter.files[0])
+        self.assertEqual([r['asin'] for r in rows], [item.asin for item in self.items])
+        self.assertEqual(rows[0], self.items[0].to_record().as_dict())
+
+    def test_nothing_written_until_batch_is_full(self):
+        with BatchExporter(self.directory, batch_size=5) as exporter:
+            exporter.add_all(self.items[:4])
+            exporter._queue.join()
+            self.assertEqual(exporter.rows, 0)
+            exporter.add(self.items[4])
+            exporter._queue.join()
+            self.assertEqual(exporter.rows, 5)
+
+    def test_flush(self):
+        with BatchExporter(self.directory) as exporter:
+            exporter.add(self.items[0])
+            exporter.flush()
+            self.assertEqual(len(self.read_jsonl(exporter.files[0])), 1)
+
+    def test_rotates_files(self):
+        with BatchExporter(self.directory, batch_size=2, max_file_size=1) as exporter:
+            exporter.add_all(self.items)
+        self.assertEqual(len(exporter.files), 5)
+        self.assertEqual(sum(len(self.read_jsonl(path)) for path in exporter.files), 10)
+
+    def test_numbering_continues(self):
+        with BatchExporter(self.directory) as exporter:
+            exporter.add(self.items[0])
+        with BatchExporter(self.directory) as exporter:
+            exporter.add(self.items[1])
+        self.assertEqual(exporter.files, [os.path.join(self.directory, 'items-00002.jsonl')])
+
+    def test_csv(self):
+        with BatchExporter(self.directory, format='csv', batch_size=4, max_file_size=1,
+                           fields=['asin', 'price']) as exporter:
+            exporter.add_all(self.items)
+            exporter.add({'asin': 'A1', 'title': 'Not exported'})
+        rows = []
+        for path in exporter.files:
+            with open(path, newline='') as f:
+                rows.extend(csv.DictReader(f))
+        self.assertEqual(len(exporter.files), 3)
+        self.assertEqual(len(rows), 11)
+        self.assertEqual(rows[-1], {'asin': 'A1', 'price': ''})
+        self.assertEqual(rows[0]['price'], str(self.items[0].to_record().price))
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, BatchExporter, self.directory, format='xml')
+
+    @unittest.skipIf(pyarrow is not None, 'pyarrow is installed')
+    def test_parquet_needs_pyarrow(self):
+        self.assertRaises(ImportError, BatchExporter, self.directory, format='parquet')
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet(self):
+        import pyarrow.parquet
+        with BatchExporter(self.directory, format='parquet', batch_size=4) as exporter:
+            exporter.add_all(self.items)
+        table = pyarrow.parquet.read_table(exporter.files[0])
+        self.assertEqual(table.column_names, list(FIELDS))
+        self.assertEqual(table.column('asin').to_pylist(), [item.asin for item in self.items])
+
+    def test_writer_errors_are_raised(self):
+        exporter = BatchExporter(self.directory, batch_size=1, fields=['asin'])
+        exporter.add({'asin': object()})
+        with self.assertRaises(TypeError):
+            exporter.close()
+
+
+class TestAwsExportPipeline(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_not_configured(self):
+        self.assertRaises(NotConfigured, AwsExportPipeline.from_crawler, get_crawler())
+
+    def test_exports_items(self):
+        crawler = get_crawler(settings_dict={'AWS_EXPORT_DIR': self.directory, 'AWS_EXPORT_BATCH_SIZE': 2})
+        pipeline = AwsExportPipeline.from_crawler(crawler)
+        spider = Spider('brands')
+        pipeline.open_spider(spider)
+        record = ItemRecord(asin='A1', price=100)
+        self.assertIs(pipeline.process_item(record, spider), record)
+        pipeline.process_item({'asin': 'A2'}, spider)
+        pipeline.process_item({'asin': 'A3'}, spider)
+        closed = []
+        with mock.patch('aws.scrapy.pipelines.threads.deferToThread', maybeDeferred):
+            ensureDeferred(pipeline.close_spider(spider)).addCallback(closed.append)
+        self.assertEqual(closed, [None])
+
+        with open(os.path.join(self.directory, 'brands', 'brands-00001.jsonl')) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([r['asin'] for r in rows], ['A1', 'A2', 'A3'])
+        self.assertEqual(rows[0]['price'], 100)
+        self.assertEqual(crawler.stats.get_value('aws_export/items'), 3)
+        self.assertEqual(crawler.stats.get_value('aws_export/rows'), 3)
+        self.assertEqual(crawler.stats.get_value('aws_export/files'), 1)
@@ -0,0 +1,55 @@
+from unittest import TestCase
+
+from aws.benchmarks import synthetic
+from aws.benchmarks.suite import benchmarks, compare, traverse
+from aws.parsers import ItemSearchResponse
+
+
+class TestSynthetic(TestCase):
+
+    def test_page(self):
+        response = ItemSearchResponse.from_string(synthetic.item_search_response(items=10, total_results=400))
+        self.assertTrue(response.items.request.is_valid)
+        self.assertEqual(int(response.items.total_results), 400)
+        self.assertEqual(int(response.items.total_pages), 40)
+        items = response.items.items
+        self.assertEqual([i.asin for i in items], [synthetic.asin(n) for n in range(10)])
+        self.assertEqual(len(response.search_bins('BrandName')), 10)
+        self.assertEqual(len(response.search_bins('Subject')), 10)
+
+    def test_item_is_complete(self):
+        item = ItemSearchResponse.from_string(synthetic.item_search_response(items=1)).items.items[0]
+        record = item.to_record()
+        for field in ('asin', 'sales_rank', 'title', 'brand', 'price', 'lowest_new_price', 'lowest_used_price',
+                      'small_image_url', 'medium_image_url', 'large_image_url'):
+            self.assertIsNotNone(getattr(record, field), field)
+        self.assertTrue(item.image_set_primary.swatch_image.url)
+        self.assertTrue(item.image_set_variant.large_image.url)
+        self.assertEqual(int(item.offer.price.amount), record.lowest_new_price)
+
+    def test_item_page_offsets_asins(self):
+        response = ItemSearchResponse.from_string(synthetic.item_search_response(items=10, item_page=3))
+        self.assertEqual(response.items.items[0].asin, synthetic.asin(20))
+
+    def test_deterministic(self):
+        self.assertEqual(synthetic.item_search_response(seed=1), synthetic.item_search_response(seed=1))
+
+
+class TestSuite(TestCase):
+
+    def test_benchmarks_run(self):
+        functions = benchmarks()
+        self.assertIn('parse.page', functions)
+        self.assertIn('sign.generate_signature', functions)
+        for name, fn in functions.items():
+            if 'archive' not in name:
+                fn()
+
+    def test_traverse(self):
+        values = traverse(ItemSearchResponse.from_string(synthetic.item_search_response(items=2)))
+        self.assertNotIn(None, values)
+
+    def test_compare(self):
+        results = compare({'a': 1.2, 'b': 1.3, 'c': 1.0}, {'a': 1.0, 'b': 1.0}, tolerance=0.25)
+        self.assertEqual([(r.name, r.regression) for r in results], [('a', False), ('b', True), ('c', False)])
+        self.assertIsNone(results[2].baseline)
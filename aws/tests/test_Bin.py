@@ -25,3 +25,30 @@ class TestBin(TestCase):
     def test_bin_parameter(self):
         self.assertTrue(self.parser.bin_parameter)
         self.assertIsInstance(self.parser.bin_parameter, BinParameter)
+
+
+class TestPriceRangeBin(TestCase):
+
+    body = """
+    <Bin xmlns="http://webservices.amazon.com/AWSECommerceService/2011-08-01">
+        <BinName>$25-$49</BinName>
+        <BinItemCount>212</BinItemCount>
+        <BinParameter>
+            <Name>MinimumPrice</Name>
+            <Value>2500</Value>
+        </BinParameter>
+        <BinParameter>
+            <Name>MaximumPrice</Name>
+            <Value>4999</Value>
+        </BinParameter>
+    </Bin>
+    """
+
+    def setUp(self):
+        self.parser = Bin.from_string(self.body)
+
+    def test_bin_parameters(self):
+        self.assertEqual([x.name for x in self.parser.bin_parameters], ['MinimumPrice', 'MaximumPrice'])
+
+    def test_as_request_params(self):
+        self.assertEqual(self.parser.as_request_params(), {'MinimumPrice': '2500', 'MaximumPrice': '4999'})
@@ -0,0 +1,80 @@
+import array
+import unittest
+
+from aws.parsers import ItemSearchResponse
+from aws.parsers.columns import responses_to_columns, numpy
+
+BODY = """
+<ItemSearchResponse xmlns="http://webservices.amazon.com/AWSECommerceService/2011-08-01">
+    <Items>
+        <Item>
+            <ASIN>A1</ASIN>
+            <SalesRank>10</SalesRank>
+            <OfferSummary>
+                <LowestNewPrice><Amount>1999</Amount></LowestNewPrice>
+                <TotalNew>3</TotalNew>
+                <TotalUsed>0</TotalUsed>
+            </OfferSummary>
+        </Item>
+        <Item>
+            <ASIN>{asin}</ASIN>
+            <OfferSummary>
+                <LowestUsedPrice><Amount>500</Amount></LowestUsedPrice>
+                <TotalNew>0</TotalNew>
+                <TotalUsed>1</TotalUsed>
+            </OfferSummary>
+        </Item>
+    </Items>
+</ItemSearchResponse>
+"""
+
+
+class TestColumnsArray(unittest.TestCase):
+
+    def setUp(self):
+        self.columns = ItemSearchResponse.from_string(BODY.format(asin='A2')).to_columns(use_numpy=False)
+
+    def test_text(self):
+        self.assertEqual(self.columns['asin'].values, ['A1', 'A2'])
+        self.assertEqual(list(self.columns['asin'].mask), [0, 0])
+
+    def test_ints(self):
+        column = self.columns['sales_rank']
+        self.assertIsInstance(column.values, array.array)
+        self.assertEqual(list(column.values), [10, 0])
+        self.assertEqual(list(column.mask), [0, 1])
+        self.assertEqual(list(self.columns['lowest_new_price'].values), [1999, 0])
+        self.assertEqual(list(self.columns['lowest_used_price'].values), [0, 500])
+        self.assertEqual(list(self.columns['total_used'].values), [0, 1])
+        self.assertEqual(list(self.columns['total_used'].mask), [0, 0])
+
+    def test_concatenate(self):
+        responses = [ItemSearchResponse.from_string(BODY.format(asin='A{}'.format(i))) for i in range(2, 5)]
+        columns = responses_to_columns(responses, use_numpy=False)
+        self.assertEqual(columns['asin'].values, ['A1', 'A2', 'A1', 'A3', 'A1', 'A4'])
+        self.assertEqual(len(columns['total_new'].values), 6)
+
+    def test_empty_response(self):
+        parser = ItemSearchResponse.from_string(
+            '<ItemSearchResponse xmlns="http://webservices.amazon.com/AWSECommerceService/2011-08-01"/>')
+        self.assertEqual(parser.to_columns(use_numpy=False)['asin'].values, [])
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class TestColumnsNumpy(unittest.TestCase):
+
+    def setUp(self):
+        self.columns = ItemSearchResponse.from_string(BODY.format(asin='A2')).to_columns(use_numpy=True)
+
+    def test_ints(self):
+        column = self.columns['sales_rank']
+        self.assertEqual(column.values.dtype, numpy.int64)
+        self.assertEqual(column.values.tolist(), [10, 0])
+        self.assertEqual(column.mask.tolist(), [False, True])
+
+    def test_masked_sum(self):
+        column = self.columns['lowest_new_price']
+        self.assertEqual(column.values[~column.mask].sum(), 1999)
+
+    def test_text(self):
+        self.assertEqual(self.columns['asin'].values.tolist(), ['A1', 'A2'])
@@ -0,0 +1,188 @@
+import json
+from unittest import TestCase, mock
+
+from scrapy.http import XmlResponse
+from scrapy.settings import Settings
+from scrapy.utils.test import get_crawler
+
+from aws import Lookup
+from aws.credentials import CredentialPool, Credentials, error_code, get_credential_pool
+from aws.parsers.errors import RequestThrottledError
+from aws.ratelimit import configure_rate_limit, clear_rate_limit, get_rate_limit
+from aws.scrapy.middleware import AwsRequestSigningMiddleware
+from aws.scrapy.request import AwsRequest
+from aws.tests.stub_server import StubServer, THROTTLED_RESPONSE, item_lookup_body
+from aws.tests.test_AwsRequest import query
+
+KEYS = [('tag', 'key-1', 'secret-1'), ('tag', 'key-2', 'secret-2'), ('tag', 'key-3', 'secret-3')]
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCredentialPool(TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.pool = CredentialPool(KEYS, failure_threshold=2, backoff=10, max_backoff=40, clock=self.clock)
+
+    def test_credentials(self):
+        pool = CredentialPool([Credentials('t', 'a', 's'), ('t', 'b', 's'),
+                               {'associate_tag': 't', 'access_key': 'c', 'secret_key': 's'}])
+        self.assertEqual([c.access_key for c in pool], ['a', 'b', 'c'])
+        with self.assertRaises(ValueError):
+            CredentialPool([])
+
+    def test_round_robin_without_rate_limits(self):
+        self.assertEqual([self.pool.acquire().access_key for _ in range(6)],
+                         ['key-1', 'key-2', 'key-3', 'key-1', 'key-2', 'key-3'])
+
+    def test_most_available_budget(self):
+        for key, rate in [('key-1', 1), ('key-2', 5), ('key-3', 2)]:
+            configure_rate_limit(key, rate, marketplace='host')
+            self.addCleanup(clear_rate_limit, key, 'host')
+        self.assertEqual(self.pool.acquire('host').access_key, 'key-2')
+
+    def test_backoff(self):
+        key = Credentials(*KEYS[0])
+        self.pool.report(key, 'RequestThrottled')
+        self.assertFalse(self.pool.is_backed_off(key))
+        self.pool.report(key, 'SignatureDoesNotMatch')
+        self.assertTrue(self.pool.is_backed_off(key))
+        self.assertNotIn('key-1', [self.pool.acquire().access_key for _ in range(4)])
+
+        self.clock.now = 10
+        self.assertFalse(self.pool.is_backed_off(key))
+        # Failing again doubles the backoff.
+        self.pool.report(key, 'RequestThrottled')
+        self.assertEqual(self.pool.stats['key-1'].backed_off_until, 30)
+        self.assertEqual(self.pool.summary()['key-1']['throttled'], 2)
+        self.assertEqual(self.pool.summary()['key-1']['signature_errors'], 1)
+
+    def test_success_resets_failures(self):
+        key = Credentials(*KEYS[0])
+        self.pool.report(key, 'RequestThrottled')
+        self.pool.report(key)
+        self.pool.report(key, 'RequestThrottled')
+        self.assertFalse(self.pool.is_backed_off(key))
+
+    def test_other_errors_do_not_back_off(self):
+        key = Credentials(*KEYS[0])
+        for _ in range(3):
+            self.pool.report(key, 'AWS.InvalidParameterValue')
+        self.assertFalse(self.pool.is_backed_off(key))
+
+    def test_all_backed_off(self):
+        for i, key in enumerate(KEYS):
+            self.clock.now = i
+            self.pool.report(Credentials(*key), 'RequestThrottled')
+            self.pool.report(Credentials(*key), 'RequestThrottled')
+        self.assertEqual(self.pool.acquire().access_key, 'key-1')
+
+    def test_error_code(self):
+        self.assertEqual(error_code(THROTTLED_RESPONSE), 'RequestThrottled')
+        self.assertIsNone(error_code(item_lookup_body(['A1'])))
+        self.assertIsNone(error_code('not xml'))
+
+    def test_shared_pool(self):
+        self.assertIs(get_credential_pool(KEYS), get_credential_pool([list(k) for k in KEYS]))
+
+
+class TestClientCredentialPool(TestCase):
+
+    def test_requests_are_spread(self):
+        pool = CredentialPool(KEYS)
+        with StubServer() as stub:
+            client = Lookup(marketplace=stub.host, credential_pool=pool)
+            for i in range(6):
+                client.item_lookup(['A{}'.format(i)])
+        self.assertEqual(sorted(r['AWSAccessKeyId'] for r in stub.requests), ['key-1', 'key-1', 'key-2', 'key-2',
+                                                                               'key-3', 'key-3'])
+        self.assertEqual(pool.summary()['key-1']['requests'], 2)
+
+    def test_rate_limit_per_key(self):
+        pool = CredentialPool(KEYS)
+        Lookup(marketplace='pool-host', credential_pool=pool, rate_limit=3)
+        for key in KEYS:
+            self.addCleanup(clear_rate_limit, key[1], 'pool-host')
+        self.assertEqual([get_rate_limit(key[1], 'pool-host').rate for key in KEYS], [3, 3, 3])
+
+    def test_throttled_key_is_backed_off(self):
+        pool = CredentialPool(KEYS[:2], failure_threshold=1)
+        with StubServer(body=THROTTLED_RESPONSE, status=503) as stub:
+            client = Lookup(marketplace=stub.host, credential_pool=pool)
+            with self.assertRaises(RequestThrottledError):
+                client.item_lookup(['A1'])
+        self.assertTrue(pool.is_backed_off(Credentials(*KEYS[0])))
+        self.assertEqual(pool.acquire(stub.host).access_key, 'key-2')
+
+    def test_credentials_required(self):
+        with self.assertRaises(ValueError):
+            Lookup()
+
+    def test_signer_uses_pool(self):
+        client = Lookup(marketplace='pool-host', credential_pool=CredentialPool(KEYS))
+        self.assertEqual(client.signer(Credentials(*KEYS[1])).access_key, 'key-2')
+        self.assertTrue(client.generate_signature('ItemId=A1&Operation=ItemLookup', Credentials(*KEYS[2])))
+        self.assertIn('AWSAccessKeyId=key-', client.make_url('ItemLookup', {'ItemId': 'A1'}))
+
+
+class TestScrapyCredentialPool(TestCase):
+
+    def setUp(self):
+        settings = Settings({
+            'AWS_CREDENTIALS': [{'associate_tag': t, 'access_key': a, 'secret_key': s} for t, a, s in KEYS],
+            'AWS_MARKETPLACE': 'webservices.amazon.com',
+        })
+        patcher = mock.patch('aws.scrapy.request.get_project_settings', return_value=settings)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.crawler = get_crawler()
+        self.middleware = AwsRequestSigningMiddleware.from_crawler(self.crawler)
+
+    def test_sign_keeps_credentials(self):
+        request = AwsRequest('ItemLookup', {'ItemId': 'A1'})
+        first = query(request)['AWSAccessKeyId']
+        self.middleware.process_request(request, None)
+        self.assertEqual(query(request)['AWSAccessKeyId'], first)
+        self.assertEqual(request.credentials.access_key, first)
+
+    def test_requests_rotate_over_keys(self):
+        keys = []
+        for _ in range(6):
+            request = AwsRequest('ItemLookup', {'ItemId': 'A1'})
+            self.middleware.process_request(request, None)
+            keys.append(query(request)['AWSAccessKeyId'])
+        self.assertEqual(sorted(set(keys)), sorted(k[1] for k in KEYS))
+        self.assertNotEqual(keys[0], keys[1])
+
+    def test_sign_replaces_backed_off_credentials(self):
+        request = AwsRequest('ItemLookup', {'ItemId': 'A1'})
+        first = request.credentials
+        for _ in range(request.credential_pool.failure_threshold):
+            request.credential_pool.report(first, 'RequestThrottled')
+        self.addCleanup(request.credential_pool.report, first, None)
+        self.addCleanup(setattr, request.credential_pool.stats[first.access_key], 'backed_off_until', 0.0)
+        self.middleware.process_request(request, None)
+        self.assertNotEqual(query(request)['AWSAccessKeyId'], first.access_key)
+        self.assertEqual(request.credentials.access_key, query(request)['AWSAccessKeyId'])
+
+    def test_json_setting(self):
+        settings = Settings({'AWS_CREDENTIALS': json.dumps([list(k) for k in KEYS])})
+        with mock.patch('aws.scrapy.request.get_project_settings', return_value=settings):
+            request = AwsRequest('ItemLookup', {'ItemId': 'A1'})
+        self.assertIn(request.credentials.access_key, [k[1] for k in KEYS])
+
+    def test_throttles_are_reported(self):
+        request = AwsRequest('ItemLookup', {'ItemId': 'A1'})
+        response = XmlResponse(request.url, status=503, body=THROTTLED_RESPONSE.encode('utf-8'), request=request)
+        self.assertIs(self.middleware.process_response(request, response, None), response)
+        key = request.credentials.access_key
+        self.assertEqual(request.credential_pool.stats[key].throttled, 1)
+        self.assertEqual(self.crawler.stats.get_value('aws_credentials/{}/RequestThrottled'.format(key)), 1)
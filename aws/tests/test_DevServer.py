@@ -0,0 +1,131 @@
+import shutil
+import tempfile
+from unittest import TestCase
+
+from aws import Lookup, Search
+from aws.archive import ResponseArchive
+from aws.devserver import (
+    DevServer, EXPIRED, INVALID_KEY, INVALID_SIGNATURE, OK, RECORDED, THROTTLED, REQUEST_EXPIRY, main
+)
+from aws.parsers import ItemSearchResponse
+from aws.parsers.base import Item, ItemSearchErrorResponse
+from aws.parsers.errors import RequestExpiredError, RequestThrottledError, SignatureDoesNotMatchError
+from aws.signing import get_signer
+
+
+class TestDevServer(TestCase):
+
+    def setUp(self):
+        self.server = DevServer(credentials=[('tag', 'access', 'secret')], total_results=25, seed=0)
+        self.host = self.server.host
+
+    def tearDown(self):
+        self.server.server.server_close()
+
+    def path(self, operation, params, secret_key='secret', timestamp=None):
+        signer = get_signer('tag', 'access', secret_key, self.host)
+        url = signer.url(operation, params, timestamp)
+        return url[len('http://' + self.host):]
+
+    def error_code(self, body):
+        return ItemSearchErrorResponse.from_string(body).error.code
+
+    def test_item_search(self):
+        status, body, outcome = self.server.respond(self.host, self.path('ItemSearch', {'Brand': 'Bosch',
+                                                                                         'ItemPage': '3'}))
+        self.assertEqual((status, outcome), (200, OK))
+        response = ItemSearchResponse.from_string(body)
+        self.assertEqual(int(response.items.total_results), 25)
+        self.assertEqual(int(response.items.total_pages), 3)
+        self.assertEqual(len(response.items.items), 5)
+
+    def test_item_search_page_out_of_range(self):
+        status, body, outcome = self.server.respond(self.host, self.path('ItemSearch', {'ItemPage': '11'}))
+        self.assertEqual(status, 400)
+        self.assertEqual(self.error_code(body), 'AWS.ParameterOutOfRange')
+
+    def test_item_lookup(self):
+        status, body, outcome = self.server.respond(self.host, self.path('ItemLookup', {'ItemId': 'A1,A2'}))
+        self.assertEqual((status, outcome), (200, OK))
+        items = ItemSearchResponse.from_string(body).items.items
+        self.assertEqual([i.asin for i in items], ['A1', 'A2'])
+
+    def test_bad_signature(self):
+        status, body, outcome = self.server.respond(self.host, self.path('ItemLookup', {'ItemId': 'A1'},
+                                                                         secret_key='wrong'))
+        self.assertEqual((status, outcome), (403, INVALID_SIGNATURE))
+        self.assertEqual(self.error_code(body), 'SignatureDoesNotMatch')
+
+    def test_signature_is_for_the_host(self):
+        status, body, outcome = self.server.respond('webservices.amazon.com',
+                                                    self.path('ItemLookup', {'ItemId': 'A1'}))
+        self.assertEqual(outcome, INVALID_SIGNATURE)
+
+    def test_unknown_access_key(self):
+        path = self.path('ItemLookup', {'ItemId': 'A1'}).replace('AWSAccessKeyId=access', 'AWSAccessKeyId=other')
+        self.assertEqual(self.server.respond(self.host, path)[2], INVALID_KEY)
+
+    def test_old_requests_expire(self):
+        self.server.clock = lambda: 1500000000 + REQUEST_EXPIRY + 1
+        status, body, outcome = self.server.respond(self.host, self.path('ItemLookup', {'ItemId': 'A1'},
+                                                                         timestamp='2017-07-14T02:40:00.000Z'))
+        self.assertEqual((status, outcome), (400, EXPIRED))
+        self.assertEqual(self.error_code(body), 'RequestExpired')
+
+    def test_throttle_rate(self):
+        self.server.throttle_rate = 1
+        status, body, outcome = self.server.respond(self.host, self.path('ItemLookup', {'ItemId': 'A1'}))
+        self.assertEqual((status, outcome), (503, THROTTLED))
+        self.assertEqual(self.error_code(body), 'RequestThrottled')
+
+    def test_quota(self):
+        self.server.quota = 0.001
+        outcomes = [self.server.respond(self.host, self.path('ItemLookup', {'ItemId': 'A1'}))[2] for _ in range(3)]
+        self.assertEqual(outcomes, [OK, THROTTLED, THROTTLED])
+
+    def test_serves_archived_responses(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = self.path('ItemLookup', {'ItemId': 'A1'})
+        with ResponseArchive(directory) as archive:
+            archive.append_response('http://webservices.amazon.com' + path, 200, b'<recorded/>')
+        self.server.archive = ResponseArchive(directory)
+        self.addCleanup(self.server.archive.close)
+
+        # The signature is checked against the host the request is sent to, the key against the recorded host.
+        self.assertEqual(self.server.respond(self.host, path)[2], OK)
+        self.server.archive_marketplace = 'webservices.amazon.com'
+        self.assertEqual(self.server.respond(self.host, path), (200, b'<recorded/>', RECORDED))
+
+
+class TestDevServerClients(TestCase):
+
+    def test_lookup(self):
+        with DevServer(credentials={'access': 'secret'}) as server:
+            client = Lookup('tag', 'access', 'secret', marketplace=server.host)
+            items = list(client.bulk_item_lookup(['A{}'.format(i) for i in range(25)], workers=3))
+            self.assertEqual(server.summary()['requests'], 3)
+            self.assertEqual(server.summary()[OK], 3)
+        self.assertIsInstance(items[0], Item)
+        self.assertEqual(len(items), 25)
+
+    def test_search(self):
+        with DevServer(credentials={'access': 'secret'}, total_results=30) as server:
+            client = Search('tag', 'access', 'secret', marketplace=server.host)
+            asins = [item.asin for item in client.iter_asin_search('Automotive', 'Bosch')]
+        self.assertEqual(len(asins), 30)
+
+    def test_errors_raise(self):
+        with DevServer(credentials={'access': 'secret'}) as server:
+            client = Lookup('tag', 'access', 'wrong', marketplace=server.host)
+            self.assertRaises(SignatureDoesNotMatchError, client.item_lookup, ['A1'])
+        with DevServer(throttle_rate=1) as server:
+            client = Lookup('tag', 'access', 'secret', marketplace=server.host)
+            self.assertRaises(RequestThrottledError, client.item_lookup, ['A1'])
+        with DevServer(expire_rate=1) as server:
+            client = Lookup('tag', 'access', 'secret', marketplace=server.host)
+            self.assertRaises(RequestExpiredError, client.item_lookup, ['A1'])
+
+    def test_rejects_bad_credentials_argument(self):
+        with self.assertRaises(SystemExit):
+            main(['--credentials', 'no-secret'])
@@ -0,0 +1,110 @@
+from unittest import TestCase
+
+from aws.parsers.base import Item, Items
+from aws.parsers.records import ItemRecord
+
+
+class TestItemRecord(TestCase):
+
+    body = """
+    <Item xmlns="http://webservices.amazon.com/AWSECommerceService/2011-08-01">
+        <ASIN>B005BPZFAO</ASIN>
+        <SalesRank>3064</SalesRank>
+        <!-- Comments are skipped -->
+        <SmallImage>
+            <URL>https://images-na.ssl-images-amazon.com/images/I/41mrgRmG5JL._SL75_.jpg</URL>
+        </SmallImage>
+        <LargeImage>
+            <URL>https://images-na.ssl-images-amazon.com/images/I/41mrgRmG5JL.jpg</URL>
+        </LargeImage>
+        <ItemAttributes>
+            <Brand>Brand Name</Brand>
+            <Manufacturer>Manufacturer Name</Manufacturer>
+            <Title>Item Title</Title>
+        </ItemAttributes>
+        <OfferSummary>
+            <LowestNewPrice>
+                <Amount>28895</Amount>
+                <CurrencyCode>USD</CurrencyCode>
+                <FormattedPrice>$288.95</FormattedPrice>
+            </LowestNewPrice>
+            <LowestUsedPrice>
+                <Amount>19681</Amount>
+                <CurrencyCode>USD</CurrencyCode>
+                <FormattedPrice>$196.81</FormattedPrice>
+            </LowestUsedPrice>
+            <TotalNew>33</TotalNew>
+            <TotalUsed>4</TotalUsed>
+        </OfferSummary>
+        <Offers>
+            <Offer>
+                <OfferListing>
+                    <Price>
+                        <Amount>29999</Amount>
+                        <CurrencyCode>USD</CurrencyCode>
+                    </Price>
+                </OfferListing>
+            </Offer>
+        </Offers>
+    </Item>
+    """
+
+    def setUp(self):
+        self.record = Item.from_string(self.body).to_record()
+
+    def test_fields(self):
+        self.assertEqual(self.record.asin, 'B005BPZFAO')
+        self.assertEqual(self.record.sales_rank, 3064)
+        self.assertEqual(self.record.title, 'Item Title')
+        self.assertEqual(self.record.brand, 'Brand Name')
+        self.assertEqual(self.record.manufacturer, 'Manufacturer Name')
+        self.assertEqual(self.record.currency_code, 'USD')
+
+    def test_prices_are_cents(self):
+        self.assertEqual(self.record.price, 29999)
+        self.assertEqual(self.record.lowest_new_price, 28895)
+        self.assertEqual(self.record.lowest_used_price, 19681)
+
+    def test_offer_counts(self):
+        self.assertEqual(self.record.total_new, 33)
+        self.assertEqual(self.record.total_used, 4)
+
+    def test_images(self):
+        self.assertEqual(self.record.small_image_url,
+                         'https://images-na.ssl-images-amazon.com/images/I/41mrgRmG5JL._SL75_.jpg')
+        self.assertIsNone(self.record.medium_image_url)
+        self.assertEqual(self.record.large_image_url, 'https://images-na.ssl-images-amazon.com/images/I/41mrgRmG5JL.jpg')
+
+    def test_matches_wrapper(self):
+        item = Item.from_string(self.body)
+        self.assertEqual(self.record.asin, item.asin)
+        self.assertEqual(self.record.sales_rank, int(item.sales_rank))
+        self.assertEqual(self.record.lowest_new_price, int(item.offer_summary.lowest_new_price.amount))
+
+    def test_no_dict(self):
+        self.assertFalse(hasattr(self.record, '__dict__'))
+
+    def test_empty_item(self):
+        record = Item.from_string('<Item xmlns="http://webservices.amazon.com/AWSECommerceService/2011-08-01"/>')
+        self.assertEqual(record.to_record(), ItemRecord())
+
+
+class TestItemsRecords(TestCase):
+
+    body = """
+    <Items xmlns="http://webservices.amazon.com/AWSECommerceService/2011-08-01">
+        <Item><ASIN>A1</ASIN><SalesRank>1</SalesRank></Item>
+        <Item><ASIN>A2</ASIN></Item>
+    </Items>
+    """
+
+    def test_records(self):
+        records = list(Items.from_string(self.body).records())
+        self.assertEqual([r.asin for r in records], ['A1', 'A2'])
+        self.assertEqual([r.sales_rank for r in records], [1, None])
+
+    def test_records_clear(self):
+        parser = Items.from_string(self.body)
+        records = list(parser.records(clear=True))
+        self.assertEqual([r.asin for r in records], ['A1', 'A2'])
+        self.assertTrue(all(len(x) == 0 for x in parser.element))
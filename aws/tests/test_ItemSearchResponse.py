@@ -1,7 +1,7 @@
 import unittest
 
 from aws.parsers.base import OperationRequest, Items, Item
-from aws.parsers.itemsearch import ItemSearchResponse
+from aws.parsers.itemsearch import ItemSearchResponse, SearchBinSet
 
 
 class TestItemSearchResponse(unittest.TestCase):
@@ -58,3 +58,57 @@ class TestItemSearchResponse(unittest.TestCase):
         self.assertEqual(len(self.parser.items.items), 1)
         self.assertIsInstance(self.parser.items.items[0], Item)
         self.assertEqual(self.parser.items.items[0].asin, 'B005BPZFAO')
+
+
+class TestItemSearchResponseSearchBins(unittest.TestCase):
+
+    body = """
+    <ItemSearchResponse xmlns="http://webservices.amazon.com/AWSECommerceService/2011-08-01">
+        <Items>
+            <SearchBinSets>
+                <SearchBinSet NarrowBy="BrandName">
+                    <Bin>
+                        <BinName>Brand A</BinName>
+                        <BinItemCount>120</BinItemCount>
+                        <BinParameter>
+                            <Name>Brand</Name>
+                            <Value>Brand A</Value>
+                        </BinParameter>
+                    </Bin>
+                </SearchBinSet>
+                <SearchBinSet NarrowBy="Subject">
+                    <Bin>
+                        <BinName>Subject A</BinName>
+                        <BinItemCount>40</BinItemCount>
+                        <BinParameter>
+                            <Name>BrowseNode</Name>
+                            <Value>1234</Value>
+                        </BinParameter>
+                    </Bin>
+                    <Bin>
+                        <BinName>Subject B</BinName>
+                        <BinItemCount>20</BinItemCount>
+                        <BinParameter>
+                            <Name>BrowseNode</Name>
+                            <Value>5678</Value>
+                        </BinParameter>
+                    </Bin>
+                </SearchBinSet>
+            </SearchBinSets>
+        </Items>
+    </ItemSearchResponse>
+    """
+
+    def setUp(self):
+        self.parser = ItemSearchResponse.from_string(self.body)
+
+    def test_search_bins(self):
+        self.assertEqual(len(self.parser.search_bins()), 3)
+
+    def test_search_bins_narrow_by(self):
+        bins = self.parser.search_bins(SearchBinSet.SUBJECT)
+        self.assertEqual([x.bin_name for x in bins], ['Subject A', 'Subject B'])
+        self.assertEqual(bins[0].as_request_params(), {'BrowseNode': '1234'})
+
+    def test_search_bins_unknown(self):
+        self.assertEqual(self.parser.search_bins('Unknown'), [])
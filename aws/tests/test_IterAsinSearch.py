@@ -0,0 +1,65 @@
+import asyncio
+from unittest import TestCase
+
+from aws import Search, AsyncSearch, close_sessions
+from aws.benchmarks import synthetic
+from aws.parsers.errors import RequestThrottledError
+from aws.tests.stub_server import StubServer, THROTTLED_RESPONSE
+
+
+def search_pages(total_results):
+    def body(params):
+        page = int(params['ItemPage'])
+        items = max(0, min(10, total_results - (page - 1) * 10))
+        return synthetic.item_search_response(items=items, item_page=page, total_results=total_results,
+                                              bins=0).decode('utf-8')
+    return body
+
+
+class TestIterAsinSearch(TestCase):
+
+    def test_pages_in_order(self):
+        with StubServer(body=search_pages(45), delay=0.02) as stub:
+            client = Search('tag', 'access', 'secret', marketplace=stub.host)
+            asins = [item.asin for item in client.iter_asin_search('Automotive', 'Brand', workers=4)]
+        self.assertEqual(asins, [synthetic.asin(n) for n in range(45)])
+        self.assertEqual(sorted(int(r['ItemPage']) for r in stub.requests), [1, 2, 3, 4, 5])
+        self.assertGreater(stub.max_in_flight, 1)
+
+    def test_single_page(self):
+        with StubServer(body=search_pages(3)) as stub:
+            client = Search('tag', 'access', 'secret', marketplace=stub.host)
+            self.assertEqual(len(list(client.iter_asin_search('Automotive', 'Brand'))), 3)
+        self.assertEqual(len(stub.requests), 1)
+
+    def test_at_most_ten_pages(self):
+        with StubServer(body=search_pages(4000)) as stub:
+            client = Search('tag', 'access', 'secret', marketplace=stub.host)
+            self.assertEqual(len(list(client.iter_asin_search('Automotive', 'Brand'))), 100)
+        self.assertEqual(len(stub.requests), 10)
+
+    def test_max_pages(self):
+        with StubServer(body=search_pages(4000)) as stub:
+            client = Search('tag', 'access', 'secret', marketplace=stub.host)
+            self.assertEqual(len(list(client.iter_asin_search('Automotive', 'Brand', max_pages=2))), 20)
+        self.assertEqual(len(stub.requests), 2)
+
+    def test_raises_for_error_content(self):
+        with StubServer(body=THROTTLED_RESPONSE, status=503) as stub:
+            client = Search('tag', 'access', 'secret', marketplace=stub.host)
+            with self.assertRaises(RequestThrottledError):
+                list(client.iter_asin_search('Automotive', 'Brand'))
+
+    def test_async_pages_in_order(self):
+        async def search(host):
+            client = AsyncSearch('tag', 'access', 'secret', marketplace=host)
+            try:
+                return [item.asin async for item in client.iter_asin_search('Automotive', 'Brand', workers=3)]
+            finally:
+                await close_sessions()
+
+        with StubServer(body=search_pages(35), delay=0.02) as stub:
+            asins = asyncio.new_event_loop().run_until_complete(search(stub.host))
+        self.assertEqual(asins, [synthetic.asin(n) for n in range(35)])
+        self.assertGreater(stub.max_in_flight, 1)
+        self.assertLessEqual(stub.max_in_flight, 3)
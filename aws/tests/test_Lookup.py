@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+from aws import Lookup
+from aws._aws import chunks
+from aws.parsers.base import Item
+from aws.parsers.errors import RequestThrottledError
+from aws.tests.stub_server import StubServer, THROTTLED_RESPONSE
+
+
+class TestChunks(TestCase):
+
+    def test_chunks(self):
+        self.assertEqual(list(chunks(range(25), 10)), [list(range(10)), list(range(10, 20)), list(range(20, 25))])
+
+    def test_empty(self):
+        self.assertEqual(list(chunks([], 10)), [])
+
+
+class TestBulkItemLookup(TestCase):
+
+    def test_batches_of_ten(self):
+        asins = ['A{}'.format(i) for i in range(95)]
+        with StubServer() as stub:
+            client = Lookup('tag', 'access', 'secret', marketplace=stub.host)
+            items = list(client.bulk_item_lookup(iter(asins), response_groups=['ItemIds'], workers=3))
+        self.assertEqual(len(stub.requests), 10)
+        self.assertTrue(all(len(r['ItemId'].split(',')) <= 10 for r in stub.requests))
+        self.assertIsInstance(items[0], Item)
+        self.assertEqual(sorted(x.asin for x in items), sorted(asins))
+
+    def test_batches_run_concurrently(self):
+        with StubServer(delay=0.05) as stub:
+            client = Lookup('tag', 'access', 'secret', marketplace=stub.host)
+            list(client.bulk_item_lookup(['A{}'.format(i) for i in range(80)], workers=4))
+        self.assertGreater(stub.max_in_flight, 1)
+        self.assertLessEqual(stub.max_in_flight, 4)
+
+    def test_raises_for_error_content(self):
+        with StubServer(body=THROTTLED_RESPONSE, status=503) as stub:
+            client = Lookup('tag', 'access', 'secret', marketplace=stub.host)
+            with self.assertRaises(RequestThrottledError):
+                list(client.bulk_item_lookup(['A1']))
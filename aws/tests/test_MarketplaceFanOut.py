@@ -0,0 +1,73 @@
+import time
+from contextlib import ExitStack
+from unittest import TestCase
+
+from aws import Lookup, AsyncLookup
+from aws.fanout import MarketplaceFanOut, AsyncMarketplaceFanOut
+from aws.parsers import ItemLookupResponse
+from aws.parsers.errors import RequestThrottledError
+from aws.ratelimit import get_rate_limit
+from aws.tests.stub_server import StubServer, THROTTLED_RESPONSE
+from aws.tests.test_AsyncLookup import run
+
+
+class TestMarketplaceFanOut(TestCase):
+
+    def setUp(self):
+        stack = ExitStack()
+        self.addCleanup(stack.close)
+        self.stubs = [stack.enter_context(StubServer(delay=0.02)) for _ in range(3)]
+        self.hosts = [stub.host for stub in self.stubs]
+
+    def test_call(self):
+        fan_out = MarketplaceFanOut(Lookup, 'tag', 'access', 'secret', self.hosts)
+        results = fan_out.call('item_lookup', ['A1'])
+        self.assertEqual(list(results), self.hosts)
+        for content in results.values():
+            self.assertEqual(ItemLookupResponse.from_string(content).items.items[0].asin, 'A1')
+        self.assertEqual([len(stub.requests) for stub in self.stubs], [1, 1, 1])
+
+    def test_marketplace_codes(self):
+        fan_out = MarketplaceFanOut(Lookup, 'tag', 'access', 'secret', ['us', 'de'])
+        self.assertEqual(fan_out.marketplaces, ['us', 'de'])
+        self.assertEqual(fan_out.clients['de'].marketplace, 'webservices.amazon.de')
+
+    def test_associate_tag_per_marketplace(self):
+        tags = {self.hosts[0]: 'tag-0', self.hosts[1]: 'tag-1', self.hosts[2]: 'tag-2'}
+        MarketplaceFanOut(Lookup, tags, 'access', 'secret', self.hosts).call('item_lookup', ['A1'])
+        self.assertEqual([stub.requests[0]['AssociateTag'] for stub in self.stubs], ['tag-0', 'tag-1', 'tag-2'])
+
+    def test_exceptions_are_results(self):
+        with StubServer(body=THROTTLED_RESPONSE, status=503) as throttled:
+            fan_out = MarketplaceFanOut(Lookup, 'tag', 'access', 'secret', [self.hosts[0], throttled.host])
+            results = fan_out.call('item_lookup', ['A1'])
+        self.assertIsInstance(results[self.hosts[0]], str)
+        self.assertIsInstance(results[throttled.host], RequestThrottledError)
+
+    def test_generators_are_collected(self):
+        fan_out = MarketplaceFanOut(Lookup, 'tag', 'access', 'secret', self.hosts)
+        results = fan_out.call('bulk_item_lookup', ['A{}'.format(i) for i in range(15)])
+        for items in results.values():
+            self.assertEqual(sorted(x.asin for x in items), sorted('A{}'.format(i) for i in range(15)))
+
+    def test_rate_bucket_per_marketplace(self):
+        fan_out = MarketplaceFanOut(Lookup, 'tag', 'fan-out', 'secret', self.hosts, rate_limit=10, burst=1)
+        buckets = [get_rate_limit('fan-out', host) for host in self.hosts]
+        self.assertEqual(len(set(map(id, buckets))), 3)
+        # Three requests per marketplace at 10 per second take ~0.2s for each of them. Sharing one bucket
+        # the nine requests would take ~0.8s.
+        start = time.monotonic()
+        fan_out.call('bulk_item_lookup', ['A{}'.format(i) for i in range(30)], workers=3)
+        self.assertLess(time.monotonic() - start, 0.6)
+        self.assertEqual([len(stub.requests) for stub in self.stubs], [3, 3, 3])
+
+    def test_async_call(self):
+        fan_out = AsyncMarketplaceFanOut(AsyncLookup, 'tag', 'access', 'secret', self.hosts)
+        results = run(fan_out.call('item_lookup', ['A1']))
+        self.assertEqual(list(results), self.hosts)
+        self.assertTrue(all(isinstance(x, str) for x in results.values()))
+
+    def test_async_generators_are_collected(self):
+        fan_out = AsyncMarketplaceFanOut(AsyncLookup, 'tag', 'access', 'secret', self.hosts)
+        results = run(fan_out.call('bulk_item_lookup', ['A{}'.format(i) for i in range(12)]))
+        self.assertEqual([len(items) for items in results.values()], [12, 12, 12])
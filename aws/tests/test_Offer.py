@@ -55,4 +55,18 @@ class TestOfferListing(TestCase):
         self.assertIsNone(self.parser.amount_saved.formatted_price)
 
     def test_availability(self):
-        self.assertEqual(self.parser.availability, 'Usually ships in 24 hours')
\ No newline at end of file
+        self.assertEqual(self.parser.availability, 'Usually ships in 24 hours')
+
+
+class TestOfferMemoized(TestCase):
+
+    def setUp(self):
+        self.parser = Offer.from_string(TestOfferListing.body)
+
+    def test_properties_are_cached(self):
+        self.assertIs(self.parser.price, self.parser.price)
+        self.assertIs(self.parser._offer, self.parser._offer)
+
+    def test_slots(self):
+        self.assertFalse(hasattr(self.parser, '__dict__'))
+        self.assertFalse(hasattr(self.parser.price, '__dict__'))
@@ -0,0 +1,131 @@
+import gzip
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from scrapy import Request
+from scrapy.http import XmlResponse
+from scrapy.utils.test import get_crawler
+
+from aws.archive import ResponseArchive, request_key
+from aws.parsers.errors import ItemSearchError
+from aws.scrapy.middleware import ApiResponseDownloaderMiddleware
+from aws.tests.stub_server import THROTTLED_RESPONSE, item_lookup_body
+
+URL = ('http://webservices.amazon.com/onca/xml?AWSAccessKeyId=key&AssociateTag=tag&ItemId=B1'
+       '&Operation=ItemLookup&Service=AWSECommerceService&Signature=abc&Timestamp=2017-01-01T00%3A00%3A00Z')
+
+INVALID_RESPONSE = THROTTLED_RESPONSE.replace('RequestThrottled', 'AWS.InvalidParameterValue')
+
+
+class TestResponseArchive(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_request_key_ignores_signature(self):
+        other = URL.replace('AWSAccessKeyId=key', 'AWSAccessKeyId=other').replace('Signature=abc', 'Signature=def')
+        key, operation, params = request_key(URL)
+        self.assertEqual(key, request_key(other)[0])
+        self.assertEqual(operation, 'ItemLookup')
+        self.assertEqual(params, {'AssociateTag': 'tag', 'ItemId': 'B1', 'Service': 'AWSECommerceService'})
+
+    def test_append_and_get(self):
+        with ResponseArchive(self.directory) as archive:
+            archive.append('a', b'<a/>', operation='ItemLookup', status=200)
+            archive.append('b', '<b/>')
+            archive.flush()
+            self.assertEqual(len(archive), 2)
+            self.assertIn('a', archive)
+            self.assertEqual(archive.get('a'), b'<a/>')
+            self.assertEqual(archive.get('b'), b'<b/>')
+            self.assertIsNone(archive.get('c'))
+
+            entry = archive.entry('a')
+            self.assertEqual(entry['operation'], 'ItemLookup')
+            self.assertEqual(entry['status'], 200)
+            self.assertEqual(entry['segment'], 'responses-00001.xml.gz')
+
+    def test_segment_is_gzip_of_every_response(self):
+        with ResponseArchive(self.directory) as archive:
+            archive.append('a', b'<a/>')
+            archive.append('b', b'<b/>')
+        with gzip.open(os.path.join(self.directory, 'responses-00001.xml.gz')) as f:
+            self.assertEqual(f.read(), b'<a/><b/>')
+
+    def test_last_response_wins(self):
+        with ResponseArchive(self.directory) as archive:
+            archive.append('a', b'<old/>')
+            archive.append('a', b'<new/>')
+            archive.flush()
+            self.assertEqual(len(archive), 1)
+            self.assertEqual(archive.get('a'), b'<new/>')
+
+    def test_rotates_segments(self):
+        with ResponseArchive(self.directory, max_segment_size=1) as archive:
+            for i in range(3):
+                archive.append(str(i), '<item>{}</item>'.format(i))
+            archive.flush()
+            self.assertEqual(sorted(e['segment'] for e in archive.entries()),
+                             ['responses-00001.xml.gz', 'responses-00002.xml.gz', 'responses-00003.xml.gz'])
+            self.assertEqual(archive.get('2'), b'<item>2</item>')
+
+    def test_reopen(self):
+        with ResponseArchive(self.directory) as archive:
+            archive.append('a', b'<a/>')
+        with ResponseArchive(self.directory) as archive:
+            self.assertEqual(archive.get('a'), b'<a/>')
+            archive.append('b', b'<b/>')
+            archive.flush()
+            self.assertEqual(archive.entry('b')['segment'], 'responses-00002.xml.gz')
+            self.assertEqual(archive.get('a'), b'<a/>')
+
+    def test_closed(self):
+        archive = ResponseArchive(self.directory)
+        archive.close()
+        archive.close()
+        self.assertRaises(ValueError, archive.append, 'a', b'<a/>')
+
+
+class TestMiddlewareArchive(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.request = Request(URL)
+
+    def middleware(self, **settings):
+        settings['AWS_RESPONSE_ARCHIVE_DIR'] = self.directory
+        self.crawler = get_crawler(settings_dict=settings)
+        return ApiResponseDownloaderMiddleware.from_crawler(self.crawler)
+
+    def response(self, body, status=200):
+        return XmlResponse(self.request.url, status=status, body=body.encode('utf-8'), request=self.request)
+
+    def test_valid_response_not_archived(self):
+        middleware = self.middleware()
+        middleware.process_response(self.request, self.response(item_lookup_body(['A1'])), None)
+        middleware.spider_closed(None)
+        self.assertIsNone(middleware._archive)
+
+    def test_write_responses(self):
+        middleware = self.middleware(WRITE_RESPONSES=True)
+        body = item_lookup_body(['A1'])
+        middleware.process_response(self.request, self.response(body), None)
+        middleware.archive.flush()
+        self.assertEqual(middleware.archive.get(request_key(URL)[0]), body.encode('utf-8'))
+        self.assertEqual(self.crawler.stats.get_value('aws_response_archive/responses'), 1)
+        middleware.spider_closed(None)
+
+    def test_error_response_archived(self):
+        middleware = self.middleware()
+        self.assertRaises(ItemSearchError, middleware.process_response,
+                          self.request, self.response(INVALID_RESPONSE, 400), None)
+        middleware.spider_closed(None)
+        with ResponseArchive(self.directory) as archive:
+            entry = archive.entry(request_key(URL)[0])
+            self.assertEqual(entry['error'], 'AWS.InvalidParameterValue')
+            self.assertEqual(entry['status'], 400)
+        self.assertEqual(self.crawler.stats.get_value('aws_response_archive/errors'), 1)
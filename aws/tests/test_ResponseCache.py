@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from aws import Lookup
+from aws.cache import cache_key, MemoryCache, DiskCache
+from aws.tests.stub_server import StubServer, THROTTLED_RESPONSE
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCacheKey(TestCase):
+
+    def test_ignores_volatile_params(self):
+        first = cache_key('host', 'ItemLookup', {'ItemId': 'A1', 'Timestamp': '1', 'Signature': 'x',
+                                                 'AWSAccessKeyId': 'one'})
+        second = cache_key('host', 'ItemLookup', {'AWSAccessKeyId': 'two', 'Timestamp': '2', 'ItemId': 'A1'})
+        self.assertEqual(first, second)
+
+    def test_params_are_part_of_key(self):
+        self.assertNotEqual(cache_key('host', 'ItemLookup', {'ItemId': 'A1'}),
+                            cache_key('host', 'ItemLookup', {'ItemId': 'A2'}))
+        self.assertNotEqual(cache_key('host', 'ItemLookup', {'ItemId': 'A1'}),
+                            cache_key('other', 'ItemLookup', {'ItemId': 'A1'}))
+
+
+class CacheTests(object):
+
+    def test_hit_and_miss(self):
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('key', 'content')
+        self.assertEqual(self.cache.get('key'), 'content')
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'evictions': 0})
+
+    def test_operation_ttl(self):
+        self.cache.set('search', 'content', 'ItemSearch')
+        self.cache.set('lookup', 'content', 'ItemLookup')
+        self.clock.now += 20
+        self.assertIsNone(self.cache.get('search'))
+        self.assertEqual(self.cache.get('lookup'), 'content')
+        self.clock.now += 100
+        self.assertIsNone(self.cache.get('lookup'))
+
+    def test_size_eviction(self):
+        self.cache.set('a', 'x' * 40)
+        self.clock.now += 1
+        self.cache.set('b', 'x' * 40)
+        self.clock.now += 1
+        # Reading "a" makes "b" the least recently used entry.
+        self.cache.get('a')
+        self.clock.now += 1
+        self.cache.set('c', 'x' * 40)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('c'))
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertEqual(self.cache.size, 80)
+
+
+class TestMemoryCache(CacheTests, TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = MemoryCache(max_size=100, ttl=100, ttls={'ItemSearch': 10}, clock=self.clock)
+
+
+class TestDiskCache(CacheTests, TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.clock = FakeClock()
+        self.cache = DiskCache(os.path.join(self.directory, 'cache', 'responses.db'), max_size=100, ttl=100,
+                               ttls={'ItemSearch': 10}, clock=self.clock)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def test_persists(self):
+        self.cache.set('key', 'content')
+        other = DiskCache(self.cache.path, clock=self.clock)
+        self.assertEqual(other.get('key'), 'content')
+        other.close()
+
+
+class TestMakeRequestCache(TestCase):
+
+    def test_cached_response_skips_request(self):
+        cache = MemoryCache()
+        with StubServer() as stub:
+            client = Lookup('tag', 'access', 'secret', marketplace=stub.host, cache=cache)
+            first = client.item_lookup(item_ids=['A1'])
+            second = Lookup('tag', 'other', 'secret', marketplace=stub.host, cache=cache).item_lookup(item_ids=['A1'])
+            client.item_lookup(item_ids=['A2'])
+        self.assertEqual(first, second)
+        self.assertEqual(len(stub.requests), 2)
+        self.assertEqual(cache.hits, 1)
+
+    def test_errors_are_not_cached(self):
+        cache = MemoryCache()
+        with StubServer(body=THROTTLED_RESPONSE, status=503) as stub:
+            client = Lookup('tag', 'access', 'secret', marketplace=stub.host, cache=cache)
+            for _ in range(2):
+                with self.assertRaises(Exception):
+                    client.item_lookup(item_ids=['A1'])
+        self.assertEqual(len(stub.requests), 2)
+        self.assertEqual(len(cache), 0)
@@ -0,0 +1,120 @@
+from unittest import TestCase, mock
+
+from scrapy.http import XmlResponse
+from scrapy.utils.test import get_crawler
+
+from aws.benchmarks import synthetic
+from aws.scrapy.drilldown import SearchBinDrillDown
+from aws.scrapy.request import AwsAsinSearchRequest
+from aws.tests.test_AwsRequest import SETTINGS, query
+
+PRICE_BINS = ('PriceRange', [
+    ('$0-$24', 150, {'MinimumPrice': '0', 'MaximumPrice': '2499'}),
+    ('$25-$49', 60, {'MinimumPrice': '2500', 'MaximumPrice': '4999'}),
+])
+SUBJECT_BINS = ('Subject', [('Subject A', 90, {'BrowseNode': '1'}), ('Subject B', 60, {'BrowseNode': '2'})])
+
+
+def respond(request, total_results, bin_sets=()):
+    items = max(0, min(10, total_results - (request.item_page - 1) * 10))
+    body = synthetic.item_search_response(items=items, item_page=request.item_page, total_results=total_results,
+                                          bin_sets=list(bin_sets))
+    return XmlResponse(request.url, body=body, request=request)
+
+
+class TestSearchBinDrillDown(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('aws.scrapy.request.get_project_settings', return_value=SETTINGS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.crawler = get_crawler()
+        self.drill_down = SearchBinDrillDown.from_crawler(self.crawler)
+
+    def split(self, output):
+        requests = [x for x in output if isinstance(x, AwsAsinSearchRequest)]
+        items = [x for x in output if not isinstance(x, AwsAsinSearchRequest)]
+        return requests, items
+
+    def test_small_search_requests_its_pages(self):
+        request = self.drill_down.start_request('Automotive', 'Brand')
+        requests, items = self.split(list(self.drill_down.parse(respond(request, 35))))
+        self.assertEqual(len(items), 10)
+        self.assertEqual([r.item_page for r in requests], [2, 3, 4])
+
+        requests, items = self.split(list(self.drill_down.parse(respond(requests[-1], 35))))
+        self.assertEqual((requests, len(items)), ([], 5))
+
+    def test_single_page(self):
+        request = self.drill_down.start_request('Automotive', 'Brand')
+        requests, items = self.split(list(self.drill_down.parse(respond(request, 4))))
+        self.assertEqual((requests, len(items)), ([], 4))
+
+    def test_large_search_is_split(self):
+        request = self.drill_down.start_request('Automotive', 'Brand', extra={'Sort': 'salesrank'})
+        requests, items = self.split(list(self.drill_down.parse(respond(request, 210, [PRICE_BINS, SUBJECT_BINS]))))
+        # BrandName bins are missing, so the first bins which narrow the search are the price ranges.
+        self.assertEqual([(r.item_page, query(r)['MinimumPrice'], query(r)['MaximumPrice']) for r in requests],
+                         [(1, '0', '2499'), (1, '2500', '4999')])
+        self.assertEqual(query(requests[0])['Sort'], 'salesrank')
+        self.assertEqual(query(requests[0])['Brand'], 'Brand')
+        self.assertEqual(self.crawler.stats.get_value('aws_drill_down/split'), 1)
+
+        # The first price range is still too large and is split again by subject.
+        requests, items = self.split(list(self.drill_down.parse(respond(requests[0], 150, [PRICE_BINS, SUBJECT_BINS]))))
+        self.assertEqual([query(r)['BrowseNode'] for r in requests], ['1', '2'])
+        self.assertEqual(query(requests[0])['MinimumPrice'], '0')
+
+        # A leaf requests its remaining pages, and not one beyond its TotalPages.
+        requests, items = self.split(list(self.drill_down.parse(respond(requests[0], 90, [PRICE_BINS, SUBJECT_BINS]))))
+        self.assertEqual([r.item_page for r in requests], list(range(2, 10)))
+        self.assertEqual({query(r)['BrowseNode'] for r in requests}, {'1'})
+
+    def test_bins_not_covering_the_search(self):
+        request = self.drill_down.start_request('Automotive', 'Brand')
+        requests, items = self.split(list(self.drill_down.parse(respond(request, 500, [SUBJECT_BINS]))))
+        self.assertEqual(len([r for r in requests if r.item_page == 1]), 2)
+        self.assertEqual([r.item_page for r in requests if r.item_page != 1], list(range(2, 11)))
+
+    def test_subjects_nest(self):
+        drill_down = SearchBinDrillDown(narrow_by=['Subject'])
+        request = drill_down.start_request('Automotive', 'Brand')
+        requests, items = self.split(list(drill_down.parse(respond(request, 500, [SUBJECT_BINS]))))
+        child_bins = ('Subject', [('Subject A', 400, {'BrowseNode': '1'}), ('Child', 150, {'BrowseNode': '11'})])
+        requests, items = self.split(list(drill_down.parse(respond(requests[0], 400, [PRICE_BINS, child_bins]))))
+        self.assertEqual([query(r).get('BrowseNode') for r in requests if r.item_page == 1], ['11'])
+
+    def test_no_bins_is_truncated(self):
+        request = self.drill_down.start_request('Automotive', 'Brand')
+        requests, items = self.split(list(self.drill_down.parse(respond(request, 500))))
+        self.assertEqual([r.item_page for r in requests], list(range(2, 11)))
+        self.assertEqual(self.crawler.stats.get_value('aws_drill_down/truncated'), 1)
+
+    def test_brand_bin_of_the_searched_brand_does_not_narrow(self):
+        brand_bins = ('BrandName', [('Brand', 500, {'Brand': 'Brand'})])
+        request = self.drill_down.start_request('Automotive', 'Brand')
+        requests, items = self.split(list(self.drill_down.parse(respond(request, 500, [brand_bins, SUBJECT_BINS]))))
+        self.assertEqual([query(r).get('BrowseNode') for r in requests if r.item_page == 1], ['1', '2'])
+
+    def test_asins_are_deduplicated(self):
+        request = self.drill_down.start_request('Automotive', 'Brand')
+        list(self.drill_down.parse(respond(request, 10)))
+        other = self.drill_down.start_request('Automotive', 'Other')
+        requests, items = self.split(list(self.drill_down.parse(respond(other, 10))))
+        self.assertEqual(items, [])
+        self.assertEqual(self.crawler.stats.get_value('aws_drill_down/duplicate_asin'), 10)
+
+    def test_requests_are_deduplicated(self):
+        self.assertIsNotNone(self.drill_down.start_request('Automotive', 'Brand'))
+        self.assertIsNone(self.drill_down.start_request('Automotive', 'Brand'))
+
+    def test_item_callback(self):
+        drill_down = SearchBinDrillDown(item_callback=lambda item, response: item.asin)
+        request = drill_down.start_request('Automotive', 'Brand')
+        requests, items = self.split(list(drill_down.parse(respond(request, 2))))
+        self.assertEqual(items, [synthetic.asin(0), synthetic.asin(1)])
+
+    def test_default_items_are_records(self):
+        request = self.drill_down.start_request('Automotive', 'Brand')
+        requests, items = self.split(list(self.drill_down.parse(respond(request, 1))))
+        self.assertEqual(items[0]['asin'], synthetic.asin(0))
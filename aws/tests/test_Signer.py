@@ -0,0 +1,64 @@
+import base64
+import hashlib
+import hmac
+import time
+from unittest import TestCase
+from urllib import parse
+
+from aws.signing import Signer, get_signer, amazon_timestamp, urlencode
+
+
+def legacy_signature(marketplace, secret_key, url_params):
+    canonical_string = '&'.join(sorted(url_params.split('&')))
+    string_to_sign = "GET\n{endpoint}\n/onca/xml\n{params}".format(endpoint=marketplace, params=canonical_string)
+    signature = base64.b64encode(
+        hmac.new(bytes(secret_key, encoding='utf-8'), string_to_sign.encode(encoding='utf-8'),
+                 digestmod=hashlib.sha256).digest())
+    return parse.quote(signature)
+
+
+class TestSigner(TestCase):
+
+    def setUp(self):
+        self.signer = Signer('tag', 'access', 'secret', 'webservices.amazon.com')
+        self.params = {'ItemId': 'B005BPZFAO,B00000000', 'ResponseGroup': 'Large,Offers', 'Keywords': 'a b&c'}
+
+    def test_matches_legacy_signing(self):
+        timestamp = '2017-05-19T20:25:35.000Z'
+        base_params = dict(AssociateTag='tag', AWSAccessKeyId='access', Operation='ItemLookup',
+                           Service='AWSECommerceService', Timestamp=timestamp)
+        base_params.update(self.params)
+        url_params = '&'.join(sorted(urlencode(base_params).split('&')))
+        expected = url_params + '&Signature=' + legacy_signature('webservices.amazon.com', 'secret', url_params)
+        self.assertEqual(self.signer.signed_query('ItemLookup', self.params, timestamp), expected)
+
+    def test_params_override_credentials(self):
+        query = self.signer.canonical_query('ItemLookup', {'AssociateTag': 'other'}, '2017-05-19T20:25:35.000Z')
+        self.assertIn('AssociateTag=other', query)
+        self.assertNotIn('AssociateTag=tag', query)
+
+    def test_url(self):
+        url = parse.urlsplit(self.signer.url('ItemLookup', self.params))
+        self.assertEqual(url.netloc, 'webservices.amazon.com')
+        self.assertEqual(url.path, '/onca/xml')
+        self.assertIn('Signature', dict(parse.parse_qsl(url.query)))
+
+    def test_signer_is_reentrant(self):
+        query = self.signer.canonical_query('ItemLookup', self.params, '2017-05-19T20:25:35.000Z')
+        self.assertEqual(self.signer.signature(query), self.signer.signature(query))
+
+    def test_get_signer_is_shared(self):
+        self.assertIs(get_signer('tag', 'access', 'secret', 'host'), get_signer('tag', 'access', 'secret', 'host'))
+
+
+class TestAmazonTimestamp(TestCase):
+
+    def test_utc(self):
+        self.assertEqual(amazon_timestamp(0), '1970-01-01T00:00:00.000Z')
+        self.assertEqual(amazon_timestamp(1495225535.9), '2017-05-19T20:25:35.000Z')
+
+    def test_now(self):
+        before = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+        timestamp = amazon_timestamp()
+        after = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+        self.assertIn(timestamp, (before, after))
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+from unittest import TestCase
+
+from aws import Lookup, AsyncLookup, close_sessions
+from aws.singleflight import SingleFlight, InFlightItems
+from aws.tests.stub_server import StubServer
+
+
+class TestSingleFlight(TestCase):
+
+    def test_concurrent_calls_share_result(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return object()
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do('key', work)))
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=lambda: results.append(flight.do('key', work))) for _ in range(3)]
+        for t in followers:
+            t.start()
+        release.set()
+        for t in [leader] + followers:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(r is results[0] for r in results))
+
+    def test_sequential_calls_are_not_shared(self):
+        flight = SingleFlight()
+        self.assertEqual([flight.do('key', lambda: i) for i in range(2)], [0, 1])
+
+    def test_exception(self):
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do('key', int, 'x')
+
+
+class TestInFlightItems(TestCase):
+
+    def test_claim(self):
+        registry = InFlightItems()
+        owned, first = registry.claim('group', ['A1', 'A2'])
+        self.assertEqual(owned, ['A1', 'A2'])
+        owned, second = registry.claim('group', ['A2', 'A3'])
+        self.assertEqual(owned, ['A3'])
+        self.assertIs(first[1], second[0])
+        registry.resolve('group', ['A1', 'A2'], {'A1': 'item'})
+        self.assertEqual(first[0].result(), 'item')
+        self.assertIsNone(first[1].result())
+
+    def test_groups_are_separate(self):
+        registry = InFlightItems()
+        registry.claim('one', ['A1'])
+        owned, _ = registry.claim('two', ['A1'])
+        self.assertEqual(owned, ['A1'])
+
+    def test_fail(self):
+        registry = InFlightItems()
+        owned, futures = registry.claim('group', ['A1'])
+        registry.fail('group', owned, ValueError())
+        with self.assertRaises(ValueError):
+            futures[0].result()
+        self.assertEqual(registry.claim('group', ['A1'])[0], ['A1'])
+
+
+class TestCoalescedRequests(TestCase):
+
+    def test_identical_requests(self):
+        with StubServer(delay=0.1) as stub:
+            client = Lookup('tag', 'access', 'secret', marketplace=stub.host)
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(client.item_lookup(['A1'])))
+                       for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(len(stub.requests), 1)
+        self.assertEqual(len(results), 4)
+
+    def test_overlapping_bulk_lookups(self):
+        with StubServer(delay=0.1) as stub:
+            client = Lookup('tag', 'access', 'secret', marketplace=stub.host)
+            found = []
+            asins = ['A{}'.format(i) for i in range(20)]
+            threads = [threading.Thread(target=lambda: found.append([x.asin for x in client.bulk_item_lookup(asins)]))
+                       for _ in range(3)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual([sorted(x) for x in found], [sorted(asins)] * 3)
+        self.assertEqual(len(stub.requests), 2)
+
+    def test_async_identical_requests(self):
+        with StubServer(delay=0.1) as stub:
+            client = AsyncLookup('tag', 'access', 'secret', marketplace=stub.host)
+
+            async def lookups():
+                try:
+                    return await asyncio.gather(*[client.item_lookup(['A1']) for _ in range(4)])
+                finally:
+                    await close_sessions()
+
+            results = asyncio.run(lookups())
+        self.assertEqual(len(stub.requests), 1)
+        self.assertEqual(len(set(results)), 1)
+
+    def test_async_overlapping_bulk_lookups(self):
+        asins = ['A{}'.format(i) for i in range(30)]
+        with StubServer(delay=0.1) as stub:
+            client = AsyncLookup('tag', 'access', 'secret', marketplace=stub.host)
+
+            async def lookup():
+                return sorted([x.asin async for x in client.bulk_item_lookup(asins)])
+
+            async def lookups():
+                try:
+                    return await asyncio.gather(lookup(), lookup())
+                finally:
+                    await close_sessions()
+
+            found = asyncio.run(lookups())
+        self.assertEqual(found, [sorted(asins)] * 2)
+        self.assertEqual(len(stub.requests), 3)
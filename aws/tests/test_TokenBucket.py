@@ -0,0 +1,112 @@
+import threading
+import time
+from unittest import TestCase
+
+from aws import Lookup
+from aws.ratelimit import TokenBucket, configure_rate_limit, get_rate_limit, clear_rate_limit
+from aws.tests.stub_server import StubServer
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.bucket = TokenBucket(2, burst=3, clock=self.clock)
+
+    def test_burst(self):
+        self.assertEqual([self.bucket.reserve() for _ in range(3)], [0, 0, 0])
+        self.assertEqual(self.bucket.reserve(), 0.5)
+
+    def test_waiters_are_queued(self):
+        for _ in range(3):
+            self.bucket.reserve()
+        self.assertEqual([self.bucket.reserve() for _ in range(3)], [0.5, 1.0, 1.5])
+
+    def test_refill(self):
+        for _ in range(3):
+            self.bucket.reserve()
+        self.clock.now = 1.0
+        self.assertEqual(self.bucket.available, 2)
+        self.clock.now = 10.0
+        self.assertEqual(self.bucket.available, 3)
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(0)
+
+
+class TestRateLimit(TestCase):
+
+    def tearDown(self):
+        clear_rate_limit('limited')
+
+    def test_shared_by_access_key(self):
+        bucket = configure_rate_limit('limited', 5)
+        self.assertIs(get_rate_limit('limited'), bucket)
+        self.assertIs(configure_rate_limit('limited', 10), bucket)
+        self.assertEqual(bucket.rate, 10)
+        self.assertIsNone(get_rate_limit('unlimited'))
+
+    def test_bucket_per_marketplace(self):
+        us = configure_rate_limit('limited', 5, marketplace='webservices.amazon.com')
+        self.addCleanup(clear_rate_limit, 'limited', 'webservices.amazon.com')
+        self.assertIsNot(configure_rate_limit('limited', 5), us)
+        self.assertIs(get_rate_limit('limited', 'webservices.amazon.com'), us)
+        self.assertIsNone(get_rate_limit('unlimited', 'webservices.amazon.de'))
+
+    def test_key_wide_rate_is_the_default(self):
+        bucket = configure_rate_limit('limited', 5, burst=2)
+        de = get_rate_limit('limited', 'webservices.amazon.de')
+        self.assertIsNot(de, bucket)
+        self.assertIs(get_rate_limit('limited', 'webservices.amazon.de'), de)
+        self.assertEqual((de.rate, de.burst), (5, 2))
+        configure_rate_limit('limited', 10)
+        self.assertEqual(de.rate, 10)
+
+    def test_marketplaces_do_not_share_the_default(self):
+        configure_rate_limit('limited', 2, burst=1)
+        buckets = [get_rate_limit('limited', 'webservices.amazon.{}'.format(tld)) for tld in ('com', 'de', 'fr')]
+        self.assertEqual([b.reserve() for b in buckets], [0, 0, 0])
+        self.assertGreater(buckets[0].reserve(), 0)
+
+    def test_clear_removes_default_buckets(self):
+        configure_rate_limit('limited', 5)
+        get_rate_limit('limited', 'webservices.amazon.de')
+        clear_rate_limit('limited')
+        self.assertIsNone(get_rate_limit('limited', 'webservices.amazon.de'))
+
+    def test_key_wide_limit_paces_client_with_marketplace(self):
+        configure_rate_limit('limited', 20, burst=1)
+        with StubServer() as stub:
+            client = Lookup('tag', 'limited', 'secret', marketplace=stub.host)
+            start = time.monotonic()
+            for i in range(6):
+                client.item_lookup(['A{}'.format(i)])
+            elapsed = time.monotonic() - start
+        self.assertEqual(len(stub.requests), 6)
+        self.assertGreaterEqual(elapsed, 0.25)
+
+    def test_make_request_waits(self):
+        with StubServer() as stub:
+            Lookup('tag', 'limited', 'secret', marketplace=stub.host, rate_limit=20, burst=1)
+            self.addCleanup(clear_rate_limit, 'limited', stub.host)
+            # A second client with the same access key shares the limit without configuring it.
+            client = Lookup('tag', 'limited', 'secret', marketplace=stub.host)
+            start = time.monotonic()
+            threads = [threading.Thread(target=client.item_lookup, args=(['A{}'.format(i)],)) for i in range(6)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.monotonic() - start
+        self.assertEqual(len(stub.requests), 6)
+        self.assertGreaterEqual(elapsed, 0.25)
@@ -0,0 +1,117 @@
+import asyncio
+from unittest import TestCase
+
+from aws import Lookup, AsyncLookup, close_sessions
+from aws.cache import MemoryCache
+from aws.tests.stub_server import StubServer, THROTTLED_RESPONSE
+from aws.tracing import (LatencyHistogram, LatencyRecorder, RequestEvent, CACHE_HIT, OK, THROTTLED, EXCEPTION, PHASES,
+                         TOTAL)
+
+
+class ListHooks(LatencyRecorder):
+
+    def __init__(self):
+        super(ListHooks, self).__init__()
+        self.events = []
+
+    def request(self, event):
+        self.events.append(event)
+        super(ListHooks, self).request(event)
+
+
+class TestLatencyHistogram(TestCase):
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram(bounds=(0.01, 0.1, 1))
+        for seconds in [0.005] * 90 + [0.05] * 9 + [0.5]:
+            histogram.add(seconds)
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.percentile(50), 0.01)
+        self.assertEqual(histogram.percentile(95), 0.1)
+        self.assertEqual(histogram.percentile(100), 0.5)
+        self.assertAlmostEqual(histogram.mean, (0.45 + 0.45 + 0.5) / 100)
+
+    def test_open_bucket_uses_max(self):
+        histogram = LatencyHistogram(bounds=(0.01,))
+        histogram.add(3)
+        self.assertEqual(histogram.percentile(99), 3)
+
+    def test_empty(self):
+        self.assertEqual(LatencyHistogram().percentile(50), 0.0)
+
+
+class TestRequestEvent(TestCase):
+
+    def test_marks(self):
+        now = [0.0]
+        clock = lambda: now[0]
+        event = RequestEvent('ItemLookup', 'host', clock=clock)
+        now[0] = 1.0
+        event.mark('queue', clock=clock)
+        now[0] = 1.5
+        event.mark('network', clock=clock)
+        self.assertEqual(dict(event.timings), {'queue': 1.0, 'network': 0.5})
+        self.assertEqual(event.total, 1.5)
+        self.assertEqual(event.finish(OK, 200, 'abc').bytes, 3)
+
+
+class TestClientHooks(TestCase):
+
+    def test_request_event(self):
+        hooks = ListHooks()
+        with StubServer() as stub:
+            client = Lookup('tag', 'access', 'secret', marketplace=stub.host, hooks=hooks)
+            content = client.item_lookup(['A1'])
+        event, = hooks.events
+        self.assertEqual((event.operation, event.marketplace, event.outcome, event.status),
+                         ('ItemLookup', stub.host, OK, 200))
+        self.assertEqual(event.bytes, len(content))
+        self.assertEqual(tuple(event.timings), PHASES)
+        self.assertAlmostEqual(sum(event.timings.values()), event.total)
+        self.assertEqual(hooks.histogram('ItemLookup', TOTAL).count, 1)
+        self.assertEqual(hooks.summary()['ItemLookup']['outcomes'], {OK: 1})
+
+    def test_cache_hit(self):
+        hooks = ListHooks()
+        with StubServer() as stub:
+            client = Lookup('tag', 'access', 'secret', marketplace=stub.host, hooks=hooks, cache=MemoryCache())
+            client.item_lookup(['A1'])
+            client.item_lookup(['A1'])
+        self.assertEqual([e.outcome for e in hooks.events], [OK, CACHE_HIT])
+        self.assertEqual(hooks.events[1].timings, {})
+        self.assertEqual(hooks.histogram('ItemLookup').count, 1)
+
+    def test_throttled(self):
+        hooks = ListHooks()
+        with StubServer(body=THROTTLED_RESPONSE, status=503) as stub:
+            client = Lookup('tag', 'access', 'secret', marketplace=stub.host, hooks=hooks)
+            client.make_request('ItemLookup', {'ItemId': 'A1'})
+        self.assertEqual(hooks.events[0].outcome, THROTTLED)
+        self.assertEqual(hooks.events[0].status, 503)
+
+    def test_exception(self):
+        hooks = ListHooks()
+        with StubServer() as stub:
+            host = stub.host
+        client = Lookup('tag', 'access', 'secret', marketplace=host, hooks=hooks)
+        with self.assertRaises(Exception):
+            client.make_request('ItemLookup', {'ItemId': 'A1'})
+        self.assertEqual(hooks.events[0].outcome, EXCEPTION)
+        self.assertIsNotNone(hooks.events[0].error)
+
+    def test_async_request_event(self):
+        hooks = ListHooks()
+
+        async def lookup(host):
+            client = AsyncLookup('tag', 'access', 'secret', marketplace=host, hooks=hooks)
+            try:
+                return await client.item_lookup(['A1'])
+            finally:
+                await close_sessions()
+
+        with StubServer() as stub:
+            content = asyncio.new_event_loop().run_until_complete(lookup(stub.host))
+        event, = hooks.events
+        self.assertEqual(event.outcome, OK)
+        self.assertEqual(event.bytes, len(content))
+        self.assertEqual(tuple(event.timings), PHASES)
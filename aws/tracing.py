@@ -0,0 +1,218 @@
+"""
+Per request tracing hooks for the api clients.
+
+Pass an object implementing `Hooks` to a client and it receives a RequestEvent for every request the client makes
+or serves from its cache, Ex
+
+    recorder = LatencyRecorder()
+    lookup = Lookup(associate_tag, access_key, secret_key, hooks=recorder)
+    ...
+    recorder.summary()
+
+Clients without hooks never read the clock or build events, so tracing costs nothing unless it is enabled.
+"""
+import bisect
+import threading
+import time
+from collections import OrderedDict
+
+# Outcomes of a request.
+CACHE_HIT = 'cache_hit'
+OK = 'ok'
+THROTTLED = 'throttled'
+ERROR = 'error'
+EXCEPTION = 'exception'
+
+# Phases of a request, in the order they happen. QUEUE is the wait for the rate limit (and for the async client
+# its concurrency limit). The sync client downloads the body during NETWORK, the async client during DECODE.
+QUEUE = 'queue'
+SIGN = 'sign'
+NETWORK = 'network'
+DECODE = 'decode'
+PHASES = (QUEUE, SIGN, NETWORK, DECODE)
+
+TOTAL = 'total'
+
+# Upper bounds in seconds of the histogram buckets, from 100 microseconds to 2 minutes. The last bucket is open.
+DEFAULT_BOUNDS = tuple(m * 10 ** e for e in range(-4, 2) for m in (1, 2, 5)) + (100, 120)
+
+
+class RequestEvent(object):
+    """
+    What happened during one request.
+
+    :ivar operation: Product Advertising API operation.
+    :ivar marketplace: Marketplace host.
+    :ivar outcome: One of CACHE_HIT, OK, THROTTLED, ERROR (any other non 200 status) or EXCEPTION (the request
+        raised, Ex a connection error).
+    :ivar status: HTTP status, None for cache hits and exceptions.
+    :ivar bytes: Length of the response content.
+    :ivar timings: OrderedDict of phase to seconds, for the phases the request went through.
+    :ivar error: The exception raised when outcome is EXCEPTION.
+    """
+    __slots__ = ('operation', 'marketplace', 'outcome', 'status', 'bytes', 'timings', 'error', '_start', '_last')
+
+    def __init__(self, operation, marketplace, clock=time.perf_counter):
+        self.operation = operation
+        self.marketplace = marketplace
+        self.outcome = None
+        self.status = None
+        self.bytes = 0
+        self.timings = OrderedDict()
+        self.error = None
+        self._start = self._last = clock()
+
+    def mark(self, phase, clock=time.perf_counter):
+        """
+        End `phase`, which started when the previous phase ended.
+        """
+        now = clock()
+        self.timings[phase] = now - self._last
+        self._last = now
+
+    @property
+    def total(self):
+        return self._last - self._start
+
+    def finish(self, outcome, status=None, content=None, error=None):
+        self.outcome = outcome
+        self.status = status
+        self.bytes = len(content) if content is not None else 0
+        self.error = error
+        return self
+
+    def as_dict(self):
+        return {
+            'operation': self.operation,
+            'marketplace': self.marketplace,
+            'outcome': self.outcome,
+            'status': self.status,
+            'bytes': self.bytes,
+            'timings': dict(self.timings),
+            'total': self.total,
+            'error': repr(self.error) if self.error is not None else None,
+        }
+
+    def __repr__(self):
+        return '<RequestEvent {} {} {} {:.3f}s>'.format(self.operation, self.marketplace, self.outcome, self.total)
+
+
+def outcome_for_status(status):
+    if status == 200:
+        return OK
+    # The api answers 503 when the access key is sending requests faster than it is allowed to.
+    if status == 503:
+        return THROTTLED
+    return ERROR
+
+
+class Hooks(object):
+    """
+    Base class of request hooks. Override `request`.
+    """
+
+    def request(self, event):
+        """
+        Called once per request with its RequestEvent, from the thread (or event loop) which made the request.
+        """
+        pass
+
+
+class LatencyHistogram(object):
+    """
+    Fixed bucket histogram of durations in seconds.
+    """
+
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """
+        :param q: Percentile between 0 and 100.
+        :return: Upper bound of the bucket holding the percentile, or the max for the open last bucket.
+        """
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+class LatencyRecorder(Hooks):
+    """
+    Keeps a LatencyHistogram of every phase and of the total time of requests, per operation, in memory.
+
+    Cache hits are counted but not added to the histograms so they do not hide the latency of real requests.
+    """
+
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+        self.bounds = bounds
+        self.histograms = {}
+        self.outcomes = {}
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def request(self, event):
+        with self._lock:
+            key = (event.operation, event.outcome)
+            self.outcomes[key] = self.outcomes.get(key, 0) + 1
+            self.bytes += event.bytes
+            if event.outcome == CACHE_HIT:
+                return
+            for phase, seconds in event.timings.items():
+                self._histogram(event.operation, phase).add(seconds)
+            self._histogram(event.operation, TOTAL).add(event.total)
+
+    def _histogram(self, operation, phase):
+        histogram = self.histograms.get((operation, phase))
+        if histogram is None:
+            histogram = self.histograms[(operation, phase)] = LatencyHistogram(self.bounds)
+        return histogram
+
+    def histogram(self, operation, phase=TOTAL):
+        """
+        :return: LatencyHistogram of a phase, empty if nothing was recorded for it.
+        """
+        with self._lock:
+            return self.histograms.get((operation, phase)) or LatencyHistogram(self.bounds)
+
+    def summary(self):
+        """
+        :return: dict of operation to {'outcomes': {outcome: count}, 'latency': {phase: histogram dict}}
+        """
+        with self._lock:
+            summary = {}
+            for (operation, outcome), count in self.outcomes.items():
+                summary.setdefault(operation, {'outcomes': {}, 'latency': {}})['outcomes'][outcome] = count
+            for (operation, phase), histogram in self.histograms.items():
+                summary[operation]['latency'][phase] = histogram.as_dict()
+            return summary
@@ -3,7 +3,8 @@ from distutils.core import setup
 setup(
     name='python3-amazon-aws',
     version='0.0.1',
-    packages=['aws', 'aws.parsers', 'aws.scrapy'],
+    packages=['aws', 'aws.benchmarks', 'aws.parsers', 'aws.scrapy'],
+    package_data={'aws.benchmarks': ['baselines.json']},
     url='',
     license='',
     author='Mark Sanders',